@@ -9,18 +9,6 @@ FROM User_Listening_History ulh
 WHERE ulh.userID = (SELECT id FROM user_info WHERE username = 'another_user')
 GROUP BY ag.genre
 ORDER BY listen_count DESC LIMIT 1;
-=======
--- Query 6: Find a User's Most Listened-To Genre
-SELECT ag.genre,
-       COUNT(ulh.trackID) AS listen_count
-FROM User_Listening_History ulh
-         JOIN
-     trackinfo ti ON ulh.trackID = ti.trackID
-         JOIN
-     Artist_Genres ag ON ti.artistID = ag.artistID
-WHERE ulh.userID = (SELECT id FROM user_info WHERE username = 'another_user')
-GROUP BY ag.genre
-ORDER BY listen_count DESC LIMIT 1;
 
 
 -- Views
@@ -66,6 +54,7 @@ ORDER BY
     avg_popularity DESC;
 
 -- Stored Procedures (Functions for PostgreSQL)
+-- These read mv_track_details from migrations/0002_materialized_views.sql.
 
 CREATE OR REPLACE FUNCTION get_artist_track_analysis(p_artist_id VARCHAR)
 RETURNS TABLE(
@@ -82,7 +71,7 @@ BEGIN
         AVG(vtd.danceability),
         AVG(vtd.energy)
     FROM
-        vw_track_details vtd
+        mv_track_details vtd
     WHERE
         vtd.artistID = p_artist_id;
 END;
@@ -122,13 +111,12 @@ BEGIN
         vtd.artistName,
         vtd.popularity
     FROM
-        vw_track_details vtd
+        mv_track_details vtd
     WHERE
         vtd.artistID IN (SELECT artistID FROM user_top_artists)
-        AND vtd.trackID NOT IN (SELECT trackID FROM user_listened_tracks)
+        AND vtd.trackID NOT IN (SELECT ult.trackID FROM user_listened_tracks ult)
     ORDER BY
         vtd.popularity DESC
     LIMIT p_limit;
 END;
 $$ LANGUAGE plpgsql;
->>>>>>> REPLACE
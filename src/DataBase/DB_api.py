@@ -1,20 +1,64 @@
-from typing import Tuple, List
+import io
+import time
+from datetime import datetime, timezone
+from typing import Tuple, List, Sequence, Iterator
 
 import psycopg2
+from psycopg2 import extensions, sql
+from psycopg2.extras import execute_values
 from . import DB_connect
+from .DB_buffer import WriteBuffer
+from .DB_statements import StatementRegistry
+from .DB_cache import QueryCache, written_tables
+from .DB_local import upsert_query
 
 class DB_api(DB_connect.DB_connect):
     """
     Class to interact with the database.
     """
 
+    # Batches at least this large are loaded with COPY, smaller ones with multi-row VALUES.
+    copy_threshold = 500
+    # Rows per statement on the multi-row VALUES path.
+    values_page_size = 1000
+    # Rows fetched per round trip by server-side cursors.
+    itersize = 2000
+    # Prepared statements shared by every instance, prepared once per pooled connection.
+    statements = StatementRegistry()
+    # Read results shared by every instance, invalidated by the writes below.
+    query_cache = QueryCache()
+    # Materialized views from migrations/0002_materialized_views.sql, in refresh order.
+    materialized_views = ("mv_track_details", "mv_genre_popularity")
+
     def __init__(self):
         """
         Initializes the DB_api class by calling the parent DB_connect constructor.
         """
         super().__init__()
+        if self.replica_pool:
+            # Cached reads may come from the replica, which can trail a write by up to max_replica_lag.
+            self.query_cache.replica_lag = max(self.query_cache.replica_lag, self.max_replica_lag)
+
+    def _run(self, cur, query: str, data: Tuple = None, statement: str = None) -> None:
+        """
+        Runs a query on a cursor, through the prepared statement registry when it is named.
+        Embedded backends have no PREPARE, so names are ignored there.
+        """
+        if statement and self.backend == "postgresql":
+            self.statements.execute(cur, statement, query, data)
+        else:
+            cur.execute(query, data)
+
+    def statement_stats(self) -> dict:
+        """
+        Reports call counts, prepare counts and mean latency of the prepared statements.
+
+        Returns:
+            dict: Statistics keyed by statement name.
+        """
+        return self.statements.stats()
 
-    def _execute_query(self, query: str, data: Tuple = None, commit: bool = False) -> bool:
+    def _execute_query(self, query: str, data: Tuple = None, commit: bool = False, statement: str = None) -> bool:
         """
         Executes a single SQL query with optional data and commit.
         
@@ -22,6 +66,7 @@ class DB_api(DB_connect.DB_connect):
             query (str): The SQL query to execute.
             data (Tuple, optional): The data to pass to the query. Defaults to None.
             commit (bool, optional): Whether to commit the transaction. Defaults to False.
+            statement (str, optional): Name to run the query as a prepared statement under.
         
         Returns:
             bool: True if the query executed successfully, False otherwise.
@@ -31,9 +76,10 @@ class DB_api(DB_connect.DB_connect):
             conn = self.get_connection()
             if conn:
                 with conn.cursor() as cur:
-                    cur.execute(query, data)
+                    self._run(cur, query, data, statement)
                 if commit:
                     conn.commit()
+                    self.query_cache.invalidate(written_tables(query))
                 return True
         except (psycopg2.DatabaseError, Exception) as e:
             print(f"Database error: {e}")
@@ -44,23 +90,27 @@ class DB_api(DB_connect.DB_connect):
             if conn:
                 self.put_connection(conn)
 
-    def _execute_fetch_query(self, query: str, data: Tuple = None) -> List:
+    def _execute_fetch_query(self, query: str, data: Tuple = None, statement: str = None,
+                             replica: bool = False) -> List:
         """
         Executes a fetch SQL query and returns the results.
         
         Args:
             query (str): The SQL query to execute.
             data (Tuple, optional): The data to pass to the query. Defaults to None.
+            statement (str, optional): Name to run the query as a prepared statement under.
+            replica (bool, optional): Allow the read replica to serve the query. Reads that
+                must see the latest writes (ingestion lookups) keep the default False.
         
         Returns:
             List: The fetched results as a list of tuples.
         """
         conn = None
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(replica=replica)
             if conn:
                 with conn.cursor() as cur:
-                    cur.execute(query, data)
+                    self._run(cur, query, data, statement)
                     return cur.fetchall()
         except (psycopg2.DatabaseError, Exception) as e:
             print(f"Database error: {e}")
@@ -90,6 +140,201 @@ class DB_api(DB_connect.DB_connect):
                     cur.executemany(query, data)
                 if commit:
                     conn.commit()
+                    self.query_cache.invalidate(written_tables(query))
+                return True
+        except (psycopg2.DatabaseError, Exception) as e:
+            print(f"Database error: {e}")
+            if conn:
+                conn.rollback()
+            return False
+        finally:
+            if conn:
+                self.put_connection(conn)
+
+    def _stream_query(self, query: str, data: Tuple = None, itersize: int = None,
+                      with_columns: bool = False, replica: bool = True) -> Iterator:
+        """
+        Streams the results of a SQL query in batches through a named server-side cursor.
+
+        Only one batch is held in memory at a time. The pooled connection stays
+        checked out until the generator is exhausted or closed. An error part way
+        through (e.g. a replica cancelling the query) is logged and re-raised, so
+        a cut-short stream is never mistaken for the complete result.
+
+        Args:
+            query (str): The SQL query to execute.
+            data (Tuple, optional): The data to pass to the query. Defaults to None.
+            itersize (int, optional): Rows per batch. Defaults to the class itersize.
+            with_columns (bool, optional): Yield (column names, rows) pairs instead of rows only.
+            replica (bool, optional): Allow the read replica to serve the query. Defaults to True.
+
+        Yields:
+            List[Tuple]: The next batch of rows.
+
+        Raises:
+            psycopg2.Error: If the query fails before the last batch was read.
+        """
+        itersize = itersize or self.itersize
+        conn = None
+        try:
+            conn = self.get_connection(replica=replica)
+            if not conn:
+                return
+            with conn.cursor(name=f"stream_{id(conn)}") as cur:
+                cur.itersize = itersize
+                cur.execute(query, data)
+                columns = None
+                while True:
+                    rows = cur.fetchmany(itersize)
+                    if not rows:
+                        break
+                    if columns is None:
+                        columns = [col[0] for col in cur.description]
+                    yield (columns, rows) if with_columns else rows
+        except (psycopg2.DatabaseError, Exception) as e:
+            print(f"Database error while streaming, result is incomplete: {e}")
+            raise
+        finally:
+            if conn:
+                # Ends the read transaction that holds the server-side cursor open.
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    pass  # the pool discards the broken connection
+                self.put_connection(conn)
+
+    def _stream_dataframes(self, query: str, data: Tuple = None, chunksize: int = None) -> Iterator:
+        """
+        Streams the results of a SQL query as pandas DataFrame chunks.
+
+        Args:
+            query (str): The SQL query to execute.
+            data (Tuple, optional): The data to pass to the query. Defaults to None.
+            chunksize (int, optional): Rows per DataFrame. Defaults to the class itersize.
+
+        Yields:
+            pandas.DataFrame: The next chunk, with the query's column names.
+        """
+        import pandas as pd
+
+        for columns, rows in self._stream_query(query, data, chunksize, with_columns=True):
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+    @staticmethod
+    def _copy_csv(rows: Sequence[Tuple]) -> io.StringIO:
+        """
+        Serializes rows as CSV for COPY; strings are always quoted so that an
+        unquoted empty field unambiguously means NULL.
+        """
+        def field(value) -> str:
+            if value is None:
+                return ""
+            if isinstance(value, (bool, int, float)):
+                return str(value)
+            return '"' + str(value).replace('"', '""') + '"'
+
+        buf = io.StringIO()
+        for row in rows:
+            buf.write(",".join(field(v) for v in row))
+            buf.write("\n")
+        buf.seek(0)
+        return buf
+
+    def _bulk_insert(self, cur, table: str, columns: Sequence[str], rows: Sequence[Tuple],
+                     conflict_columns: Sequence[str], update_columns: Sequence[str] = None,
+                     use_copy: bool = None) -> None:
+        """
+        Loads rows on an open cursor and merges them into the target table.
+
+        Large batches are streamed with COPY FROM STDIN into a temporary table
+        and merged with one INSERT ... SELECT ... ON CONFLICT; small batches
+        (or use_copy=False) go through paged multi-row VALUES statements.
+        The caller owns the transaction.
+
+        Args:
+            cur: Cursor of the connection to write on.
+            table (str): Target table name.
+            columns (Sequence[str]): Target columns, in the order of each row tuple.
+            rows (Sequence[Tuple]): Rows to load.
+            conflict_columns (Sequence[str]): Columns of the unique key used for ON CONFLICT.
+            update_columns (Sequence[str], optional): Columns overwritten on conflict;
+                conflicting rows are skipped when omitted.
+            use_copy (bool, optional): Force or disable the COPY path.
+        """
+        if not rows:
+            return
+        if self.backend != "postgresql":
+            cur.executemany(upsert_query(table, columns, conflict_columns, update_columns), rows)
+            return
+        if use_copy is None:
+            use_copy = len(rows) >= self.copy_threshold
+
+        target = sql.Identifier(table)
+        column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+        conflict_list = sql.SQL(", ").join(map(sql.Identifier, conflict_columns))
+        if update_columns:
+            on_conflict = sql.SQL("DO UPDATE SET {}").format(sql.SQL(", ").join(
+                sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in update_columns
+            ))
+        else:
+            on_conflict = sql.SQL("DO NOTHING")
+
+        if not use_copy:
+            query = sql.SQL("INSERT INTO {} ({}) VALUES %s ON CONFLICT ({}) {}").format(
+                target, column_list, conflict_list, on_conflict)
+            execute_values(cur, query.as_string(cur), rows, page_size=self.values_page_size)
+            return
+
+        staging = sql.Identifier(f"_bulk_{table}")
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging))
+        cur.execute(sql.SQL("CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP").format(
+            staging, target))
+        cur.copy_expert(
+            sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(staging, column_list).as_string(cur),
+            self._copy_csv(rows)
+        )
+        # DISTINCT ON keeps a batch with repeated keys from hitting the same row twice.
+        cur.execute(sql.SQL(
+            "INSERT INTO {} ({}) SELECT DISTINCT ON ({}) {} FROM {} ON CONFLICT ({}) {}"
+        ).format(target, column_list, conflict_list, column_list, staging, conflict_list, on_conflict))
+
+    def _execute_bulk_insert(self, table: str, columns: Sequence[str], rows: Sequence[Tuple],
+                             conflict_columns: Sequence[str], update_columns: Sequence[str] = None) -> bool:
+        """
+        Bulk loads rows into a table in a single transaction.
+
+        Uses COPY through a temporary table for large batches and falls back to
+        paged multi-row VALUES if the server rejects COPY.
+
+        Args:
+            table (str): Target table name.
+            columns (Sequence[str]): Target columns, in the order of each row tuple.
+            rows (Sequence[Tuple]): Rows to load.
+            conflict_columns (Sequence[str]): Columns of the unique key used for ON CONFLICT.
+            update_columns (Sequence[str], optional): Columns overwritten on conflict.
+
+        Returns:
+            bool: True if the rows were written successfully, False otherwise.
+        """
+        if not rows:
+            return True
+        conn = None
+        try:
+            conn = self.get_connection()
+            if conn:
+                try:
+                    with conn.cursor() as cur:
+                        self._bulk_insert(cur, table, columns, rows, conflict_columns, update_columns)
+                except (psycopg2.IntegrityError, psycopg2.DataError):
+                    raise
+                except psycopg2.DatabaseError as e:
+                    print(f"COPY into {table} failed ({e}), retrying with multi-row VALUES.")
+                    conn.rollback()
+                    with conn.cursor() as cur:
+                        self._bulk_insert(cur, table, columns, rows, conflict_columns, update_columns,
+                                          use_copy=False)
+                conn.commit()
+                self.query_cache.invalidate((table,))
                 return True
         except (psycopg2.DatabaseError, Exception) as e:
             print(f"Database error: {e}")
@@ -99,6 +344,20 @@ class DB_api(DB_connect.DB_connect):
         finally:
             if conn:
                 self.put_connection(conn)
+        return False
+
+    def create_write_buffer(self, max_rows: int = 500, max_age: float = 5.0) -> WriteBuffer:
+        """
+        Creates a write-behind buffer for the enrichment tables.
+
+        Args:
+            max_rows (int, optional): Buffered rows that trigger a flush. Defaults to 500.
+            max_age (float, optional): Seconds before buffered rows are flushed. Defaults to 5.0.
+
+        Returns:
+            WriteBuffer: Buffer that writes through this instance's connection pool.
+        """
+        return WriteBuffer(self, max_rows=max_rows, max_age=max_age)
 
     def get_top_hundred_with_artist_info(self) -> list:
         """
@@ -112,7 +371,7 @@ class DB_api(DB_connect.DB_connect):
             FROM top_hundered_tracks t
             JOIN trackinfo ti ON t.trackid = ti.trackid;
         """
-        return self._execute_fetch_query(query)
+        return self._execute_fetch_query(query, statement="get_top_hundred_with_artist_info")
 
     def get_top_hundred_tracks_for_display(self) -> list:
         """
@@ -126,7 +385,7 @@ class DB_api(DB_connect.DB_connect):
             FROM top_hundered_tracks t
             JOIN trackinfo ti ON t.trackid = ti.trackid;
         """
-        return self._execute_fetch_query(query)
+        return self._execute_fetch_query(query, replica=True)
 
     def get_track_infos(self, track_ids: List[str]) -> list:
         """
@@ -143,7 +402,7 @@ class DB_api(DB_connect.DB_connect):
             FROM trackinfo
             WHERE trackid = ANY(%s);
         """
-        return self._execute_fetch_query(query, (track_ids,))
+        return self._execute_fetch_query(query, (track_ids,), statement="get_track_infos", replica=True)
 
     def get_all_tracks(self) -> list:
         """
@@ -153,26 +412,143 @@ class DB_api(DB_connect.DB_connect):
             list: List of tuples containing all tracks.
         """
         query = "SELECT trackid, trackname, artistname FROM trackinfo;"
-        return self._execute_fetch_query(query)
+        return self._execute_fetch_query(query, replica=True)
+
+    def iter_all_tracks(self, batch_size: int = None, as_dataframe: bool = False) -> Iterator:
+        """
+        Streams all tracks from the trackinfo table in bounded batches.
+
+        Args:
+            batch_size (int, optional): Rows per batch. Defaults to the class itersize.
+            as_dataframe (bool, optional): Yield pandas DataFrames instead of lists of tuples.
+
+        Yields:
+            Batches of (trackid, trackname, artistname) rows.
+
+        Raises:
+            psycopg2.Error: If streaming the rows fails part way.
+        """
+        query = "SELECT trackid, trackname, artistname FROM trackinfo;"
+        if as_dataframe:
+            return self._stream_dataframes(query, chunksize=batch_size)
+        return self._stream_query(query, itersize=batch_size)
+
+    audio_feature_columns = ("danceability", "energy", "key", "loudness", "mode", "speechiness",
+                             "acousticness", "instrumentalness", "liveness", "valence", "tempo")
+
+    # Genres come from the genre dimension of migrations/0003_genre_dimension.sql.
+    training_data_query = """
+        SELECT 
+            af.danceability, af.energy, af.key, af.loudness, af.mode, 
+            af.speechiness, af.acousticness, af.instrumentalness, af.liveness, 
+            af.valence, af.tempo, ag.genres
+        FROM audio_features af
+        JOIN trackinfo ti ON af.trackid = ti.trackid
+        JOIN (
+            SELECT agi.artistid, array_agg(g.genre ORDER BY g.genre) AS genres
+            FROM artist_genre_ids agi
+            JOIN genres g ON g.genreid = agi.genreid
+            GROUP BY agi.artistid
+        ) ag ON ag.artistid = ti.artistid;
+    """
+
+    training_matrix_query = """
+        SELECT 
+            af.trackid,
+            af.danceability, af.energy, af.key, af.loudness, af.mode, 
+            af.speechiness, af.acousticness, af.instrumentalness, af.liveness, 
+            af.valence, af.tempo, ag.genre_ids
+        FROM audio_features af
+        JOIN trackinfo ti ON af.trackid = ti.trackid
+        JOIN (
+            SELECT artistid, array_agg(genreid) AS genre_ids
+            FROM artist_genre_ids
+            GROUP BY artistid
+        ) ag ON ag.artistid = ti.artistid;
+    """
 
     def get_training_data(self) -> list:
         """
         Retrieves the training data for the genre classification model.
 
         Returns:
-            list: List of tuples containing the training data.
+            list: List of tuples containing the eleven audio features and a list of the artist's genres.
         """
-        query = """
-            SELECT 
-                af.danceability, af.energy, af.key, af.loudness, af.mode, 
-                af.speechiness, af.acousticness, af.instrumentalness, af.liveness, 
-                af.valence, af.tempo, ad.genres
-            FROM audio_features af
-            JOIN trackinfo ti ON af.trackid = ti.trackid
-            JOIN artistdetails ad ON ti.artistid = ad.artistid
-            WHERE ad.genres IS NOT NULL AND ad.genres != '{}';
+        return self._execute_fetch_query(self.training_data_query, replica=True)
+
+    def get_genres(self) -> list:
         """
-        return self._execute_fetch_query(query)
+        Retrieves the genre dimension.
+
+        Returns:
+            list: List of tuples containing genre ID and genre name, ordered by ID.
+        """
+        query = "SELECT genreid, genre FROM genres ORDER BY genreid;"
+        return self._execute_fetch_query(query, replica=True)
+
+    def get_training_matrix(self, batch_size: int = None) -> tuple:
+        """
+        Reads the training data as a float32 feature matrix and a sparse multi-hot genre matrix.
+
+        Rows are streamed and appended to the arrays batch by batch, so the
+        result never exists as a list of Python tuples. Row i of both matrices
+        belongs to track_ids[i]; column j of the genre matrix is genre_names[j].
+
+        Args:
+            batch_size (int, optional): Rows per streamed batch. Defaults to the class itersize.
+
+        Returns:
+            tuple: (track_ids, features, genre_matrix, genre_names) where features is an
+                (n, 11) float32 array in audio_feature_columns order (missing values as NaN),
+                genre_matrix an (n, n_genres) scipy.sparse.csr_matrix of uint8 and
+                track_ids/genre_names lists of strings.
+
+        Raises:
+            psycopg2.Error: If streaming the rows fails part way.
+        """
+        import numpy as np
+        from scipy import sparse
+
+        genres = self.get_genres()
+        column_of = {genre_id: column for column, (genre_id, _) in enumerate(genres)}
+        genre_names = [name for _, name in genres]
+
+        track_ids = []
+        feature_batches = []
+        indices = []
+        indptr = [0]
+        for rows in self._stream_query(self.training_matrix_query, itersize=batch_size):
+            feature_batches.append(np.array([row[1:12] for row in rows], dtype=np.float32))
+            for row in rows:
+                track_ids.append(row[0])
+                indices.extend(column_of[g] for g in row[12] if g in column_of)
+                indptr.append(len(indices))
+
+        n_features = len(self.audio_feature_columns)
+        features = np.concatenate(feature_batches) if feature_batches else np.empty((0, n_features), np.float32)
+        genre_matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.uint8), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=(len(track_ids), len(genre_names))
+        )
+        return track_ids, features, genre_matrix, genre_names
+
+    def iter_training_data(self, batch_size: int = None, as_dataframe: bool = True) -> Iterator:
+        """
+        Streams the training data for the genre classification model in bounded chunks.
+
+        Args:
+            batch_size (int, optional): Rows per chunk. Defaults to the class itersize.
+            as_dataframe (bool, optional): Yield pandas DataFrames (default) or lists of tuples.
+
+        Yields:
+            Chunks of audio features with the artist's genres.
+
+        Raises:
+            psycopg2.Error: If streaming the rows fails part way.
+        """
+        if as_dataframe:
+            return self._stream_dataframes(self.training_data_query, chunksize=batch_size)
+        return self._stream_query(self.training_data_query, itersize=batch_size)
 
     def insert_user_info(self, data: str) -> bool:
         """
@@ -185,7 +561,92 @@ class DB_api(DB_connect.DB_connect):
             bool: True if insertion was successful, False otherwise.
         """
         query = "insert into user_info (username) values (%s)"
-        return self._execute_query(query, (data,), commit=True)
+        return self._execute_query(query, (data,), commit=True, statement="insert_user_info")
+
+    def get_or_create_user_id(self, username: str):
+        """
+        Retrieves the id of a user, inserting the user first if unknown.
+
+        Args:
+            username (str): The username to look up.
+
+        Returns:
+            The user's UUID, or None if the lookup failed.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            if conn:
+                with conn.cursor() as cur:
+                    if self.backend == "postgresql":
+                        # user_info has no unique key on username; serialize concurrent creators instead.
+                        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (username,))
+                    cur.execute("SELECT id FROM user_info WHERE username = %s LIMIT 1", (username,))
+                    row = cur.fetchone()
+                    if row is None:
+                        cur.execute("INSERT INTO user_info (username) VALUES (%s) RETURNING id", (username,))
+                        row = cur.fetchone()
+                        self.query_cache.invalidate(("user_info",))
+                conn.commit()
+                return row[0]
+        except (psycopg2.DatabaseError, Exception) as e:
+            print(f"Database error: {e}")
+            if conn:
+                conn.rollback()
+            return None
+        finally:
+            if conn:
+                self.put_connection(conn)
+        return None
+
+    def get_last_listen_timestamp(self, user_id) -> list:
+        """
+        Retrieves the timestamp of a user's most recent stored play.
+
+        Read from the primary, since it is the ingestion cursor and must not lag.
+
+        Args:
+            user_id: The user's UUID.
+
+        Returns:
+            list: A single tuple holding the timestamp, or None when the user has no plays.
+        """
+        query = """
+            SELECT max(listenTimestamp)
+            FROM User_Listening_History
+            WHERE userID = %s;
+        """
+        rows = self._execute_fetch_query(query, (user_id,), statement="get_last_listen_timestamp")
+        # SQLite returns aggregates of timestamp columns as text.
+        return [(datetime.fromisoformat(ts) if isinstance(ts, str) else ts,) for ts, in rows]
+
+    def insert_listening_history_bulk(self, data: List[Tuple]) -> bool:
+        """
+        Bulk inserts plays into the partitioned User_Listening_History table.
+
+        On PostgreSQL the monthly partitions the batch falls into are created
+        first. Plays already stored for the same user, track and timestamp are
+        skipped. The played tracks must already be in trackinfo.
+
+        Args:
+            data (List[Tuple]): List of tuples containing userid, trackid, listentimestamp.
+
+        Returns:
+            bool: True if insertion was successful, False otherwise.
+        """
+        if not data:
+            return True
+        timestamps = [row[2] for row in data]
+        # Embedded backends keep the history in one unpartitioned table.
+        if self.backend == "postgresql" and not self._execute_query("SELECT ensure_listening_history_partitions(%s, %s)",
+                                   (min(timestamps), max(timestamps)), commit=True):
+            return False
+        return self._execute_bulk_insert(
+            "user_listening_history",
+            ("userid", "trackid", "listentimestamp"),
+            data,
+            conflict_columns=("userid", "trackid", "listentimestamp")
+        )
 
     def insert_track_info(self, data: Tuple) -> bool:
         """
@@ -202,7 +663,7 @@ class DB_api(DB_connect.DB_connect):
             VALUES (%s, %s, %s, %s, %s) 
             ON CONFLICT (trackid) DO NOTHING
         """
-        return self._execute_query(query, data, commit=True)
+        return self._execute_query(query, data, commit=True, statement="insert_track_info")
 
     def insert_track_infos_bulk(self, data: List[Tuple]) -> bool:
         """
@@ -214,12 +675,12 @@ class DB_api(DB_connect.DB_connect):
         Returns:
             bool: True if insertion was successful, False otherwise.
         """
-        query = """
-            INSERT INTO trackinfo (trackid, trackname, artistname, artistid, releasedate) 
-            VALUES (%s, %s, %s, %s, %s) 
-            ON CONFLICT (trackid) DO NOTHING
-        """
-        return self._execute_many_query(query, data, commit=True)
+        return self._execute_bulk_insert(
+            "trackinfo",
+            ("trackid", "trackname", "artistname", "artistid", "releasedate"),
+            data,
+            conflict_columns=("trackid",)
+        )
 
     def insert_song_details(self, data: Tuple) -> bool:
         """
@@ -236,7 +697,7 @@ class DB_api(DB_connect.DB_connect):
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             ON CONFLICT (trackid) DO NOTHING
         """
-        return self._execute_query(query, data, commit=True)
+        return self._execute_query(query, data, commit=True, statement="insert_song_details")
 
     def insert_artist_details(self, data: Tuple) -> bool:
         """
@@ -253,7 +714,7 @@ class DB_api(DB_connect.DB_connect):
             VALUES (%s, %s, %s, %s, %s, %s)
             ON CONFLICT (artistid) DO NOTHING
         """
-        return self._execute_query(query, data, commit=True)
+        return self._execute_query(query, data, commit=True, statement="insert_artist_details")
 
     def insert_top_hundred_tracks(self, data: List[Tuple]) -> bool:
         """
@@ -265,13 +726,13 @@ class DB_api(DB_connect.DB_connect):
         Returns:
             bool: True if insertion was successful, False otherwise.
         """
-        query = """
-            INSERT INTO top_hundered_tracks (trackid, albumname, releasedate) 
-            VALUES (%s, %s, %s)
-            ON CONFLICT (trackid) DO NOTHING
-        """
         insert_data = [(d[0], d[3], d[4]) for d in data]
-        return self._execute_many_query(query, insert_data, commit=True)
+        return self._execute_bulk_insert(
+            "top_hundered_tracks",
+            ("trackid", "albumname", "releasedate"),
+            insert_data,
+            conflict_columns=("trackid",)
+        )
 
     def insert_albums(self, data: Tuple) -> bool:
         """
@@ -288,7 +749,7 @@ class DB_api(DB_connect.DB_connect):
             VALUES (%s, %s, %s, %s, %s, %s)
             ON CONFLICT (albumid) DO NOTHING
         """
-        return self._execute_query(query, data, commit=True)
+        return self._execute_query(query, data, commit=True, statement="insert_albums")
         
     def insert_song_popularity(self, data: Tuple) -> bool:
         """
@@ -305,7 +766,7 @@ class DB_api(DB_connect.DB_connect):
             VALUES (%s, %s)
             ON CONFLICT (trackid) DO UPDATE SET popularity = EXCLUDED.popularity
         """
-        return self._execute_query(query, data, commit=True)
+        return self._execute_query(query, data, commit=True, statement="insert_song_popularity")
 
     def insert_artist_popularity(self, data: Tuple) -> bool:
         """
@@ -322,7 +783,7 @@ class DB_api(DB_connect.DB_connect):
             VALUES (%s, %s)
             ON CONFLICT (artistid) DO UPDATE SET popularity = EXCLUDED.popularity
         """
-        return self._execute_query(query, data, commit=True)
+        return self._execute_query(query, data, commit=True, statement="insert_artist_popularity")
 
     def insert_artist_genre(self, data: Tuple) -> bool:
         """
@@ -339,7 +800,7 @@ class DB_api(DB_connect.DB_connect):
             VALUES (%s, %s)
             ON CONFLICT (artistid, genre) DO NOTHING
         """
-        return self._execute_query(query, data, commit=True)
+        return self._execute_query(query, data, commit=True, statement="insert_artist_genre")
 
     def insertmany_audio_features(self, data: List[Tuple]) -> bool:
         """
@@ -351,12 +812,30 @@ class DB_api(DB_connect.DB_connect):
         Returns:
             bool: True if insertion was successful, False otherwise.
         """
+        return self._execute_bulk_insert(
+            "audio_features",
+            ("spotify_track_id", "trackid", "danceability", "energy", "key", "loudness", "mode",
+             "speechiness", "acousticness", "instrumentalness", "liveness", "valence", "tempo"),
+            data,
+            conflict_columns=("spotify_track_id",)
+        )
+
+    def get_track_ids_with_audio_features(self, track_ids: List[str]) -> list:
+        """
+        Retrieves which of the given track IDs already have a row in audio_features.
+
+        Args:
+            track_ids (List[str]): A list of Spotify track IDs.
+
+        Returns:
+            list: List of tuples containing the track IDs that already have audio features.
+        """
         query = """
-            INSERT INTO audio_features (spotify_track_id, trackid, danceability, energy, key, loudness, mode, speechiness, acousticness, instrumentalness, liveness, valence, tempo)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (spotify_track_id) DO NOTHING
+            SELECT spotify_track_id
+            FROM audio_features
+            WHERE spotify_track_id = ANY(%s);
         """
-        return self._execute_many_query(query, data, commit=True)
+        return self._execute_fetch_query(query, (track_ids,), statement="get_track_ids_with_audio_features")
 
     def get_audio_features_for_top_100(self) -> list:
         """
@@ -370,7 +849,7 @@ class DB_api(DB_connect.DB_connect):
             FROM audio_features af
             JOIN top_hundered_tracks tht ON af.trackid = tht.trackid;
         """
-        return self._execute_fetch_query(query)
+        return self._execute_fetch_query(query, replica=True)
 
     def get_audio_features_for_tracks(self, track_ids: List[str]) -> list:
         """
@@ -387,7 +866,216 @@ class DB_api(DB_connect.DB_connect):
             FROM audio_features af
             WHERE af.trackid = ANY(%s);
         """
-        return self._execute_fetch_query(query, (track_ids,))
+        return self._execute_fetch_query(query, (track_ids,), statement="get_audio_features_for_tracks", replica=True)
+
+    # Signature that opens every binary COPY stream, followed by int32 flags and the header extension length.
+    copy_binary_signature = b"PGCOPY\n\xff\r\n\x00"
+
+    @staticmethod
+    def _decode_feature_copy(data, n_features: int) -> tuple:
+        """
+        Decodes a binary COPY of (text id, n_features x float4) rows into NumPy arrays.
+
+        Every row is int16 field count, then int32 length and bytes per field.
+        When all IDs have the same byte length (Spotify IDs are 22 characters)
+        the rows are fixed-width records and are decoded with one structured
+        view; otherwise the row offsets are walked once and the floats gathered
+        from them. No NULL fields are expected, the query coalesces them to NaN.
+
+        Args:
+            data: The COPY output, as bytes or any buffer.
+            n_features (int): Float columns after the ID.
+
+        Returns:
+            tuple: (ids, features) with ids a str array and features a C-contiguous (n, n_features) float32 array.
+        """
+        import numpy as np
+
+        data = memoryview(data)
+        signature = DB_api.copy_binary_signature
+        if bytes(data[:len(signature)]) != signature:
+            raise psycopg2.DataError("COPY output is not in binary format")
+        extension = int.from_bytes(data[len(signature) + 4:len(signature) + 8], "big")
+        body = data[len(signature) + 8 + extension:len(data) - 2]  # drop the int16 -1 trailer
+        feature_bytes = n_features * 8
+        empty = (np.empty(0, dtype=str), np.empty((0, n_features), dtype=np.float32))
+        if len(body) == 0:
+            return empty
+
+        field = np.dtype([("length", ">i4"), ("value", ">f4")])
+        id_length = int.from_bytes(body[2:6], "big", signed=True)
+        if id_length >= 0 and len(body) % (6 + id_length + feature_bytes) == 0:
+            record = np.dtype([("fields", ">i2"), ("id_length", ">i4"), ("id", f"S{id_length}"),
+                               ("features", field, (n_features,))])
+            rows = np.frombuffer(body, dtype=record)
+            if ((rows["fields"] == n_features + 1).all() and (rows["id_length"] == id_length).all()
+                    and (rows["features"]["length"] == 4).all()):
+                try:
+                    ids = rows["id"].astype(f"U{id_length}")  # ASCII, as Spotify IDs are
+                except UnicodeDecodeError:
+                    ids = np.char.decode(rows["id"], "utf-8")
+                return ids, np.ascontiguousarray(rows["features"]["value"], np.float32)
+
+        ids = []
+        starts = []
+        position = 0
+        while position < len(body):
+            id_length = max(int.from_bytes(body[position + 2:position + 6], "big", signed=True), 0)
+            ids.append(bytes(body[position + 6:position + 6 + id_length]).decode("utf-8"))
+            starts.append(position + 6 + id_length)
+            position += 6 + id_length + feature_bytes
+        raw = np.frombuffer(body, dtype=np.uint8)
+        gathered = raw[np.asarray(starts)[:, None] + np.arange(feature_bytes)]
+        features = gathered.view(field).reshape(len(starts), n_features)["value"]
+        return np.array(ids, dtype=str), np.ascontiguousarray(features, np.float32)
+
+    def _fetch_feature_matrix(self, source: str, data: Tuple = None) -> tuple:
+        """
+        Reads (trackid, audio_feature_columns) rows as NumPy arrays.
+
+        On PostgreSQL the rows come from a binary COPY of float4 columns, decoded
+        by _decode_feature_copy without building a Python object per value.
+        Embedded backends fall back to a regular fetch converted to float32.
+
+        Args:
+            source (str): FROM/JOIN/WHERE part of the query, selecting audio_features as af.
+            data (Tuple, optional): Parameters of `source`.
+
+        Returns:
+            tuple: (track_ids, features); empty arrays on error.
+        """
+        import numpy as np
+
+        n_features = len(self.audio_feature_columns)
+        empty = (np.empty(0, dtype=str), np.empty((0, n_features), dtype=np.float32))
+        if self.backend != "postgresql":
+            columns = ", ".join(f"af.{c}" for c in self.audio_feature_columns)
+            rows = self._execute_fetch_query(f"SELECT af.trackid, {columns} {source}", data, replica=True)
+            if not rows:
+                return empty
+            return (np.array([row[0] for row in rows], dtype=str),
+                    np.array([row[1:] for row in rows], dtype=np.float32))
+
+        columns = ", ".join(f"COALESCE(af.{c}::float4, 'NaN')" for c in self.audio_feature_columns)
+        conn = None
+        try:
+            conn = self.get_connection(replica=True)
+            if conn:
+                with conn.cursor() as cur:
+                    query = cur.mogrify(f"SELECT af.trackid, {columns} {source}", data)
+                    query = query.decode(extensions.encodings[conn.encoding])
+                    buffer = io.BytesIO()
+                    cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT binary)", buffer)
+                conn.rollback()
+                return self._decode_feature_copy(buffer.getbuffer(), n_features)
+        except (psycopg2.DatabaseError, Exception) as e:
+            print(f"Database error: {e}")
+            if conn:
+                conn.rollback()
+            return empty
+        finally:
+            if conn:
+                self.put_connection(conn)
+        return empty
+
+    def get_audio_feature_matrix_for_top_100(self) -> tuple:
+        """
+        Retrieves the audio features of the top 100 tracks as NumPy arrays.
+
+        Returns:
+            tuple: (track_ids, features) where track_ids is a str array and features a C-contiguous
+                (n, 11) float32 array in audio_feature_columns order, missing values as NaN.
+        """
+        return self._fetch_feature_matrix(
+            "FROM audio_features af JOIN top_hundered_tracks tht ON af.trackid = tht.trackid"
+        )
+
+    def get_audio_feature_matrix_for_tracks(self, track_ids: List[str]) -> tuple:
+        """
+        Retrieves the audio features of the given tracks as NumPy arrays.
+
+        Args:
+            track_ids (List[str]): A list of track IDs.
+
+        Returns:
+            tuple: (track_ids, features) where track_ids is a str array and features a C-contiguous
+                (n, 11) float32 array in audio_feature_columns order, missing values as NaN.
+        """
+        return self._fetch_feature_matrix("FROM audio_features af WHERE af.trackid = ANY(%s)", (track_ids,))
+
+    def refresh_materialized_views(self, concurrently: bool = True) -> bool:
+        """
+        Refreshes the materialized views and records when each was refreshed.
+
+        With concurrently=True readers keep seeing the previous rows while the
+        refresh runs instead of blocking on it. On an embedded backend the
+        views are tables, refilled from their vw_* views in one transaction.
+
+        Args:
+            concurrently (bool, optional): Use REFRESH ... CONCURRENTLY. Defaults to True.
+
+        Returns:
+            bool: True if every view was refreshed successfully, False otherwise.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            if conn:
+                for view in self.materialized_views:
+                    with conn.cursor() as cur:
+                        start = time.perf_counter()
+                        if self.backend == "postgresql":
+                            refresh = "REFRESH MATERIALIZED VIEW CONCURRENTLY {}" if concurrently \
+                                else "REFRESH MATERIALIZED VIEW {}"
+                            cur.execute(sql.SQL(refresh).format(sql.Identifier(view)))
+                        else:
+                            cur.execute(f"DELETE FROM {view}")
+                            cur.execute(f"INSERT INTO {view} SELECT * FROM vw_{view[len('mv_'):]}")
+                        duration_ms = int((time.perf_counter() - start) * 1000)
+                        cur.execute("""
+                            INSERT INTO materialized_view_refresh (view_name, refreshed_at, duration_ms)
+                            VALUES (%s, CURRENT_TIMESTAMP, %s)
+                            ON CONFLICT (view_name) DO UPDATE
+                            SET refreshed_at = EXCLUDED.refreshed_at, duration_ms = EXCLUDED.duration_ms
+                        """, (view, duration_ms))
+                    conn.commit()
+                    self.query_cache.invalidate((view, "materialized_view_refresh"))
+                return True
+        except (psycopg2.DatabaseError, Exception) as e:
+            print(f"Database error: {e}")
+            if conn:
+                conn.rollback()
+            return False
+        finally:
+            if conn:
+                self.put_connection(conn)
+        return False
+
+    def get_materialized_view_staleness(self) -> list:
+        """
+        Retrieves when each materialized view was last refreshed.
+
+        Returns:
+            list: List of tuples containing view name, refresh timestamp, age in seconds and refresh duration in ms.
+        """
+        if self.backend != "postgresql":
+            # Embedded backends store CURRENT_TIMESTAMP in UTC; the age is computed here.
+            rows = self._execute_fetch_query("""
+                SELECT view_name, refreshed_at, duration_ms
+                FROM materialized_view_refresh
+                ORDER BY view_name;
+            """)
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            return [(view, refreshed_at, int((now - refreshed_at).total_seconds()), duration_ms)
+                    for view, refreshed_at, duration_ms in rows]
+        query = """
+            SELECT view_name, refreshed_at,
+                   EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - refreshed_at))::int AS age_seconds,
+                   duration_ms
+            FROM materialized_view_refresh
+            ORDER BY view_name;
+        """
+        return self._execute_fetch_query(query, replica=True)
 
     def close_pool(self):
         """
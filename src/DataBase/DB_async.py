@@ -0,0 +1,386 @@
+import time
+from typing import Tuple, List, Sequence
+
+import asyncpg
+
+from .DB_connect import DB_connect
+from .DB_statements import to_positional
+
+"""
+asyncio counterpart of DB_api, backed by an asyncpg pool.
+
+Queries keep the %s placeholders used by DB_api (they are converted to
+$n once and cached), so the same SQL strings can run on either layer;
+Insights works unchanged on top of an AsyncDB_api, its methods then
+return coroutines. asyncpg prepares and caches statements per connection
+by itself, so the statement names used by DB_api are accepted and ignored.
+"""
+
+# psycopg2/libpq parameter names that asyncpg spells differently.
+PARAM_ALIASES = {"dbname": "database", "sslmode": "ssl"}
+
+
+class AsyncDB_api:
+    """
+    Class to interact with the database from a single event loop.
+    """
+    _load_config = DB_connect._load_config
+    _load_pool_config = DB_connect._load_pool_config
+    POOL_DEFAULTS = DB_connect.POOL_DEFAULTS
+    materialized_views = ("mv_track_details", "mv_genre_popularity")
+
+    def __init__(self):
+        """
+        Reads the [postgresql] and [pool] sections of database.ini; the pool is
+        created by connect() (or `async with AsyncDB_api() as db`).
+        """
+        self.pool = None
+        self._queries = {}
+        self._config = {PARAM_ALIASES.get(k, k): v for k, v in self._load_config().items()}
+        if "port" in self._config:
+            self._config["port"] = int(self._config["port"])
+        self._pool_config = self._load_pool_config()
+
+    async def connect(self) -> "AsyncDB_api":
+        try:
+            self.pool = await asyncpg.create_pool(
+                min_size=self._pool_config["minconn"],
+                max_size=self._pool_config["maxconn"],
+                max_inactive_connection_lifetime=self._pool_config["max_idle"],
+                **self._config
+            )
+            print("Async connection pool to PostgreSQL DB successful")
+        except (asyncpg.PostgresError, OSError) as e:
+            print(f"Error occurred while connecting to PostgreSQL DB: {e}")
+            self.pool = None
+        return self
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.close_pool()
+
+    def _positional(self, query: str) -> str:
+        converted = self._queries.get(query)
+        if converted is None:
+            converted = self._queries[query] = to_positional(query)[0]
+        return converted
+
+    def _acquire(self):
+        if not self.pool:
+            raise Exception("Async connection pool is not initialized.")
+        return self.pool.acquire(timeout=self._pool_config["timeout"])
+
+    async def _execute_query(self, query: str, data: Tuple = None, commit: bool = False, statement: str = None) -> bool:
+        """
+        Executes a single SQL query with optional data.
+
+        Args:
+            query (str): The SQL query to execute, with %s placeholders.
+            data (Tuple, optional): The data to pass to the query. Defaults to None.
+            commit (bool, optional): Kept for parity with DB_api; asyncpg autocommits single statements.
+            statement (str, optional): Ignored, asyncpg caches prepared statements itself.
+
+        Returns:
+            bool: True if the query executed successfully, False otherwise.
+        """
+        try:
+            async with self._acquire() as conn:
+                await conn.execute(self._positional(query), *(data or ()))
+            return True
+        except Exception as e:
+            print(f"Database error: {e}")
+            return False
+
+    async def _execute_fetch_query(self, query: str, data: Tuple = None, statement: str = None,
+                                   replica: bool = False) -> List:
+        """
+        Executes a fetch SQL query and returns the results.
+
+        Args:
+            query (str): The SQL query to execute, with %s placeholders.
+            data (Tuple, optional): The data to pass to the query. Defaults to None.
+            statement (str, optional): Ignored, asyncpg caches prepared statements itself.
+            replica (bool, optional): Ignored, the async layer only talks to the primary.
+
+        Returns:
+            List: The fetched results as a list of tuples.
+        """
+        try:
+            async with self._acquire() as conn:
+                rows = await conn.fetch(self._positional(query), *(data or ()))
+            return [tuple(row) for row in rows]
+        except Exception as e:
+            print(f"Database error: {e}")
+            return []
+
+    async def _execute_many_query(self, query: str, data: List[Tuple], commit: bool = False) -> bool:
+        """
+        Executes a SQL query for multiple sets of data in one transaction.
+
+        Returns:
+            bool: True if the query executed successfully, False otherwise.
+        """
+        try:
+            async with self._acquire() as conn:
+                await conn.executemany(self._positional(query), data)
+            return True
+        except Exception as e:
+            print(f"Database error: {e}")
+            return False
+
+    async def _execute_bulk_insert(self, table: str, columns: Sequence[str], rows: Sequence[Tuple],
+                                   conflict_columns: Sequence[str], update_columns: Sequence[str] = None) -> bool:
+        """
+        Bulk loads rows with binary COPY into a temporary table and merges them with ON CONFLICT.
+
+        Args:
+            table (str): Target table name.
+            columns (Sequence[str]): Target columns, in the order of each row tuple.
+            rows (Sequence[Tuple]): Rows to load.
+            conflict_columns (Sequence[str]): Columns of the unique key used for ON CONFLICT.
+            update_columns (Sequence[str], optional): Columns overwritten on conflict.
+
+        Returns:
+            bool: True if the rows were written successfully, False otherwise.
+        """
+        if not rows:
+            return True
+        column_list = ", ".join(columns)
+        conflict_list = ", ".join(conflict_columns)
+        if update_columns:
+            on_conflict = "DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+        else:
+            on_conflict = "DO NOTHING"
+        staging = f"_bulk_{table}"
+        try:
+            async with self._acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(f"DROP TABLE IF EXISTS {staging}")
+                    await conn.execute(
+                        f"CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+                    await conn.copy_records_to_table(staging, records=rows, columns=list(columns))
+                    await conn.execute(
+                        f"INSERT INTO {table} ({column_list}) "
+                        f"SELECT DISTINCT ON ({conflict_list}) {column_list} FROM {staging} "
+                        f"ON CONFLICT ({conflict_list}) {on_conflict}")
+            return True
+        except Exception as e:
+            print(f"Database error: {e}")
+            return False
+
+    async def get_top_hundred_with_artist_info(self) -> list:
+        """
+        Retrieves all track IDs and artist IDs from the top_hundered_tracks table.
+        """
+        query = """
+            SELECT t.trackid, ti.artistid
+            FROM top_hundered_tracks t
+            JOIN trackinfo ti ON t.trackid = ti.trackid;
+        """
+        return await self._execute_fetch_query(query)
+
+    async def get_top_hundred_tracks_for_display(self) -> list:
+        """
+        Retrieves top 100 tracks with track name, artist name, album name, and release date.
+        """
+        query = """
+            SELECT ti.trackname, ti.artistname, t.albumname, t.releasedate
+            FROM top_hundered_tracks t
+            JOIN trackinfo ti ON t.trackid = ti.trackid;
+        """
+        return await self._execute_fetch_query(query)
+
+    async def get_track_infos(self, track_ids: List[str]) -> list:
+        """
+        Retrieves track information for a given list of track IDs.
+        """
+        query = "SELECT * FROM trackinfo WHERE trackid = ANY(%s);"
+        return await self._execute_fetch_query(query, (track_ids,))
+
+    async def get_track_ids_with_audio_features(self, track_ids: List[str]) -> list:
+        """
+        Retrieves which of the given track IDs already have a row in audio_features.
+        """
+        query = "SELECT spotify_track_id FROM audio_features WHERE spotify_track_id = ANY(%s);"
+        return await self._execute_fetch_query(query, (track_ids,))
+
+    async def get_audio_features_for_top_100(self) -> list:
+        """
+        Retrieves audio features for the top 100 tracks.
+        """
+        query = """
+            SELECT af.*
+            FROM audio_features af
+            JOIN top_hundered_tracks tht ON af.trackid = tht.trackid;
+        """
+        return await self._execute_fetch_query(query)
+
+    async def get_audio_features_for_tracks(self, track_ids: List[str]) -> list:
+        """
+        Retrieves audio features for a given list of track IDs.
+        """
+        query = "SELECT af.* FROM audio_features af WHERE af.trackid = ANY(%s);"
+        return await self._execute_fetch_query(query, (track_ids,))
+
+    async def insert_user_info(self, data: str) -> bool:
+        """
+        Inserts a new user into the user_info table.
+        """
+        return await self._execute_query("insert into user_info (username) values (%s)", (data,))
+
+    async def insert_track_info(self, data: Tuple) -> bool:
+        """
+        Inserts track information into the trackinfo table.
+        """
+        return await self.insert_track_infos_bulk([data])
+
+    async def insert_track_infos_bulk(self, data: List[Tuple]) -> bool:
+        """
+        Bulk inserts multiple track information records into the trackinfo table.
+        """
+        return await self._execute_bulk_insert(
+            "trackinfo", ("trackid", "trackname", "artistname", "artistid", "releasedate"), data,
+            conflict_columns=("trackid",))
+
+    async def insert_top_hundred_tracks(self, data: List[Tuple]) -> bool:
+        """
+        Bulk inserts top 100 tracks into the top_hundered_tracks table.
+
+        Args:
+            data (List[Tuple]): Tuples of (trackid, trackname, artistname, albumname, releasedate).
+        """
+        return await self._execute_bulk_insert(
+            "top_hundered_tracks", ("trackid", "albumname", "releasedate"), [(d[0], d[3], d[4]) for d in data],
+            conflict_columns=("trackid",))
+
+    async def insert_song_details(self, data: Tuple) -> bool:
+        """
+        Inserts song details into the songdetails table.
+        """
+        query = """
+            INSERT INTO songdetails (trackid, trackname, artistname, albumname, releasedate, durationms, popularity, explicit, tracknumber, discnumber, previewurl, spotifyurl)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (trackid) DO NOTHING
+        """
+        return await self._execute_query(query, data)
+
+    async def insert_artist_details(self, data: Tuple) -> bool:
+        """
+        Inserts artist details into the artistdetails table.
+        """
+        query = """
+            INSERT INTO artistdetails (artistid, artistname, genres, popularity, followers, spotifyurl)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (artistid) DO NOTHING
+        """
+        return await self._execute_query(query, data)
+
+    async def insert_albums(self, data: Tuple) -> bool:
+        """
+        Inserts album information into the albums table.
+        """
+        query = """
+            INSERT INTO albums (albumid, albumname, releasedate, artistid, spotifyurl, totaltracks)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (albumid) DO NOTHING
+        """
+        return await self._execute_query(query, data)
+
+    async def insert_song_popularity(self, data: Tuple) -> bool:
+        """
+        Inserts or updates song popularity in the song_popularity table.
+        """
+        query = """
+            INSERT INTO song_popularity (trackid, popularity)
+            VALUES (%s, %s)
+            ON CONFLICT (trackid) DO UPDATE SET popularity = EXCLUDED.popularity
+        """
+        return await self._execute_query(query, data)
+
+    async def insert_artist_popularity(self, data: Tuple) -> bool:
+        """
+        Inserts or updates artist popularity in the artist_popularity table.
+        """
+        query = """
+            INSERT INTO artist_popularity (artistid, popularity)
+            VALUES (%s, %s)
+            ON CONFLICT (artistid) DO UPDATE SET popularity = EXCLUDED.popularity
+        """
+        return await self._execute_query(query, data)
+
+    async def insert_artist_genre(self, data: Tuple) -> bool:
+        """
+        Inserts artist genre into the artist_genres table.
+        """
+        query = """
+            INSERT INTO artist_genres (artistid, genre)
+            VALUES (%s, %s)
+            ON CONFLICT (artistid, genre) DO NOTHING
+        """
+        return await self._execute_query(query, data)
+
+    async def insertmany_audio_features(self, data: List[Tuple]) -> bool:
+        """
+        Inserts audio features for multiple tracks into the audio_features table.
+        """
+        return await self._execute_bulk_insert(
+            "audio_features",
+            ("spotify_track_id", "trackid", "danceability", "energy", "key", "loudness", "mode",
+             "speechiness", "acousticness", "instrumentalness", "liveness", "valence", "tempo"),
+            data,
+            conflict_columns=("spotify_track_id",))
+
+    async def refresh_materialized_views(self, concurrently: bool = True) -> bool:
+        """
+        Refreshes the materialized views and records when each was refreshed.
+        """
+        refresh = "REFRESH MATERIALIZED VIEW CONCURRENTLY" if concurrently else "REFRESH MATERIALIZED VIEW"
+        try:
+            async with self._acquire() as conn:
+                for view in self.materialized_views:
+                    start = time.perf_counter()
+                    async with conn.transaction():
+                        await conn.execute(f"{refresh} {view}")
+                        await conn.execute("""
+                            INSERT INTO materialized_view_refresh (view_name, refreshed_at, duration_ms)
+                            VALUES ($1, CURRENT_TIMESTAMP, $2)
+                            ON CONFLICT (view_name) DO UPDATE
+                            SET refreshed_at = EXCLUDED.refreshed_at, duration_ms = EXCLUDED.duration_ms
+                        """, view, int((time.perf_counter() - start) * 1000))
+            return True
+        except Exception as e:
+            print(f"Database error: {e}")
+            return False
+
+    async def get_materialized_view_staleness(self) -> list:
+        """
+        Retrieves when each materialized view was last refreshed.
+        """
+        query = """
+            SELECT view_name, refreshed_at,
+                   EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - refreshed_at))::int AS age_seconds,
+                   duration_ms
+            FROM materialized_view_refresh
+            ORDER BY view_name;
+        """
+        return await self._execute_fetch_query(query)
+
+    def pool_stats(self) -> dict:
+        """
+        Reports pool size and idle connections.
+        """
+        if not self.pool:
+            return {}
+        return {"size": self.pool.get_size(), "idle": self.pool.get_idle_size(),
+                "maxconn": self.pool.get_max_size()}
+
+    async def close_pool(self):
+        """
+        Closes all connections in the connection pool.
+        """
+        if self.pool:
+            await self.pool.close()
+            print("Async connection pool to PostgreSQL DB closed.")
+            self.pool = None
@@ -0,0 +1,197 @@
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import psycopg2
+
+"""
+Write-behind buffer for the enrichment tables.
+
+Rows are collected per table and written in one transaction once the
+buffer holds enough rows or its oldest row is old enough, instead of
+checking out a pooled connection and committing for every single row.
+A background timer flushes rows that are still waiting after max_age.
+"""
+
+
+class WriteBuffer:
+    # table -> (columns, conflict columns, columns updated on conflict).
+    # Insertion order is the flush order, parents before the tables referencing them.
+    TABLES = {
+        "artistdetails": (
+            ("artistid", "artistname", "genres", "popularity", "followers", "spotifyurl"),
+            ("artistid",), None),
+        "artist_popularity": (
+            ("artistid", "popularity"),
+            ("artistid",), ("popularity",)),
+        "albums": (
+            ("albumid", "albumname", "releasedate", "artistid", "spotifyurl", "totaltracks"),
+            ("albumid",), None),
+        "artist_genres": (
+            ("artistid", "genre"),
+            ("artistid", "genre"), None),
+        "songdetails": (
+            ("trackid", "trackname", "artistname", "albumname", "releasedate", "durationms", "popularity",
+             "explicit", "tracknumber", "discnumber", "previewurl", "spotifyurl"),
+            ("trackid",), None),
+        "song_popularity": (
+            ("trackid", "popularity"),
+            ("trackid",), ("popularity",)),
+    }
+
+    def __init__(self, db_api, max_rows: int = 500, max_age: float = 5.0):
+        """
+        Args:
+            db_api: DB_api instance providing pooled connections and the bulk insert helper.
+            max_rows: Buffered rows (over all tables) that trigger a flush.
+            max_age: Seconds the oldest buffered row may wait before a flush;
+                a timer flushes it even when no further rows are added.
+        """
+        self.db_api = db_api
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # Flushes are serialized so a child row never commits before its parent.
+        self._flush_lock = threading.Lock()
+        self._pending = {table: {} for table in self.TABLES}
+        self._pending_rows = 0
+        self._oldest = None
+        self._timer = None
+        self._stats = {"flushes": 0, "rows": 0, "failed_rows": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def add(self, table: str, row: Tuple) -> None:
+        """
+        Buffers one row; a later row with the same key replaces the earlier one.
+
+        Args:
+            table (str): One of the tables in TABLES.
+            row (Tuple): Values in the column order of that table.
+        """
+        columns, conflict_columns, _ = self.TABLES[table]
+        key = tuple(row[columns.index(c)] for c in conflict_columns)
+        with self._lock:
+            pending = self._pending[table]
+            if key not in pending:
+                self._pending_rows += 1
+            pending[key] = row
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._timer = threading.Timer(self.max_age, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            due = self._pending_rows >= self.max_rows or time.monotonic() - self._oldest >= self.max_age
+        if due:
+            self.flush()
+
+    def flush(self) -> bool:
+        """
+        Writes every buffered row in one transaction, table by table in FK order.
+
+        Each table is merged under its own savepoint. If the merge fails
+        (e.g. an album whose artist is unknown), that table's rows are
+        retried one by one, so only the rejected rows are reported and dropped.
+        Rejected rows are not kept for a later flush, so parents should be
+        added before the rows referencing them.
+
+        Returns:
+            bool: True if all buffered rows were written, False otherwise.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {table: {} for table in self.TABLES}
+                rows = self._pending_rows
+                self._pending_rows = 0
+                self._oldest = None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not rows:
+                return True
+
+            start = time.perf_counter()
+            failed = 0
+            conn = None
+            try:
+                conn = self.db_api.get_connection()
+                if not conn:
+                    failed = rows
+                    return False
+                with conn.cursor() as cur:
+                    for table, (columns, conflict_columns, update_columns) in self.TABLES.items():
+                        table_rows = list(pending[table].values())
+                        if not table_rows:
+                            continue
+                        cur.execute("SAVEPOINT write_buffer")
+                        try:
+                            self.db_api._bulk_insert(cur, table, columns, table_rows, conflict_columns, update_columns)
+                            cur.execute("RELEASE SAVEPOINT write_buffer")
+                        except psycopg2.DatabaseError as e:
+                            print(f"Database error while flushing {len(table_rows)} rows into {table}, "
+                                  f"retrying row by row: {e}")
+                            cur.execute("ROLLBACK TO SAVEPOINT write_buffer")
+                            failed += self._insert_rows_singly(cur, table, table_rows)
+                conn.commit()
+                self.db_api.query_cache.invalidate(t for t in self.TABLES if pending[t])
+                return failed == 0
+            except (psycopg2.DatabaseError, Exception) as e:
+                print(f"Database error: {e}")
+                if conn:
+                    conn.rollback()
+                failed = rows
+                return False
+            finally:
+                if conn:
+                    self.db_api.put_connection(conn)
+                elapsed = (time.perf_counter() - start) * 1000
+                with self._lock:
+                    self._stats["flushes"] += 1
+                    self._stats["rows"] += rows - failed
+                    self._stats["failed_rows"] += failed
+                    self._stats["total_ms"] += elapsed
+                    self._stats["last_ms"] = elapsed
+                    self._stats["max_ms"] = max(self._stats["max_ms"], elapsed)
+
+    def _insert_rows_singly(self, cur, table: str, table_rows: List[Tuple]) -> int:
+        """
+        Merges rows one at a time under a savepoint each, after the batch merge of a table failed.
+
+        Returns:
+            int: Number of rows that were rejected.
+        """
+        columns, conflict_columns, update_columns = self.TABLES[table]
+        rejected = 0
+        for row in table_rows:
+            cur.execute("SAVEPOINT write_buffer_row")
+            try:
+                self.db_api._bulk_insert(cur, table, columns, [row], conflict_columns, update_columns,
+                                         use_copy=False)
+                cur.execute("RELEASE SAVEPOINT write_buffer_row")
+            except psycopg2.DatabaseError as e:
+                cur.execute("ROLLBACK TO SAVEPOINT write_buffer_row")
+                rejected += 1
+                key = tuple(row[columns.index(c)] for c in conflict_columns)
+                print(f"Dropped row {key} of {table}: {e}")
+        return rejected
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Reports flush count, rows written per flush and flush latency in milliseconds.
+        """
+        with self._lock:
+            flushes = self._stats["flushes"]
+            return {
+                "flushes": flushes,
+                "rows": self._stats["rows"],
+                "failed_rows": self._stats["failed_rows"],
+                "pending_rows": self._pending_rows,
+                "rows_per_flush": round(self._stats["rows"] / flushes, 1) if flushes else 0.0,
+                "mean_flush_ms": round(self._stats["total_ms"] / flushes, 2) if flushes else 0.0,
+                "max_flush_ms": round(self._stats["max_ms"], 2),
+                "last_flush_ms": round(self._stats["last_ms"], 2),
+            }
@@ -0,0 +1,151 @@
+import functools
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable
+
+"""
+In-process cache for read query results.
+
+Results are kept for a TTL in a size-bounded LRU and tagged with the
+tables they were computed from. DB_api reports every table it writes to,
+which drops the tagged results immediately instead of waiting for the TTL.
+While a read replica may still lag behind such a write, results for the
+written tables are served but not stored again.
+"""
+
+WRITTEN_TABLE = re.compile(
+    r"\b(?:insert\s+into|update|delete\s+from|truncate(?:\s+table)?|"
+    r"refresh\s+materialized\s+view(?:\s+concurrently)?)\s+\"?([\w.]+)\"?",
+    re.IGNORECASE
+)
+
+
+def written_tables(query: str) -> set:
+    """
+    Returns the lowercased names of the tables a SQL statement writes to.
+    """
+    return {name.split(".")[-1].lower() for name in WRITTEN_TABLE.findall(query)}
+
+
+class QueryCache:
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        """
+        Args:
+            max_entries: Results kept before the least recently used one is evicted.
+            ttl: Seconds a result is served before it is recomputed.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_table = {}
+        # Bumped on every invalidation so results computed across a write are not stored.
+        self.generation = 0
+        # Seconds after a write during which results for the written tables are not stored,
+        # set by DB_api to the tolerated replica lag when a read replica is configured.
+        self.replica_lag = 0.0
+        self._written_at = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    _MISSING = object()
+
+    def get(self, key):
+        """
+        Returns the cached result for a key, or QueryCache._MISSING when absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self._stats["misses"] += 1
+                return self._MISSING
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key, value, tables: Iterable[str], generation: int = None) -> None:
+        """
+        Stores a result tagged with its tables; skipped when an invalidation
+        happened after `generation` was read, since the result may predate it,
+        or when one of the tables was written within `replica_lag` seconds,
+        since a replica may have served the result from before that write.
+        """
+        tables = frozenset(t.lower() for t in tables)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if self.replica_lag > 0:
+                settled = time.monotonic() - self.replica_lag
+                if any(self._written_at.get(table, settled) > settled for table in tables):
+                    return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, tables)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _drop(self, key) -> None:
+        _, _, tables = self._entries.pop(key)
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys:
+                keys.discard(key)
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        """
+        Drops every result that depends on one of the given tables.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.generation += 1
+            for table in tables:
+                self._written_at[table.lower()] = now
+                for key in list(self._by_table.pop(table.lower(), ())):
+                    if key in self._entries:
+                        self._drop(key)
+                        self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._written_at.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return dict(self._stats,
+                        entries=len(self._entries),
+                        hitRate=round(self._stats["hits"] / lookups, 3) if lookups else 0.0)
+
+
+def cached(*tables: str):
+    """
+    Memoizes a method of an object holding a `db_api`, keyed by method and arguments.
+
+    The result is tagged with the given tables, so a DB_api write to any of
+    them invalidates it. Empty results (e.g. from a failed query) are not cached.
+    A db_api without a query_cache (AsyncDB_api) is called straight through.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self.db_api, "query_cache", None)
+            if cache is None:
+                return func(self, *args, **kwargs)
+            key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+            value = cache.get(key)
+            if value is QueryCache._MISSING:
+                generation = cache.generation
+                value = func(self, *args, **kwargs)
+                if value:
+                    cache.put(key, value, tables, generation)
+            return list(value) if isinstance(value, list) else value
+        return wrapper
+    return decorator
@@ -1,9 +1,17 @@
 import psycopg2
 import os
 import sys
+import threading
+import time
 
 from configparser import ConfigParser
-from psycopg2 import pool  # Explicitly import the pool module
+
+try:
+    from .DB_pool import BlockingConnectionPool
+    from .DB_local import LocalConnectionPool
+except ImportError:
+    from DB_pool import BlockingConnectionPool
+    from DB_local import LocalConnectionPool
 
 """
 This file contains the utility to connect to the postgres database
@@ -14,13 +22,35 @@ and perform certain sql queries.
 class DB_connect:
     def __init__(self):
         self.pool = None
+        # 'postgresql', or an embedded backend from the [storage] section, see _connect_local
+        self.backend = "postgresql"
+        # Optional read replica, see _connect_replica
+        self.replica_pool = None
+        self.max_replica_lag = 30.0
+        self.replica_check_interval = 5.0
+        self._replica_lock = threading.Lock()  # held by the thread checking replica lag
+        self._replica_conns_lock = threading.Lock()
+        self._replica_conns = set()
+        self._replica_state = {"healthy": False, "lag": None, "checked_at": 0.0,
+                               "replica_reads": 0, "primary_fallbacks": 0}
         self._connect()  # Call the internal connection method during initialization
 
-    def _load_config(self, filename: str = 'database.ini', section: str = 'postgresql') -> dict:
+    # Pool settings used when database.ini has no [pool] section (or leaves a key out).
+    POOL_DEFAULTS = {
+        "minconn": 1,
+        "maxconn": 10,
+        "timeout": 30.0,
+        "max_idle": 300.0,
+        "max_lifetime": 3600.0,
+        "validate_after": 30.0,
+    }
+
+    def _load_config(self, filename: str = 'database.ini', section: str = 'postgresql', required: bool = True) -> dict:
         """
         Load database configuration from the file
         :param filename: name of the configuration file
         :param section: section of database configuration
+        :param required: raise if the section is missing, otherwise return an empty dictionary
         :return: a dictionary of database parameters
         """
 
@@ -51,36 +81,150 @@ class DB_connect:
             params = parser.items(section)
             for param in params:
                 config[param[0]] = param[1]
-        else:
+        elif required:
             raise Exception(f'Section {section} not found in the {filename} file')
 
         return config
 
+    def _load_pool_config(self) -> dict:
+        """
+        Load the optional [pool] section, converted to the types of POOL_DEFAULTS
+        :return: a dictionary of pool settings
+        """
+        config = dict(self.POOL_DEFAULTS)
+        for key, value in self._load_config(section='pool', required=False).items():
+            if key in config:
+                config[key] = type(self.POOL_DEFAULTS[key])(value)
+            else:
+                print(f"Ignoring unknown pool setting '{key}'")
+        return config
+
     def _connect(self):
         """
-        Connect to the PostgreSQL database server and create a connection pool.
+        Connect to the PostgreSQL database server and create a connection pool,
+        or open the embedded database chosen in the optional [storage] section.
         This pool will remain open until explicitly closed by the class instance.
         :return: None
         """
 
         try:
+            storage = self._load_config(section='storage', required=False)
+            self.backend = storage.get('backend', 'postgresql').lower()
+            if self.backend != 'postgresql':
+                self._connect_local(storage)
+                return
             config_params = self._load_config()
+            pool_params = self._load_pool_config()
 
-            self.pool = pool.ThreadedConnectionPool(minconn=1,
-                                                    maxconn=10,
-                                                    **config_params
-                                                    )
+            self.pool = BlockingConnectionPool(**pool_params, **config_params)
             print("Connection Pooling to PostgreSQL DB successful")
 
         except (psycopg2.DatabaseError, Exception) as e:
             print(f"Error occurred while connecting to PostgreSQL DB: {e}")
             self.pool = None
 
-    def get_connection(self):
+        self._connect_replica()
+
+    def _connect_local(self, storage: dict):
+        """
+        Open an embedded database instead of PostgreSQL, selected by the
+        optional [storage] section: backend is sqlite or duckdb (columnar, for
+        aggregate-heavy analysis) and path the database file, created with
+        local_schema.sql on first use. No server or read replica is involved.
+        :param storage: the [storage] section
+        :return: None
+        """
+        try:
+            default_path = os.path.join(os.path.dirname(__file__), f"music_analyzer.{self.backend}")
+            path = storage.get('path', default_path)
+            self.pool = LocalConnectionPool(self.backend, path, **self._load_pool_config())
+            print(f"Opened {self.backend} database at {path}")
+        except Exception as e:
+            print(f"Error occurred while opening the {self.backend} database: {e}")
+            self.pool = None
+
+    # Replica lag in seconds; zero when the replica has replayed everything it received.
+    REPLICA_LAG_QUERY = """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """
+
+    def _connect_replica(self):
+        """
+        Create a second pool for the optional [postgresql_replica] section.
+        Besides connection parameters the section may set max_lag (seconds of
+        replication lag tolerated before reads fall back to the primary) and
+        lag_check_interval (seconds between lag checks).
+        :return: None
         """
-        Retrieves a connection from the pool.
+        try:
+            config_params = self._load_config(section='postgresql_replica', required=False)
+            if not config_params:
+                return
+            self.max_replica_lag = float(config_params.pop('max_lag', self.max_replica_lag))
+            self.replica_check_interval = float(config_params.pop('lag_check_interval', self.replica_check_interval))
+            self.replica_pool = BlockingConnectionPool(**self._load_pool_config(), **config_params)
+            print("Connection Pooling to PostgreSQL replica successful")
+        except (psycopg2.DatabaseError, Exception) as e:
+            print(f"Error occurred while connecting to PostgreSQL replica, reads will use the primary: {e}")
+            self.replica_pool = None
+
+    def _replica_usable(self) -> bool:
+        """
+        Whether reads may go to the replica; the lag is re-checked at most every
+        replica_check_interval seconds, by one thread at a time.
+        :return: True if the replica is reachable and within max_replica_lag
+        """
+        if not self.replica_pool:
+            return False
+        state = self._replica_state
+        if time.monotonic() - state["checked_at"] < self.replica_check_interval:
+            return state["healthy"]
+        if not self._replica_lock.acquire(blocking=False):
+            return state["healthy"]
+        conn = None
+        try:
+            conn = self.replica_pool.getconn()
+            with conn.cursor() as cur:
+                cur.execute(self.REPLICA_LAG_QUERY)
+                lag = float(cur.fetchone()[0])
+            conn.rollback()
+            if state["healthy"] and lag > self.max_replica_lag:
+                print(f"Replica lag {lag:.1f}s exceeds {self.max_replica_lag}s, reading from the primary.")
+            state["lag"] = lag
+            state["healthy"] = lag <= self.max_replica_lag
+        except Exception as e:
+            if state["healthy"]:
+                print(f"Replica unavailable, reading from the primary: {e}")
+            state["healthy"] = False
+        finally:
+            if conn:
+                self.replica_pool.putconn(conn)
+            state["checked_at"] = time.monotonic()
+            self._replica_lock.release()
+        return state["healthy"]
+
+    def get_connection(self, replica: bool = False):
+        """
+        Retrieves a connection from the pool, waiting up to the pool timeout when all are in use.
+        :param replica: read-only callers may be served by the replica when one is configured and not lagging
         :return: A psycopg2 connection object or None if an error occurs.
         """
+        if replica and self.replica_pool:
+            if self._replica_usable():
+                try:
+                    conn = self.replica_pool.getconn()
+                    with self._replica_conns_lock:
+                        self._replica_conns.add(id(conn))
+                    self._replica_state["replica_reads"] += 1
+                    return conn
+                except Exception as e:
+                    print(f"Error getting connection from replica pool: {e}")
+                    self._replica_state["healthy"] = False
+            self._replica_state["primary_fallbacks"] += 1
         if self.pool:
             try:
                 conn = self.pool.getconn()
@@ -97,7 +241,14 @@ class DB_connect:
         :param conn: The psycopg2 connection object to return.
         :return: None
         """
-        if self.pool and conn:
+        if conn and id(conn) in self._replica_conns:
+            with self._replica_conns_lock:
+                self._replica_conns.discard(id(conn))
+            try:
+                self.replica_pool.putconn(conn)
+            except Exception as e:
+                print(f"Error putting connection back to replica pool: {e}")
+        elif self.pool and conn:
             try:
                 self.pool.putconn(conn)
             except Exception as e:
@@ -106,6 +257,20 @@ class DB_connect:
             print("Connection pool is not initialized, cannot return connection.")
 
 
+    def pool_stats(self) -> dict:
+        """
+        Reports pool size, wait times, checkout durations and saturation.
+        :return: a dictionary of pool metrics, empty if the pool is not initialized
+        """
+        stats = self.pool.stats() if self.pool else {}
+        if self.replica_pool:
+            stats["replica"] = dict(self.replica_pool.stats(),
+                                    lag=self._replica_state["lag"],
+                                    healthy=self._replica_state["healthy"],
+                                    replica_reads=self._replica_state["replica_reads"],
+                                    primary_fallbacks=self._replica_state["primary_fallbacks"])
+        return stats
+
     def closeall(self):
         """
         Closes all connections in the pool.
@@ -114,8 +279,13 @@ class DB_connect:
 
         if self.pool:
             self.pool.closeall()
-            print("Connection pool to PostgreSQL DB closed.")
+            target = "PostgreSQL DB" if self.backend == "postgresql" else f"{self.backend} database"
+            print(f"Connection pool to {target} closed.")
             self.pool = None
+        if self.replica_pool:
+            self.replica_pool.closeall()
+            print("Connection pool to PostgreSQL replica closed.")
+            self.replica_pool = None
 
 
 """
@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import sys
+
+import psycopg2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DataBase.DB_migrate import DB_migrate
+
+"""
+Checks that the hot queries use index scans at catalog scale.
+
+Builds a scratch schema from init.sql, the migrations and
+AdvanceSelectQueries.sql, seeds it with generate_series (1M tracks by
+default), runs EXPLAIN (FORMAT JSON) on the queries from Insights, DB_api
+and AdvanceSelectQueries.sql, and fails when one of them seq-scans a table
+it should reach through an index. The scratch schema is dropped afterwards.
+"""
+
+SCHEMA_DIR = os.path.dirname(__file__)
+SCRATCH_SCHEMA = "index_check"
+
+SEED_SQL = """
+    insert into user_info (username)
+    select 'user_' || u from generate_series(1, %(users)s) u;
+
+    insert into artistDetails (artistID, artistName, genres, popularity, followers, spotifyUrl)
+    select 'artist_' || a, 'Artist ' || a, 'genre_' || (a %% 500), (a * 7919) %% 101, a * 13, null
+    from generate_series(1, %(artists)s) a;
+
+    insert into Artist_Genres (artistID, genre)
+    select 'artist_' || a, 'genre_' || ((a + g * 37) %% 500)
+    from generate_series(1, %(artists)s) a, generate_series(0, 1) g;
+
+    insert into trackinfo (trackID, trackName, artistName, artistID, releaseDate)
+    select 'track_' || t, 'Track ' || t, 'Artist ' || (t %% %(artists)s + 1), 'artist_' || (t %% %(artists)s + 1), '2020-01-01'
+    from generate_series(1, %(tracks)s) t;
+
+    insert into song_Popularity (trackID, popularity)
+    select 'track_' || t, (t * 7907) %% 101 from generate_series(1, %(tracks)s) t;
+
+    insert into songDetails (trackID, trackName, artistName, albumName, popularity)
+    select 'track_' || t, 'Track ' || t, 'Artist ' || (t %% %(artists)s + 1), 'Album ' || (t / 10), (t * 7907) %% 101
+    from generate_series(1, %(tracks)s) t;
+
+    insert into audio_features (spotify_track_id, trackID, danceability, energy, key, loudness, mode,
+                                speechiness, acousticness, instrumentalness, liveness, valence, tempo)
+    select 'track_' || t, 'track_' || t, random(), random(), (t %% 12), -60 * random(), (t %% 2),
+           random(), random(), random(), random(), random(), 60 + 120 * random()
+    from generate_series(1, %(tracks)s) t;
+
+    select ensure_listening_history_partitions((now() - (%(history)s || ' minutes')::interval)::timestamp,
+                                               now()::timestamp);
+
+    insert into User_Listening_History (userID, trackID, listenTimestamp)
+    select u.id, 'track_' || (1 + (h * 104729) %% %(tracks)s), now() - (h || ' minutes')::interval
+    from generate_series(1, %(history)s) h
+    join (select id, row_number() over () as n from user_info) u on u.n = 1 + h %% %(users)s;
+
+    refresh materialized view mv_track_details;
+    refresh materialized view mv_genre_popularity;
+    analyze;
+"""
+
+# name -> (query, params, tables that must not be seq-scanned)
+CHECKS = {
+    "Insights.get_top_artists_by_popularity": (
+        """
+            SELECT artistName, popularity, followers, genres
+            FROM artistDetails
+            ORDER BY popularity DESC
+            LIMIT %s;
+        """, (10,), {"artistdetails"}),
+    "Insights.get_top_tracks_by_popularity": (
+        """
+            SELECT t.trackName, t.artistName, p.popularity
+            FROM trackinfo t
+            JOIN song_Popularity p ON t.trackID = p.trackID
+            ORDER BY p.popularity DESC
+            LIMIT %s;
+        """, (10,), {"trackinfo", "song_popularity"}),
+    "DB_api.get_audio_features_for_tracks": (
+        """
+            SELECT af.*
+            FROM audio_features af
+            WHERE af.trackid = ANY(%s);
+        """, (["track_%d" % i for i in range(1, 51)],), {"audio_features"}),
+    "vw_genre_popularity filtered by genre": (
+        "SELECT * FROM vw_genre_popularity WHERE genre = %s;", ("genre_42",), {"artist_genres"}),
+    # Body of get_artist_track_analysis(); EXPLAIN cannot see into plpgsql functions.
+    "get_artist_track_analysis": (
+        """
+            SELECT COUNT(vtd.trackID), AVG(vtd.popularity), AVG(vtd.danceability), AVG(vtd.energy)
+            FROM mv_track_details vtd
+            WHERE vtd.artistID = %s;
+        """, ("artist_42",), {"mv_track_details"}),
+    # Body of recommend_tracks_for_user().
+    "recommend_tracks_for_user": (
+        """
+            WITH user_top_artists AS (
+                SELECT ti.artistID, COUNT(*) as listen_count
+                FROM User_Listening_History ulh
+                JOIN trackinfo ti ON ulh.trackID = ti.trackID
+                WHERE ulh.userID = %(user)s
+                GROUP BY ti.artistID
+                ORDER BY listen_count DESC
+                LIMIT 5
+            ),
+            user_listened_tracks AS (
+                SELECT ulh.trackID FROM User_Listening_History ulh WHERE ulh.userID = %(user)s
+            )
+            SELECT vtd.trackID, vtd.trackName, vtd.artistName, vtd.popularity
+            FROM mv_track_details vtd
+            WHERE vtd.artistID IN (SELECT artistID FROM user_top_artists)
+              AND vtd.trackID NOT IN (SELECT trackID FROM user_listened_tracks)
+            ORDER BY vtd.popularity DESC
+            LIMIT %(limit)s;
+        """, None, {"user_listening_history", "trackinfo", "mv_track_details"}),
+    "AdvanceSelectQueries: most listened-to genre": (
+        """
+            SELECT ag.genre, COUNT(ulh.trackID) AS listen_count
+            FROM User_Listening_History ulh
+            JOIN trackinfo ti ON ulh.trackID = ti.trackID
+            JOIN Artist_Genres ag ON ti.artistID = ag.artistID
+            WHERE ulh.userID = (SELECT id FROM user_info WHERE username = %s)
+            GROUP BY ag.genre
+            ORDER BY listen_count DESC LIMIT 1;
+        """, ("user_7",), {"user_listening_history", "trackinfo", "artist_genres", "user_info"}),
+}
+
+
+def _read(filename: str) -> str:
+    with open(os.path.join(SCHEMA_DIR, filename), encoding="utf-8") as f:
+        return f.read()
+
+
+# Partitioned tables; scans of their partitions count as scans of the parent.
+PARTITIONED_TABLES = ("user_listening_history",)
+
+
+def _parent(relation: str) -> str:
+    relation = relation.lower()
+    for table in PARTITIONED_TABLES:
+        if relation.startswith(table + "_"):
+            return table
+    return relation
+
+
+def _scans(plan: dict):
+    """Yields (node type, relation, index) for every node of an EXPLAIN JSON plan."""
+    relation = plan.get("Relation Name")
+    yield plan["Node Type"], relation and _parent(relation), plan.get("Index Name")
+    for child in plan.get("Plans", []):
+        yield from _scans(child)
+
+
+def build_schema(cur):
+    cur.execute(f"drop schema if exists {SCRATCH_SCHEMA} cascade")
+    cur.execute(f"create schema {SCRATCH_SCHEMA}")
+    cur.execute(f"set search_path to {SCRATCH_SCHEMA}, public")
+    cur.execute(_read("init.sql"))
+
+
+def run_checks(cur, user_id) -> bool:
+    ok = True
+    for name, (query, params, indexed_tables) in CHECKS.items():
+        if params is None:
+            params = {"user": user_id, "limit": 10}
+        cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+        plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scans = list(_scans(plan[0]["Plan"]))
+        seq_scanned = {rel for node, rel, _ in scans if node == "Seq Scan" and rel} & indexed_tables
+        indexes = sorted({index for _, _, index in scans if index})
+        status = "FAIL" if seq_scanned else "ok"
+        ok = ok and not seq_scanned
+        print(f"[{status}] {name}")
+        print(f"       indexes: {', '.join(indexes) or '-'}")
+        if seq_scanned:
+            print(f"       seq scan on: {', '.join(sorted(seq_scanned))}")
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check index usage of the hot queries on a seeded scratch schema.")
+    parser.add_argument("--tracks", type=int, default=1_000_000)
+    parser.add_argument("--artists", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--history", type=int, default=1_000_000)
+    parser.add_argument("--keep", action="store_true", help=f"keep the {SCRATCH_SCHEMA} schema afterwards")
+    args = parser.parse_args()
+    sizes = {"tracks": args.tracks, "artists": args.artists, "users": args.users, "history": args.history}
+
+    migrator = DB_migrate()
+    if not migrator.pool:
+        print("Failed to create a database connection pool. Please check configuration and database status.")
+        sys.exit(1)
+
+    conn = migrator.get_connection()
+    passed = False
+    try:
+        with conn.cursor() as cur:
+            print(f"Building schema {SCRATCH_SCHEMA} and seeding {args.tracks} tracks...")
+            build_schema(cur)
+            conn.commit()
+        migrator.apply_pending(conn)
+        with conn.cursor() as cur:
+            cur.execute(_read("AdvanceSelectQueries.sql"))
+            cur.execute(SEED_SQL, sizes)
+            conn.commit()
+            cur.execute("select id from user_info where username = 'user_7'")
+            passed = run_checks(cur, cur.fetchone()[0])
+    except psycopg2.DatabaseError as e:
+        print(f"Database error: {e}")
+        conn.rollback()
+    finally:
+        if not args.keep:
+            with conn.cursor() as cur:
+                cur.execute(f"drop schema if exists {SCRATCH_SCHEMA} cascade")
+            conn.commit()
+        migrator.put_connection(conn)
+        migrator.closeall()
+
+    sys.exit(0 if passed else 1)
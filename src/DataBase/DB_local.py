@@ -0,0 +1,359 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Sequence
+
+import psycopg2
+from psycopg2 import extensions
+
+try:
+    from .DB_pool import BlockingConnectionPool
+except ImportError:
+    from DB_pool import BlockingConnectionPool
+
+"""
+Embedded storage backends for running without a PostgreSQL server.
+
+LocalConnectionPool hands out connections to a SQLite or DuckDB file
+through the same interface as BlockingConnectionPool. The queries in
+DB_api and Insights are written for psycopg2, so the cursors here rewrite
+%s / %(name)s placeholders, expand `= ANY(%s)` list parameters into IN
+lists, start transactions the way psycopg2 does and raise psycopg2
+exception types. DuckDB is the columnar option for aggregate-heavy reads;
+it has no savepoints and runs one write transaction at a time per pool.
+A new database file is created from local_schema.sql.
+"""
+
+BACKENDS = ("sqlite", "duckdb")
+LOCAL_SCHEMA = os.path.join(os.path.dirname(__file__), "local_schema.sql")
+
+PLACEHOLDER = re.compile(
+    r"'(?:[^']|'')*'"                                   # string literal, kept as is
+    r"|(?P<any>=\s*ANY\s*\(\s*%(?:\((?P<any_name>\w+)\))?s\s*\))"
+    r"|%(?:\((?P<name>\w+)\))?s"
+    r"|(?P<percent>%%)",
+    re.IGNORECASE
+)
+# SQLite before 3.44 cannot order aggregate input; the array_agg below sorts instead.
+ORDERED_ARRAY_AGG = re.compile(r"array_agg\s*\(([^()]*?)\s+ORDER\s+BY\s+[^()]*\)", re.IGNORECASE)
+WRITE_STATEMENT = re.compile(r"^\s*(insert|update|delete|create|drop|alter|savepoint|release|rollback\s+to)\b",
+                             re.IGNORECASE)
+SAVEPOINT_STATEMENT = re.compile(r"^\s*(savepoint|release)\b", re.IGNORECASE)
+ROLLBACK_TO_STATEMENT = re.compile(r"^\s*rollback\s+to\b", re.IGNORECASE)
+# SQLite has no array type; array_agg results travel as tagged JSON blobs and are decoded on fetch.
+ARRAY_TAG = b"\x00array:"
+
+# SQLite returns declared timestamp columns as datetimes; the adapter replaces the deprecated default one.
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("timestamp", lambda value: datetime.fromisoformat(value.decode("utf-8")))
+
+
+def translate(query: str, params=None):
+    """
+    Rewrites a psycopg2 query for the qmark paramstyle of SQLite and DuckDB.
+
+    Returns:
+        tuple: (query, positional parameters).
+    """
+    positional = []
+    sequence = iter(params) if params is not None and not isinstance(params, dict) else None
+
+    def value(name):
+        return params[name] if name else next(sequence)
+
+    def replace(match):
+        if match.group("percent"):
+            return "%"
+        if match.group("any"):
+            values = list(value(match.group("any_name")))
+            positional.extend(values)
+            return "IN (" + ", ".join("?" * len(values)) + ")" if values else "IN (NULL)"
+        if match.group(0).startswith("'"):
+            return match.group(0)
+        positional.append(value(match.group("name")))
+        return "?"
+
+    return PLACEHOLDER.sub(replace, query), positional
+
+
+def upsert_query(table: str, columns: Sequence[str], conflict_columns: Sequence[str],
+                 update_columns: Sequence[str] = None) -> str:
+    """
+    Builds the INSERT ... ON CONFLICT statement DB_api._bulk_insert runs per row on a local backend.
+    """
+    if update_columns:
+        on_conflict = "DO UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in update_columns)
+    else:
+        on_conflict = "DO NOTHING"
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+            f"ON CONFLICT ({', '.join(conflict_columns)}) {on_conflict}")
+
+
+class _ArrayAgg:
+    """array_agg for SQLite, returning the collected values in ascending order."""
+
+    def __init__(self):
+        self.values = []
+
+    def step(self, value):
+        self.values.append(value)
+
+    def finalize(self):
+        return ARRAY_TAG + json.dumps(sorted(self.values, key=lambda v: (v is None, v))).encode("utf-8")
+
+
+def _decode(value):
+    if isinstance(value, bytes) and value.startswith(ARRAY_TAG):
+        return json.loads(value[len(ARRAY_TAG):])
+    return value
+
+
+def _as_psycopg2_error(error: Exception) -> psycopg2.Error:
+    """Maps a DB-API error of sqlite3 or duckdb onto the psycopg2 class of the same name."""
+    for cls in type(error).__mro__:
+        if cls.__name__ in ("IntegrityError", "DataError", "ProgrammingError", "OperationalError",
+                            "NotSupportedError", "InternalError"):
+            return getattr(psycopg2, cls.__name__)(str(error))
+    return psycopg2.DatabaseError(str(error))
+
+
+class _Info:
+    def __init__(self, conn: "LocalConnection"):
+        self._conn = conn
+
+    @property
+    def transaction_status(self) -> int:
+        return extensions.TRANSACTION_STATUS_INTRANS if self._conn.in_transaction \
+            else extensions.TRANSACTION_STATUS_IDLE
+
+
+class LocalCursor:
+    def __init__(self, conn: "LocalConnection"):
+        self.connection = conn
+        self._cur = conn.raw.cursor() if conn.backend == "sqlite" else conn.raw
+        # Accepted for psycopg2 compatibility; rows are always fetched lazily.
+        self.itersize = 2000
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self, query: str, params_list) -> None:
+        conn = self.connection
+        if conn.backend == "sqlite":
+            query = ORDERED_ARRAY_AGG.sub(r"array_agg(\1)", query)
+        elif SAVEPOINT_STATEMENT.match(query):
+            # DuckDB has no savepoints; a failed statement aborts the whole transaction instead.
+            # Its optimistic concurrency control also makes concurrent writes to the same keys
+            # conflict even under ON CONFLICT, so write transactions are serialized (see begin).
+            conn.begin()
+            return
+        elif ROLLBACK_TO_STATEMENT.match(query):
+            raise psycopg2.NotSupportedError("duckdb has no savepoints, the whole transaction has to be rolled back")
+        try:
+            if WRITE_STATEMENT.match(query):
+                conn.begin()
+            if params_list is None:
+                # Like psycopg2, a query without parameters is sent as is (%% stays %%).
+                self._cur.execute(query)
+            else:
+                rows = []
+                for params in params_list:
+                    translated, positional = translate(query, params)
+                    rows.append(positional)
+                if len(rows) == 1:
+                    self._cur.execute(translated, rows[0])
+                elif rows:
+                    self._cur.executemany(translated, rows)
+        except psycopg2.Error:
+            raise
+        except Exception as e:
+            raise _as_psycopg2_error(e) from e
+
+    def execute(self, query: str, params=None) -> None:
+        if params is None:
+            self._run(query, None)
+        else:
+            self._run(query, [params])
+
+    def executemany(self, query: str, params_list) -> None:
+        self._run(query, params_list)
+
+    def _fetch(self, rows):
+        if self.connection.backend == "sqlite":
+            return [tuple(_decode(v) for v in row) for row in rows]
+        return rows
+
+    def fetchone(self):
+        row = self._cur.fetchone()
+        return self._fetch([row])[0] if row is not None else None
+
+    def fetchmany(self, size: int = None):
+        return self._fetch(self._cur.fetchmany(size or self.itersize))
+
+    def fetchall(self):
+        return self._fetch(self._cur.fetchall())
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount
+
+    def close(self) -> None:
+        if self.connection.backend == "sqlite":
+            self._cur.close()
+
+
+class LocalConnection:
+    def __init__(self, backend: str, raw, write_lock: threading.Lock = None, timeout: float = 30.0):
+        """
+        Args:
+            backend: 'sqlite' or 'duckdb'.
+            raw: The sqlite3 connection or DuckDB cursor.
+            write_lock: Lock shared by the pool and held for the length of a write transaction.
+            timeout: Seconds to wait for write_lock.
+        """
+        self.backend = backend
+        self.raw = raw
+        self.write_lock = write_lock
+        self.timeout = timeout
+        self.in_transaction = False
+        self.info = _Info(self)
+        self._closed = False
+
+    @property
+    def closed(self) -> int:
+        return int(self._closed)
+
+    def cursor(self, name: str = None) -> LocalCursor:
+        """`name` is accepted for the server-side cursors DB_api streams with and ignored."""
+        return LocalCursor(self)
+
+    def begin(self) -> None:
+        """
+        Opens a transaction before the first write, as psycopg2 would have one open already.
+        SQLite serializes writers with BEGIN IMMEDIATE; DuckDB takes the pool's write lock,
+        released again by commit or rollback.
+        """
+        if self.in_transaction:
+            return
+        if self.write_lock is not None and not self.write_lock.acquire(timeout=self.timeout):
+            raise psycopg2.OperationalError(
+                f"Timed out after {self.timeout}s waiting for another {self.backend} write transaction")
+        try:
+            self.raw.execute("BEGIN IMMEDIATE" if self.backend == "sqlite" else "BEGIN TRANSACTION")
+        except Exception:
+            self._release()
+            raise
+        self.in_transaction = True
+
+    def _release(self) -> None:
+        if self.write_lock is not None:
+            self.write_lock.release()
+
+    def commit(self) -> None:
+        if self.in_transaction:
+            self.in_transaction = False
+            try:
+                self.raw.execute("COMMIT")
+            finally:
+                self._release()
+
+    def rollback(self) -> None:
+        if self.in_transaction:
+            self.in_transaction = False
+            try:
+                self.raw.execute("ROLLBACK")
+            finally:
+                self._release()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            if self.in_transaction:
+                self.in_transaction = False
+                self._release()
+            self.raw.close()
+
+
+class LocalConnectionPool(BlockingConnectionPool):
+    def __init__(self, backend: str, path: str, minconn: int = 1, maxconn: int = 10, timeout: float = 30.0,
+                 max_idle: float = 300.0, max_lifetime: float = 3600.0, validate_after: float = 30.0):
+        """
+        Args:
+            backend: 'sqlite' or 'duckdb'.
+            path: Database file, created with local_schema.sql when it does not exist yet.
+            The remaining arguments are those of BlockingConnectionPool.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown storage backend '{backend}', expected one of {', '.join(BACKENDS)}")
+        if backend == "sqlite" and path == ":memory:":
+            # Every SQLite connection would open its own empty in-memory database.
+            raise ValueError("The sqlite backend needs a database file; use duckdb for an in-memory database")
+        self.backend = backend
+        self.path = path
+        self._database = None
+        self._database_lock = threading.Lock()
+        # DuckDB write transactions on the same rows conflict instead of waiting; one writer at a time.
+        self._write_lock = threading.Lock() if backend == "duckdb" else None
+        if backend == "duckdb":
+            import duckdb
+
+            # One database instance per process; pooled connections are cursors on it.
+            self._database = duckdb.connect(path)
+        super().__init__(minconn=minconn, maxconn=maxconn, timeout=timeout, max_idle=max_idle,
+                         max_lifetime=max_lifetime, validate_after=validate_after)
+        self._ensure_schema()
+
+    def _open(self):
+        if self.backend == "duckdb":
+            with self._database_lock:
+                raw = self._database.cursor()
+            # SQLite's CURRENT_TIMESTAMP is UTC; match it so stored timestamps mean the same on both.
+            raw.execute("SET TimeZone = 'UTC'")
+        else:
+            raw = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                  check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+            raw.execute("PRAGMA journal_mode=WAL")
+            raw.create_function("gen_random_uuid", 0, lambda: str(uuid.uuid4()))
+            raw.create_aggregate("array_agg", 1, _ArrayAgg)
+        with self._cond:
+            self._stats["opened"] += 1
+        return LocalConnection(self.backend, raw, self._write_lock, self.timeout)
+
+    def _ensure_schema(self) -> None:
+        conn = self.getconn()
+        try:
+            with conn.cursor() as cur:
+                try:
+                    cur.execute("SELECT 1 FROM trackinfo LIMIT 1")
+                    return
+                except psycopg2.Error:
+                    pass
+                with open(LOCAL_SCHEMA, encoding="utf-8") as f:
+                    schema = re.sub(r"--[^\n]*", "", f.read())
+                for statement in schema.split(";"):
+                    if statement.strip():
+                        cur.execute(statement)
+            conn.commit()
+            print(f"Created {self.backend} database at {self.path}")
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+        finally:
+            self.putconn(conn)
+
+    def closeall(self) -> None:
+        super().closeall()
+        if self._database is not None:
+            self._database.close()
+            self._database = None
@@ -0,0 +1,170 @@
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+import psycopg2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DataBase.DB_connect import DB_connect
+
+"""
+Versioned schema migrations.
+
+Migrations are the NNNN_description.sql files in DataBase/migrations and
+run in version order on top of init.sql. Each one is applied in its own
+transaction and recorded in the schema_migrations table, so running the
+migrator again only applies what is new.
+"""
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+# Arbitrary key for pg_advisory_xact_lock so concurrent runners apply migrations one at a time.
+MIGRATION_LOCK_ID = 7201401
+
+
+class Migration:
+    def __init__(self, version: int, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> list:
+    """
+    Reads the migration files of a directory.
+
+    Returns:
+        list: Migration objects ordered by version.
+    """
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise Exception(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+class DB_migrate(DB_connect):
+    def __init__(self, directory: str = MIGRATIONS_DIR):
+        self.directory = directory
+        super().__init__()
+
+    @staticmethod
+    def _ensure_table(cur):
+        cur.execute("""
+            create table if not exists schema_migrations(
+                version int primary key,
+                name varchar(200) not null,
+                checksum varchar(64) not null,
+                applied_at timestamp not null default current_timestamp
+            )
+        """)
+
+    def applied(self, conn) -> dict:
+        """
+        Returns the recorded migrations as {version: checksum}.
+        """
+        with conn.cursor() as cur:
+            self._ensure_table(cur)
+            cur.execute("select version, checksum from schema_migrations")
+            rows = cur.fetchall()
+        conn.commit()
+        return dict(rows)
+
+    def pending(self, conn) -> list:
+        """
+        Returns the migrations that are not recorded yet, warning about edited ones.
+        """
+        applied = self.applied(conn)
+        pending = []
+        for migration in load_migrations(self.directory):
+            checksum = applied.get(migration.version)
+            if checksum is None:
+                pending.append(migration)
+            elif checksum != migration.checksum:
+                print(f"Warning: migration {migration.version:04d}_{migration.name} changed after it was applied.")
+        return pending
+
+    def apply_pending(self, conn) -> list:
+        """
+        Applies every pending migration on the given connection, one transaction each.
+
+        Returns:
+            list: The migrations that were applied.
+        """
+        done = []
+        for migration in self.pending(conn):
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("select pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+                    cur.execute("select 1 from schema_migrations where version = %s", (migration.version,))
+                    if cur.fetchone():
+                        conn.rollback()
+                        continue
+                    cur.execute(migration.sql)
+                    cur.execute(
+                        "insert into schema_migrations (version, name, checksum) values (%s, %s, %s)",
+                        (migration.version, migration.name, migration.checksum)
+                    )
+                conn.commit()
+                print(f"Applied migration {migration.version:04d}_{migration.name}")
+                done.append(migration)
+            except psycopg2.DatabaseError:
+                conn.rollback()
+                print(f"Migration {migration.version:04d}_{migration.name} failed, later migrations were not applied.")
+                raise
+        return done
+
+    def migrate(self) -> list:
+        """
+        Applies every pending migration using a pooled connection.
+
+        Returns:
+            list: The migrations that were applied, empty on error.
+        """
+        if self.backend != "postgresql":
+            print(f"The {self.backend} backend is created from local_schema.sql, there is nothing to migrate.")
+            return []
+        conn = None
+        try:
+            conn = self.get_connection()
+            if conn:
+                return self.apply_pending(conn)
+        except (psycopg2.DatabaseError, Exception) as e:
+            print(f"Database error: {e}")
+        finally:
+            if conn:
+                self.put_connection(conn)
+        return []
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument("--list", action="store_true", help="only list pending migrations")
+    args = parser.parse_args()
+
+    migrator = DB_migrate()
+    if migrator.pool:
+        if args.list:
+            conn = migrator.get_connection()
+            try:
+                for m in migrator.pending(conn):
+                    print(f"{m.version:04d}_{m.name}")
+            finally:
+                migrator.put_connection(conn)
+        else:
+            applied = migrator.migrate()
+            print(f"{len(applied)} migration(s) applied.")
+        migrator.closeall()
+    else:
+        print("Failed to create a database connection pool. Please check configuration and database status.")
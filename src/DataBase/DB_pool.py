@@ -0,0 +1,260 @@
+import threading
+import time
+from typing import Dict
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+"""
+Thread-safe PostgreSQL connection pool that blocks instead of failing.
+
+When every connection is checked out, getconn waits up to a timeout for
+one to be returned. Idle connections are closed after a configurable idle
+time or total lifetime and are pinged before reuse once they have sat idle
+for a while. The pool records how long callers waited, how long
+connections stayed checked out and how close the pool came to saturation.
+"""
+
+
+class PoolTimeout(PoolError):
+    pass
+
+
+class BlockingConnectionPool:
+    def __init__(self, minconn: int = 1, maxconn: int = 10, timeout: float = 30.0,
+                 max_idle: float = 300.0, max_lifetime: float = 3600.0,
+                 validate_after: float = 30.0, **dsn):
+        """
+        Args:
+            minconn: Connections opened up front and kept through idle reaping.
+            maxconn: Upper bound of open connections.
+            timeout: Seconds getconn waits for a free connection before raising PoolTimeout.
+            max_idle: Seconds an idle connection above minconn is kept open.
+            max_lifetime: Seconds after which a connection is replaced when returned or reused.
+            validate_after: Idle seconds after which a connection is pinged before reuse.
+            dsn: Connection parameters passed to psycopg2.connect.
+        """
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise PoolError("minconn must be between 0 and maxconn, and maxconn at least 1")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.validate_after = validate_after
+        self._dsn = dsn
+        self.closed = False
+
+        self._cond = threading.Condition()
+        # Idle connections as (conn, created_at, idle_since); reused LIFO to keep few connections warm.
+        self._idle = []
+        # id(conn) -> (conn, created_at, checked_out_at)
+        self._used = {}
+        # Connections outside both lists while they are opened, pinged or rolled back without the lock.
+        self._in_flight = 0
+        self._stats = {
+            "checkouts": 0, "waits": 0, "timeouts": 0, "opened": 0, "closed": 0, "invalid": 0,
+            "wait_ms": 0.0, "max_wait_ms": 0.0, "checkout_ms": 0.0, "max_checkout_ms": 0.0, "peak_in_use": 0,
+        }
+
+        for _ in range(minconn):
+            self._idle.append((self._open(), time.monotonic(), time.monotonic()))
+
+    def _open(self):
+        conn = psycopg2.connect(**self._dsn)
+        with self._cond:
+            self._stats["opened"] += 1
+        return conn
+
+    def _close(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._stats["closed"] += 1
+
+    def _size(self) -> int:
+        return len(self._idle) + len(self._used) + self._in_flight
+
+    def _expired(self, conn, created_at: float) -> bool:
+        return conn.closed or time.monotonic() - created_at > self.max_lifetime
+
+    @staticmethod
+    def _ping(conn) -> bool:
+        """Runs SELECT 1 on an idle connection. Called without the lock, a dead peer may block it."""
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _reap(self) -> None:
+        """Closes idle connections above minconn that outlived max_idle. Caller holds the lock."""
+        now = time.monotonic()
+        keep = []
+        for entry in self._idle:
+            conn, created_at, idle_since = entry
+            expired = now - idle_since > self.max_idle or now - created_at > self.max_lifetime
+            if expired and len(keep) + len(self._used) + self._in_flight >= self.minconn:
+                self._close(conn)
+            else:
+                keep.append(entry)
+        self._idle = keep
+
+    def getconn(self, timeout: float = None):
+        """
+        Checks out a connection, waiting up to `timeout` seconds (the pool default when None).
+
+        Raises:
+            PoolTimeout: No connection became available in time.
+            PoolError: The pool is closed.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                while True:
+                    if self.closed:
+                        raise PoolError("connection pool is closed")
+                    self._reap()
+                    if self._idle:
+                        conn, created_at, idle_since = self._idle.pop()
+                        if self._expired(conn, created_at):
+                            self._close(conn)
+                            continue
+                        check = time.monotonic() - idle_since >= self.validate_after
+                        break
+                    if self._size() < self.maxconn:
+                        conn, created_at, check = None, None, False
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"no connection available within {timeout}s "
+                                          f"({len(self._used)}/{self.maxconn} in use)")
+                    waited = True
+                    self._cond.wait(remaining)
+                if conn is not None and not check:
+                    break
+                self._in_flight += 1
+
+            if conn is None:
+                try:
+                    conn = self._open()
+                    created_at = time.monotonic()
+                finally:
+                    with self._cond:
+                        self._in_flight -= 1
+                        if conn is None:
+                            self._cond.notify()
+                break
+
+            # Ping outside the lock so a hanging dead connection does not stall other callers.
+            usable = self._ping(conn)
+            if not usable:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            with self._cond:
+                self._in_flight -= 1
+                if usable:
+                    break
+                self._stats["invalid"] += 1
+                self._stats["closed"] += 1
+                self._cond.notify()
+
+        now = time.monotonic()
+        with self._cond:
+            if self.closed:
+                self._close(conn)
+                raise PoolError("connection pool is closed")
+            self._used[id(conn)] = (conn, created_at, now)
+            wait_ms = (now - start) * 1000
+            self._stats["checkouts"] += 1
+            self._stats["waits"] += int(waited)
+            self._stats["wait_ms"] += wait_ms
+            self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait_ms)
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], len(self._used))
+        return conn
+
+    def putconn(self, conn, close: bool = False) -> None:
+        """
+        Returns a connection; broken, expired or explicitly closed ones are discarded.
+        """
+        with self._cond:
+            entry = self._used.pop(id(conn), None)
+            if entry is None:
+                raise PoolError("trying to put unkeyed connection")
+            _, created_at, checked_out_at = entry
+            checkout_ms = (time.monotonic() - checked_out_at) * 1000
+            self._stats["checkout_ms"] += checkout_ms
+            self._stats["max_checkout_ms"] = max(self._stats["max_checkout_ms"], checkout_ms)
+
+            discard = close or self.closed or self._expired(conn, created_at)
+            rollback = not discard and conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE
+            if not rollback:
+                self._return(conn, created_at, discard)
+                return
+            self._in_flight += 1
+
+        # Rolled back outside the lock, like the ping in getconn.
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            discard = True
+        with self._cond:
+            self._in_flight -= 1
+            self._return(conn, created_at, discard or self.closed)
+
+    def _return(self, conn, created_at: float, discard: bool) -> None:
+        """Closes or parks a returned connection and wakes one waiter. Caller holds the lock."""
+        if discard:
+            self._close(conn)
+        else:
+            self._idle.append((conn, created_at, time.monotonic()))
+        self._cond.notify()
+
+    def closeall(self) -> None:
+        with self._cond:
+            self.closed = True
+            for conn, _, _ in self._idle:
+                self._close(conn)
+            for conn, _, _ in self._used.values():
+                self._close(conn)
+            self._idle = []
+            self._used = {}
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Reports pool size, wait times, checkout durations and saturation.
+        """
+        with self._cond:
+            s = self._stats
+            checkouts = s["checkouts"]
+            returned = checkouts - len(self._used)
+            return {
+                "size": self._size(),
+                "idle": len(self._idle),
+                "in_use": len(self._used),
+                "maxconn": self.maxconn,
+                "saturation": round(len(self._used) / self.maxconn, 3),
+                "peak_saturation": round(s["peak_in_use"] / self.maxconn, 3),
+                "checkouts": checkouts,
+                "waits": s["waits"],
+                "timeouts": s["timeouts"],
+                "mean_wait_ms": round(s["wait_ms"] / checkouts, 3) if checkouts else 0.0,
+                "max_wait_ms": round(s["max_wait_ms"], 3),
+                "mean_checkout_ms": round(s["checkout_ms"] / returned, 3) if returned else 0.0,
+                "max_checkout_ms": round(s["max_checkout_ms"], 3),
+                "opened": s["opened"],
+                "closed": s["closed"],
+                "invalid": s["invalid"],
+            }
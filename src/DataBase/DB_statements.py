@@ -0,0 +1,134 @@
+import re
+import threading
+import time
+from typing import Dict, Tuple
+
+from psycopg2 import errors
+
+"""
+Server-side prepared statements for the hot DB_api and Insights queries.
+
+Each named query is sent once per pooled connection as PREPARE and
+afterwards only as EXECUTE, so Postgres skips parsing and planning on the
+many small lookups and single-row writes done per track. Connections are
+tracked by backend PID, so a reconnected connection is prepared again.
+"""
+
+STATEMENT_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+PLACEHOLDER = re.compile(r"%%|%s")
+
+
+def to_positional(query: str) -> Tuple[str, int]:
+    """
+    Converts psycopg2 %s placeholders to PREPARE-style $1..$n.
+
+    Returns:
+        Tuple of (converted query, number of parameters).
+    """
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        if match.group(0) == "%%":
+            return "%"
+        count += 1
+        return f"${count}"
+
+    return PLACEHOLDER.sub(replace, query.strip().rstrip(";")), count
+
+
+class StatementRegistry:
+    def __init__(self):
+        self._statements = {}
+        self._prepared = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _statement(self, name: str, query: str) -> Tuple[str, int]:
+        with self._lock:
+            statement = self._statements.get(name)
+            if statement is None:
+                if not STATEMENT_NAME.match(name):
+                    raise ValueError(f"Invalid statement name: {name}")
+                statement = to_positional(query)
+                self._statements[name] = statement
+                self._stats[name] = {"calls": 0, "prepares": 0, "total_ms": 0.0}
+            return statement
+
+    def _prepared_on(self, conn) -> set:
+        key = (id(conn), conn.get_backend_pid())
+        with self._lock:
+            return self._prepared.setdefault(key, set())
+
+    def _prepare(self, cur, name: str, text: str) -> None:
+        cur.execute(f"PREPARE {name} AS {text}")
+        self._prepared_on(cur.connection).add(name)
+        with self._lock:
+            self._stats[name]["prepares"] += 1
+
+    def forget(self, conn) -> None:
+        """
+        Drops what is known about a connection, e.g. before it is closed.
+        """
+        with self._lock:
+            for key in [k for k in self._prepared if k[0] == id(conn)]:
+                del self._prepared[key]
+
+    def execute(self, cur, name: str, query: str, data: Tuple = None) -> None:
+        """
+        Runs a named query on the cursor, preparing it first if this connection has not seen it.
+
+        If the server lost the statement (reconnect, DISCARD ALL) or its plan no
+        longer matches the schema, the transaction is rolled back, the statement
+        prepared again and the call retried once. Callers therefore use this as
+        the only statement of their transaction.
+
+        Args:
+            cur: Cursor of the connection to run on.
+            name (str): Statement name, a lowercase SQL identifier.
+            query (str): The SQL query with %s placeholders.
+            data (Tuple, optional): The query parameters.
+        """
+        text, count = self._statement(name, query)
+        execute = f"EXECUTE {name}" + (f" ({', '.join(['%s'] * count)})" if count else "")
+
+        for attempt in range(2):
+            try:
+                if name not in self._prepared_on(cur.connection):
+                    self._prepare(cur, name, text)
+                start = time.perf_counter()
+                cur.execute(execute, data)
+                elapsed = (time.perf_counter() - start) * 1000
+                break
+            except errors.DuplicatePreparedStatement:
+                # Prepared on this session by an earlier registry; just use it.
+                if attempt:
+                    raise
+                cur.connection.rollback()
+                self._prepared_on(cur.connection).add(name)
+            except (errors.InvalidSqlStatementName, errors.FeatureNotSupported):
+                if attempt:
+                    raise
+                conn = cur.connection
+                conn.rollback()
+                self.forget(conn)
+                cur.execute("DEALLOCATE ALL")
+
+        with self._lock:
+            stats = self._stats[name]
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Reports per statement how often it ran, how often it was prepared and its mean latency in ms.
+        """
+        with self._lock:
+            return {
+                name: {
+                    "calls": s["calls"],
+                    "prepares": s["prepares"],
+                    "mean_ms": round(s["total_ms"] / s["calls"], 3) if s["calls"] else 0.0,
+                }
+                for name, s in self._stats.items()
+            }
@@ -0,0 +1,180 @@
+-- Schema of the embedded SQLite/DuckDB backend (DB_local), created when a
+-- new database file is opened. It mirrors init.sql plus the migrations with
+-- the same table and column names, so DB_api and Insights run unchanged.
+-- Differences from the PostgreSQL schema:
+--   * uuid columns are varchar(36); gen_random_uuid() is provided by the backend.
+--   * float columns are spelled double precision, which is what float means in PostgreSQL.
+--   * no foreign keys (DuckDB has no ON DELETE CASCADE); keys and unique
+--     constraints are kept because ON CONFLICT needs them.
+--   * User_Listening_History is not partitioned.
+--   * mv_* are plain tables refilled from the vw_* views by
+--     DB_api.refresh_materialized_views.
+--   * genres and artist_genre_ids are views over Artist_Genres instead of
+--     trigger-maintained tables; genre IDs are assigned in genre order.
+
+create table user_info(
+    id varchar(36) primary key default (gen_random_uuid()),
+    username varchar(40) not null
+);
+
+create table trackinfo(
+    trackID varchar(200) primary key,
+    trackName varchar(200) not null,
+    artistName varchar(100) not null,
+    artistID varchar(100) not null,
+    releaseDate varchar(100) not null
+);
+
+create table songDetails(
+    trackID varchar(200) primary key,
+    trackName varchar(200),
+    artistName varchar(100),
+    albumName varchar(100),
+    releaseDate varchar(100),
+    durationMs int,
+    popularity int,
+    explicit boolean,
+    trackNumber int,
+    discNumber int,
+    previewUrl varchar(200),
+    spotifyUrl varchar(200)
+);
+
+create table artistDetails(
+    artistID varchar(200) primary key,
+    artistName varchar(100),
+    genres varchar(200),
+    popularity int,
+    followers int,
+    spotifyUrl varchar(200)
+);
+
+create table Albums(
+    albumID varchar(200) primary key,
+    albumName varchar(200) not null,
+    releaseDate varchar(100),
+    artistID varchar(100),
+    spotifyUrl varchar(200),
+    totalTracks int
+);
+
+create table Artist_Genres(
+    artistID varchar(100) not null,
+    genre varchar(100) not null,
+    primary key (artistID, genre)
+);
+
+create table User_Listening_History(
+    historyID varchar(36) primary key default (gen_random_uuid()),
+    userID varchar(36) not null,
+    trackID varchar(200) not null,
+    listenTimestamp timestamp not null default current_timestamp,
+    unique (userID, trackID, listenTimestamp)
+);
+
+create table song_Popularity(
+    trackID varchar(200) primary key,
+    popularity int
+);
+
+create table artist_popularity(
+    artistID varchar(200) primary key,
+    popularity int
+);
+
+create table top_hundered_tracks(
+    trackID varchar(200) primary key,
+    albumName varchar(200),
+    releaseDate varchar(100)
+);
+
+create table audio_features(
+    spotify_track_id varchar(200) primary key,
+    trackID varchar(200),
+    danceability double precision,
+    energy double precision,
+    key int,
+    loudness double precision,
+    mode int,
+    speechiness double precision,
+    acousticness double precision,
+    instrumentalness double precision,
+    liveness double precision,
+    valence double precision,
+    tempo double precision,
+    duration_ms int
+);
+
+-- migrations/0001_hot_path_indexes.sql and 0004_partition_listening_history.sql
+create index idx_trackinfo_artistid on trackinfo (artistID);
+create index idx_audio_features_trackid on audio_features (trackID);
+create index idx_albums_artistid on Albums (artistID);
+create index idx_user_listening_history_user_time on User_Listening_History (userID, listenTimestamp);
+create index idx_user_listening_history_trackid on User_Listening_History (trackID);
+create index idx_artist_genres_genre on Artist_Genres (genre);
+create index idx_song_popularity_popularity on song_Popularity (popularity);
+create index idx_artistdetails_popularity on artistDetails (popularity);
+create index idx_user_info_username on user_info (username);
+
+-- AdvanceSelectQueries.sql
+create view vw_track_details as
+select
+    ti.trackID,
+    ti.trackName,
+    ti.artistName,
+    ad.artistID,
+    ti.releaseDate,
+    sd.albumName,
+    sd.durationMs,
+    sp.popularity,
+    af.danceability,
+    af.energy,
+    af.loudness,
+    af.speechiness,
+    af.acousticness,
+    af.instrumentalness,
+    af.liveness,
+    af.valence,
+    af.tempo
+from trackinfo ti
+left join songDetails sd on ti.trackID = sd.trackID
+left join artistDetails ad on ti.artistID = ad.artistID
+left join song_Popularity sp on ti.trackID = sp.trackID
+left join audio_features af on ti.trackID = af.spotify_track_id;
+
+create view vw_genre_popularity as
+select
+    g.genre,
+    avg(p.popularity) as avg_popularity,
+    count(t.trackID) as track_count
+from Artist_Genres g
+join artistDetails a on g.artistID = a.artistID
+join trackinfo t on a.artistID = t.artistID
+join song_Popularity p on t.trackID = p.trackID
+group by g.genre;
+
+-- migrations/0002_materialized_views.sql
+create table mv_track_details as select * from vw_track_details where 1 = 0;
+create index mv_track_details_trackid on mv_track_details (trackID);
+create index mv_track_details_artistid on mv_track_details (artistID);
+
+create table mv_genre_popularity as select * from vw_genre_popularity where 1 = 0;
+
+create table materialized_view_refresh(
+    view_name varchar(100) primary key,
+    refreshed_at timestamp not null default current_timestamp,
+    duration_ms int
+);
+
+insert into materialized_view_refresh (view_name) values ('mv_track_details');
+insert into materialized_view_refresh (view_name) values ('mv_genre_popularity');
+
+-- migrations/0003_genre_dimension.sql
+create view genres as
+select dense_rank() over (order by genre) as genreID, genre
+from (select distinct genre from Artist_Genres) g;
+
+create view artist_genre_ids as
+select ag.artistID, g.genreID
+from Artist_Genres ag
+join genres g on g.genre = ag.genre;
@@ -0,0 +1,38 @@
+-- Indexes for the join, filter and ORDER BY ... LIMIT paths used by
+-- DB_api, Insights and AdvanceSelectQueries.sql. init.sql only creates
+-- primary keys, so every one of these currently falls back to a seq scan.
+
+-- trackinfo -> artistDetails joins, vw_track_details filtered by artist
+create index if not exists idx_trackinfo_artistid
+    on trackinfo (artistID);
+
+-- get_audio_features_for_tracks, training data join on trackID
+create index if not exists idx_audio_features_trackid
+    on audio_features (trackID);
+
+-- per-user history (recommend_tracks_for_user, most listened genre)
+create index if not exists idx_user_listening_history_user_track
+    on User_Listening_History (userID, trackID);
+
+-- cascading deletes from trackinfo and joins starting from a track
+create index if not exists idx_user_listening_history_trackid
+    on User_Listening_History (trackID);
+
+-- genre lookups (vw_genre_popularity filtered by genre)
+create index if not exists idx_artist_genres_genre
+    on Artist_Genres (genre);
+
+-- cascading deletes from artistDetails
+create index if not exists idx_albums_artistid
+    on Albums (artistID);
+
+-- top-N by popularity in Insights
+create index if not exists idx_song_popularity_popularity
+    on song_Popularity (popularity desc);
+
+create index if not exists idx_artistdetails_popularity
+    on artistDetails (popularity desc);
+
+-- user lookups by name
+create index if not exists idx_user_info_username
+    on user_info (username);
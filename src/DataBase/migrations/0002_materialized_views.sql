@@ -0,0 +1,117 @@
+-- Precomputed versions of vw_track_details and vw_genre_popularity.
+-- Both are refreshed concurrently after each ingestion batch
+-- (DB_api.refresh_materialized_views), so readers never block on a refresh.
+-- REFRESH ... CONCURRENTLY needs a unique index on each view.
+
+create materialized view if not exists mv_track_details as
+select
+    ti.trackID,
+    ti.trackName,
+    ti.artistName,
+    ad.artistID,
+    ti.releaseDate,
+    sd.albumName,
+    sd.durationMs,
+    sp.popularity,
+    af.danceability,
+    af.energy,
+    af.loudness,
+    af.speechiness,
+    af.acousticness,
+    af.instrumentalness,
+    af.liveness,
+    af.valence,
+    af.tempo
+from trackinfo ti
+left join songDetails sd on ti.trackID = sd.trackID
+left join artistDetails ad on ti.artistID = ad.artistID
+left join song_Popularity sp on ti.trackID = sp.trackID
+left join audio_features af on ti.trackID = af.spotify_track_id;
+
+create unique index if not exists mv_track_details_trackid
+    on mv_track_details (trackID);
+create index if not exists mv_track_details_artistid
+    on mv_track_details (artistID);
+create index if not exists mv_track_details_popularity
+    on mv_track_details (popularity desc);
+
+create materialized view if not exists mv_genre_popularity as
+select
+    g.genre,
+    avg(p.popularity) as avg_popularity,
+    count(t.trackID) as track_count
+from Artist_Genres g
+join artistDetails a on g.artistID = a.artistID
+join trackinfo t on a.artistID = t.artistID
+join song_Popularity p on t.trackID = p.trackID
+group by g.genre;
+
+create unique index if not exists mv_genre_popularity_genre
+    on mv_genre_popularity (genre);
+
+-- When each materialized view was last refreshed, for staleness checks.
+create table if not exists materialized_view_refresh(
+    view_name varchar(100) primary key,
+    refreshed_at timestamp not null default current_timestamp,
+    duration_ms int
+);
+
+insert into materialized_view_refresh (view_name)
+values ('mv_track_details'), ('mv_genre_popularity')
+on conflict (view_name) do update set refreshed_at = current_timestamp;
+
+-- The analysis functions read the precomputed rows instead of re-joining the catalog.
+create or replace function get_artist_track_analysis(p_artist_id varchar)
+returns table(
+    total_tracks bigint,
+    avg_popularity numeric,
+    avg_danceability float,
+    avg_energy float
+) as $$
+begin
+    return query
+    select
+        count(mtd.trackID),
+        avg(mtd.popularity),
+        avg(mtd.danceability),
+        avg(mtd.energy)
+    from mv_track_details mtd
+    where mtd.artistID = p_artist_id;
+end;
+$$ language plpgsql;
+
+create or replace function recommend_tracks_for_user(p_user_id uuid, p_limit int)
+returns table(
+    trackID varchar,
+    trackName varchar,
+    artistName varchar,
+    popularity int
+) as $$
+begin
+    return query
+    with user_top_artists as (
+        select
+            ti.artistID,
+            count(*) as listen_count
+        from User_Listening_History ulh
+        join trackinfo ti on ulh.trackID = ti.trackID
+        where ulh.userID = p_user_id
+        group by ti.artistID
+        order by listen_count desc
+        limit 5
+    ),
+    user_listened_tracks as (
+        select ulh.trackID from User_Listening_History ulh where ulh.userID = p_user_id
+    )
+    select
+        mtd.trackID,
+        mtd.trackName,
+        mtd.artistName,
+        mtd.popularity
+    from mv_track_details mtd
+    where mtd.artistID in (select artistID from user_top_artists)
+        and mtd.trackID not in (select ult.trackID from user_listened_tracks ult)
+    order by mtd.popularity desc
+    limit p_limit;
+end;
+$$ language plpgsql;
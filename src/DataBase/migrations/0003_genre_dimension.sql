@@ -0,0 +1,69 @@
+-- Genre dimension with integer IDs and an artist -> genre-id mapping, so
+-- training reads can build a multi-hot genre matrix directly instead of
+-- re-splitting the comma-joined artistDetails.genres strings.
+
+create table if not exists genres(
+    genreID serial primary key,
+    genre varchar(100) not null unique
+);
+
+create table if not exists artist_genre_ids(
+    artistID varchar(200) not null,
+    genreID int not null,
+    primary key (artistID, genreID),
+    constraint artist_genre_ids_artistID_fkey
+        foreign key (artistID)
+            references artistDetails(artistID)
+            on delete cascade,
+    constraint artist_genre_ids_genreID_fkey
+        foreign key (genreID)
+            references genres(genreID)
+            on delete cascade
+);
+
+create index if not exists idx_artist_genre_ids_genreid
+    on artist_genre_ids (genreID);
+
+-- Backfill from the normalized table and from artists whose genres only
+-- ever landed in the comma-joined column.
+create temporary table _artist_genre_backfill on commit drop as
+select artistID, genre from Artist_Genres
+union
+select ad.artistID, trim(g.genre)
+from artistDetails ad, unnest(string_to_array(ad.genres, ',')) as g(genre)
+where trim(g.genre) <> '';
+
+insert into genres (genre)
+select distinct genre from _artist_genre_backfill
+on conflict (genre) do nothing;
+
+insert into artist_genre_ids (artistID, genreID)
+select b.artistID, g.genreID
+from _artist_genre_backfill b
+join genres g on g.genre = b.genre
+on conflict do nothing;
+
+-- Keep the mapping in sync with every write to Artist_Genres (single
+-- inserts, the write buffer and deletes alike).
+create or replace function sync_artist_genre_ids()
+returns trigger as $$
+begin
+    if tg_op = 'INSERT' then
+        insert into genres (genre) values (new.genre)
+        on conflict (genre) do nothing;
+        insert into artist_genre_ids (artistID, genreID)
+        select new.artistID, g.genreID from genres g where g.genre = new.genre
+        on conflict do nothing;
+        return new;
+    end if;
+    delete from artist_genre_ids agi
+    using genres g
+    where agi.genreID = g.genreID and agi.artistID = old.artistID and g.genre = old.genre;
+    return old;
+end;
+$$ language plpgsql;
+
+drop trigger if exists trg_artist_genres_sync on Artist_Genres;
+create trigger trg_artist_genres_sync
+    after insert or delete on Artist_Genres
+    for each row execute function sync_artist_genre_ids();
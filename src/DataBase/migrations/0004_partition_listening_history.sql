@@ -0,0 +1,83 @@
+-- Range-partition User_Listening_History by month on listenTimestamp so
+-- recently-played ingestion appends to one small partition, old months can
+-- be detached or dropped, and time-bounded reads prune partitions.
+
+-- Creates the monthly partitions covering [from_ts, to_ts], named
+-- user_listening_history_yYYYYmMM. Safe to call repeatedly.
+create or replace function ensure_listening_history_partitions(from_ts timestamp, to_ts timestamp)
+returns int as $$
+declare
+    month_start timestamp := date_trunc('month', from_ts);
+    created int := 0;
+    partition_name text;
+begin
+    while month_start <= to_ts loop
+        partition_name := 'user_listening_history_' || to_char(month_start, '"y"YYYY"m"MM');
+        if to_regclass(partition_name) is null then
+            execute format(
+                'create table %I partition of User_Listening_History for values from (%L) to (%L)',
+                partition_name, month_start, month_start + interval '1 month'
+            );
+            created := created + 1;
+        end if;
+        month_start := month_start + interval '1 month';
+    end loop;
+    return created;
+end;
+$$ language plpgsql;
+
+alter table User_Listening_History rename to user_listening_history_unpartitioned;
+alter table user_listening_history_unpartitioned
+    rename constraint user_listening_history_pkey to user_listening_history_unpartitioned_pkey;
+
+-- The primary key and the dedupe key must contain the partition column;
+-- (userID, trackID, listenTimestamp) is what identifies a play.
+create table User_Listening_History (
+    historyID uuid not null default gen_random_uuid(),
+    userID uuid not null,
+    trackID varchar(200) not null,
+    listenTimestamp timestamp not null default current_timestamp,
+    constraint user_listening_history_pkey
+        primary key (historyID, listenTimestamp),
+    constraint user_listening_history_play_key
+        unique (userID, trackID, listenTimestamp),
+    constraint fk_user_history
+        foreign key (userID)
+            references user_info(id)
+            on delete cascade,
+    constraint fk_track_history
+        foreign key (trackID)
+            references trackinfo(trackID)
+            on delete cascade
+) partition by range (listenTimestamp);
+
+-- Catches plays outside the created months; ensure_listening_history_partitions
+-- should be called for a batch's months before loading it.
+create table user_listening_history_default partition of User_Listening_History default;
+
+select ensure_listening_history_partitions(
+    coalesce((select min(listenTimestamp) from user_listening_history_unpartitioned), current_timestamp::timestamp),
+    current_timestamp::timestamp + interval '1 month'
+);
+
+insert into User_Listening_History (historyID, userID, trackID, listenTimestamp)
+select historyID, userID, trackID, coalesce(listenTimestamp, current_timestamp)
+from user_listening_history_unpartitioned
+on conflict do nothing;
+
+-- Drops the old table together with the 0001 indexes on it.
+drop table user_listening_history_unpartitioned;
+
+-- Per-user history reads are served by the (userID, trackID, listenTimestamp)
+-- unique index; this one covers "latest plays of a user" and the ingester's cursor.
+create index if not exists idx_user_listening_history_user_time
+    on User_Listening_History (userID, listenTimestamp desc);
+
+-- Cascading deletes from trackinfo and joins starting from a track.
+create index if not exists idx_user_listening_history_trackid
+    on User_Listening_History (trackID);
+
+-- Plays arrive in time order, so a BRIN index stays tiny and still
+-- narrows time-range scans within a partition.
+create index if not exists brin_user_listening_history_listen_ts
+    on User_Listening_History using brin (listenTimestamp);
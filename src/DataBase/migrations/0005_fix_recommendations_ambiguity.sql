@@ -0,0 +1,41 @@
+-- recommend_tracks_for_user as created by 0002 compared mtd.trackID with an
+-- unqualified trackID, which plpgsql cannot tell apart from the trackID
+-- output column, so every call failed with "column reference is ambiguous".
+-- 0002 is fixed for new databases; this re-creates the function where the
+-- old version was already applied.
+
+create or replace function recommend_tracks_for_user(p_user_id uuid, p_limit int)
+returns table(
+    trackID varchar,
+    trackName varchar,
+    artistName varchar,
+    popularity int
+) as $$
+begin
+    return query
+    with user_top_artists as (
+        select
+            ti.artistID,
+            count(*) as listen_count
+        from User_Listening_History ulh
+        join trackinfo ti on ulh.trackID = ti.trackID
+        where ulh.userID = p_user_id
+        group by ti.artistID
+        order by listen_count desc
+        limit 5
+    ),
+    user_listened_tracks as (
+        select ulh.trackID from User_Listening_History ulh where ulh.userID = p_user_id
+    )
+    select
+        mtd.trackID,
+        mtd.trackName,
+        mtd.artistName,
+        mtd.popularity
+    from mv_track_details mtd
+    where mtd.artistID in (select artistID from user_top_artists)
+        and mtd.trackID not in (select ult.trackID from user_listened_tracks ult)
+    order by mtd.popularity desc
+    limit p_limit;
+end;
+$$ language plpgsql;
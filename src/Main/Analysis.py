@@ -29,6 +29,26 @@ def find_similar_songs(df, seed_track_id, features, n=10):
     df_similar = df_similar[df_similar['track_id'] != seed_track_id]
     return df_similar.head(n)
 
+def find_similar_tracks(track_ids, features, seed_track_id, n=10):
+    """
+    Finds the most similar tracks to a seed track in a feature matrix.
+
+    Takes the (track_ids, features) arrays of DB_api.get_audio_feature_matrix_*
+    directly. Missing features (NaN) count as the feature's mean after scaling.
+    Returns a list of (track_id, similarity) pairs, most similar first.
+    """
+    seed = np.flatnonzero(track_ids == seed_track_id)
+    if seed.size == 0:
+        return []
+
+    scaled = np.nan_to_num(StandardScaler().fit_transform(features), copy=False)
+    sim_scores = cosine_similarity(scaled[seed[:1]], scaled)[0]
+
+    # Exclude the seed track itself and return the top n
+    sim_scores[track_ids == seed_track_id] = -np.inf
+    top = np.argsort(-sim_scores, kind="stable")[:min(n, len(track_ids) - seed.size)]
+    return [(str(track_ids[i]), float(sim_scores[i])) for i in top]
+
 def plot_radar_chart(df, track_ids, features):
     """
     Generates a radar chart to compare multiple audio features for up to 3 tracks.
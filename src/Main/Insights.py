@@ -1,9 +1,21 @@
 from DataBase.DB_api import DB_api
+from DataBase.DB_cache import cached
 
 class Insights:
     def __init__(self, db_api: DB_api):
+        """
+        Dashboard queries over the catalog.
+
+        Works with a DB_api, or with an AsyncDB_api in which case every
+        method returns a coroutine, e.g. for asyncio.gather.
+        """
         self.db_api = db_api
 
+    def _is_local(self) -> bool:
+        """Embedded backends (DB_local) have no plpgsql functions; their bodies are run inline."""
+        return getattr(self.db_api, "backend", "postgresql") != "postgresql"
+
+    @cached("artistdetails")
     def get_top_artists_by_popularity(self, limit=10):
         """
         Retrieves the top N artists by popularity.
@@ -14,8 +26,9 @@ class Insights:
             ORDER BY popularity DESC
             LIMIT %s;
         """
-        return self.db_api._execute_fetch_query(query, (limit,))
+        return self.db_api._execute_fetch_query(query, (limit,), statement="insights_top_artists_by_popularity", replica=True)
 
+    @cached("trackinfo", "song_popularity")
     def get_top_tracks_by_popularity(self, limit=10):
         """
         Retrieves the top N tracks by popularity.
@@ -27,17 +40,27 @@ class Insights:
             ORDER BY p.popularity DESC
             LIMIT %s;
         """
-        return self.db_api._execute_fetch_query(query, (limit,))
+        return self.db_api._execute_fetch_query(query, (limit,), statement="insights_top_tracks_by_popularity", replica=True)
 
+    @cached("mv_genre_popularity")
     def get_genre_popularity_analysis(self):
         """
         Analyzes the popularity of different genres.
         """
         query = """
-            SELECT * FROM vw_genre_popularity;
+            SELECT genre, avg_popularity, track_count
+            FROM mv_genre_popularity
+            ORDER BY avg_popularity DESC;
+        """
+        return self.db_api._execute_fetch_query(query, statement="insights_genre_popularity_analysis", replica=True)
+
+    def get_data_freshness(self):
+        """
+        Reports when the precomputed dashboard views were last refreshed.
         """
-        return self.db_api._execute_fetch_query(query)
+        return self.db_api.get_materialized_view_staleness()
 
+    @cached("audio_features", "top_hundered_tracks")
     def get_audio_features_analysis(self):
         """
         Provides an analysis of the audio features of the top 100 tracks.
@@ -56,8 +79,9 @@ class Insights:
             FROM audio_features a
             JOIN top_hundered_tracks t ON a.spotify_track_id = t.trackID;
         """
-        return self.db_api._execute_fetch_query(query)
+        return self.db_api._execute_fetch_query(query, statement="insights_audio_features_analysis", replica=True)
 
+    @cached("songdetails", "trackinfo", "song_popularity")
     def get_top_albums_by_avg_track_popularity(self, limit=10):
         """
         Retrieves the top N albums based on the average popularity of their tracks.
@@ -77,18 +101,47 @@ class Insights:
                 avg_track_popularity DESC
             LIMIT %s;
         """
-        return self.db_api._execute_fetch_query(query, (limit,))
+        return self.db_api._execute_fetch_query(query, (limit,), statement="insights_top_albums_by_avg_track_popularity", replica=True)
 
     def get_artist_track_analysis(self, artist_id: str):
         """
         Provides a summary of an artist's tracks, including average popularity and audio features.
         """
         query = "SELECT * FROM get_artist_track_analysis(%s);"
-        return self.db_api._execute_fetch_query(query, (artist_id,))
+        if self._is_local():
+            query = """
+                SELECT COUNT(mtd.trackID), AVG(mtd.popularity), AVG(mtd.danceability), AVG(mtd.energy)
+                FROM mv_track_details mtd
+                WHERE mtd.artistID = %s;
+            """
+        return self.db_api._execute_fetch_query(query, (artist_id,), statement="insights_artist_track_analysis", replica=True)
 
     def get_user_recommendations(self, user_id: str, limit=10):
         """
         Recommends tracks for a user based on their listening history.
         """
         query = "SELECT * FROM recommend_tracks_for_user(%s, %s);"
-        return self.db_api._execute_fetch_query(query, (user_id, limit))
+        params = (user_id, limit)
+        if self._is_local():
+            query = """
+                WITH user_top_artists AS (
+                    SELECT ti.artistID, COUNT(*) AS listen_count
+                    FROM User_Listening_History ulh
+                    JOIN trackinfo ti ON ulh.trackID = ti.trackID
+                    WHERE ulh.userID = %s
+                    GROUP BY ti.artistID
+                    ORDER BY listen_count DESC
+                    LIMIT 5
+                ),
+                user_listened_tracks AS (
+                    SELECT ulh.trackID FROM User_Listening_History ulh WHERE ulh.userID = %s
+                )
+                SELECT mtd.trackID, mtd.trackName, mtd.artistName, mtd.popularity
+                FROM mv_track_details mtd
+                WHERE mtd.artistID IN (SELECT artistID FROM user_top_artists)
+                  AND mtd.trackID NOT IN (SELECT trackID FROM user_listened_tracks)
+                ORDER BY mtd.popularity DESC
+                LIMIT %s;
+            """
+            params = (user_id, user_id, limit)
+        return self.db_api._execute_fetch_query(query, params, statement="insights_user_recommendations", replica=True)
@@ -1,7 +1,8 @@
-import json
 import os
 import sys
 import threading
+import time
+from datetime import datetime, timezone
 
 from requests import session
 
@@ -10,16 +11,23 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from api.spotifyClient import SpotifyClient
 from DataBase.DB_api import DB_api
 from api.reccobeatsApi import reccobeats
+from api.httpTransport import HttpTransport
+from api.responseCache import ResponseCache, DAY
+from api.standInServer import FixtureRecorder
 
 class Session:
-    def __init__(self):
+    def __init__(self, transport: HttpTransport = None, cache: ResponseCache = None):
         """
         Initialize a Session for interacting with Spotify.
 
         Creates the underlying SpotifyClient instance that handles all
         authentication and API requests.
+
+        Args:
+            transport (HttpTransport, optional): Pooled HTTP transport to share with other clients.
+            cache (ResponseCache, optional): On-disk cache for track and artist metadata.
         """
-        self._session = SpotifyClient()
+        self._session = SpotifyClient(transport, cache=cache)
 
     def authenticate_client(self) -> dict:
         """
@@ -93,18 +101,87 @@ class data_Retrieval():
         """
         return self.spotify_client.getArtistDetails(artist_id)
 
-    def get_recently_played(self, limit=20) -> list:
+    def get_recently_played(self, limit=20, ingest: bool = True) -> list:
         """
         Retrieve the authenticated user's recently played tracks.
 
+        Plays newer than the last stored one are first written to
+        User_Listening_History through ingest_recently_played, so every refresh
+        of the list also keeps the history current. A failed ingestion is
+        logged and does not prevent the tracks from being returned.
+
         Args:
             limit (int, optional): Maximum number of tracks to return. Defaults to 20.
+            ingest (bool, optional): Store new plays in the listening history first. Defaults to True.
 
         Returns:
             list: A list of play history items.
         """
+        if ingest:
+            try:
+                ingested = self.ingest_recently_played()
+                if ingested < 0:
+                    print("Could not resolve the current user, recently played tracks were not stored.")
+                else:
+                    print(f"Stored {ingested} recently played tracks in the listening history.")
+            except Exception as e:
+                print(f"An error occurred while storing recently played tracks: {e}")
         return self.spotify_client.getRecentlyPlayed(limit)
 
+    @staticmethod
+    def _parse_played_at(played_at: str) -> datetime:
+        """Parses a Spotify played_at string into a naive UTC datetime, as stored in listenTimestamp."""
+        return datetime.fromisoformat(played_at.replace("Z", "+00:00")).astimezone(timezone.utc).replace(tzinfo=None)
+
+    def ingest_recently_played(self) -> int:
+        """
+        Stores the authenticated user's plays since the last ingestion in User_Listening_History.
+
+        Pages the recently-played endpoint forward from the newest stored play
+        (the `after` cursor), drops plays repeated across pages, and writes
+        each page with two bulk loads: the played tracks into trackinfo, then
+        the plays into the partitioned history table, where plays that are
+        already stored are skipped.
+
+        Returns:
+            int: Number of plays handed to the database, or -1 if the user could not be resolved.
+        """
+        username = self.spotify_client.getCurrentUser()["id"]
+        user_id = self.db_api.get_or_create_user_id(username)
+        if user_id is None:
+            return -1
+
+        rows = self.db_api.get_last_listen_timestamp(user_id)
+        last = rows[0][0] if rows else None
+        after = int(last.replace(tzinfo=timezone.utc).timestamp() * 1000) if last else None
+
+        seen = set()
+        ingested = 0
+        for page in self.spotify_client.iterRecentlyPlayed(after=after):
+            tracks = {}
+            plays = []
+            for item in page:
+                track = item.get("track")
+                if not track or not track.get("id"):
+                    continue
+                play = (user_id, track["id"], self._parse_played_at(item["played_at"]))
+                if play in seen:
+                    continue
+                seen.add(play)
+                plays.append(play)
+                info = SpotifyClient._mapTrackInfo(track)
+                tracks[info["trackID"]] = (
+                    info["trackID"], info["trackName"], info["artistName"], info["artistID"], info["releaseDate"]
+                )
+            if not plays:
+                continue
+            if not self.db_api.insert_track_infos_bulk(list(tracks.values())):
+                break
+            if not self.db_api.insert_listening_history_bulk(plays):
+                break
+            ingested += len(plays)
+        return ingested
+
     def get_top_tracks(self, limit=20, time_range="medium_term") -> list:
         """
         Retrieve the authenticated user's top tracks.
@@ -135,74 +212,171 @@ class data_Retrieval():
         """
         Fetch the Spotify Global Top 100 playlist tracks and persist them.
 
-        Retrieves tracks from a fixed playlist, stores basic track info, and
-        saves a snapshot table for the Top 100 list.
+        Streams the fixed playlist page by page and writes each page to
+        trackinfo and the Top 100 snapshot table while the following pages
+        are still downloading.
 
         Returns:
             bool: True on success, False when playlist retrieval fails.
         """
         playlist_id = "5ABHKGoOzxkaa28ttQV9sE"  # fixed playlist
-        playlist_tracks = self.spotify_client.getPlaylistTracks(playlist_id)
-
-        if not playlist_tracks:
-            return False
-
-        tracks_info_to_insert = []
-        top_hundred_tracks_to_insert = []
-
-        for track_item in playlist_tracks:
-            tracks_info_to_insert.append(
-                (
-                    track_item['trackID'],
-                    track_item['trackName'],
-                    track_item['artistName'],
-                    track_item['artistID'],
-                    track_item['releaseDate']
+        tracks_written = 0
+
+        for page in self.spotify_client.iterPlaylistTracks(playlist_id):
+            tracks_info_to_insert = []
+            top_hundred_tracks_to_insert = []
+
+            for track_item in page:
+                tracks_info_to_insert.append(
+                    (
+                        track_item['trackID'],
+                        track_item['trackName'],
+                        track_item['artistName'],
+                        track_item['artistID'],
+                        track_item['releaseDate']
+                    )
                 )
-            )
-            top_hundred_tracks_to_insert.append(
-                (
-                    track_item['trackID'],
-                    track_item['trackName'],
-                    track_item['artistName'],
-                    track_item['albumName'],
-                    track_item['releaseDate']
+                top_hundred_tracks_to_insert.append(
+                    (
+                        track_item['trackID'],
+                        track_item['trackName'],
+                        track_item['artistName'],
+                        track_item['albumName'],
+                        track_item['releaseDate']
+                    )
                 )
-            )
 
-        if tracks_info_to_insert:
-            self.db_api.insert_track_infos_bulk(tracks_info_to_insert)
+            if tracks_info_to_insert:
+                self.db_api.insert_track_infos_bulk(tracks_info_to_insert)
+
+            if top_hundred_tracks_to_insert:
+                self.db_api.insert_top_hundred_tracks(top_hundred_tracks_to_insert)
 
-        if top_hundred_tracks_to_insert:
-            self.db_api.insert_top_hundred_tracks(top_hundred_tracks_to_insert)
+            tracks_written += len(page)
 
-        return True
+        return tracks_written > 0
     
-    def getAudioFeatures(self, track_ids: list) -> list:
+    def getAudioFeatures(self, track_ids: list) -> dict:
         """
         Retrieve audio features for multiple tracks using the reccobeats API.
 
         Args:
             track_ids (list): List of Spotify track IDs.
         Returns:
-            list: A list of audio feature dictionaries for the provided track IDs.
+            dict: Audio feature dictionaries keyed by track ID; unknown tracks are absent.
         """
         reccobeats_api = reccobeats()
         return reccobeats_api.getmany_Audio_Features(track_ids)
 
+class FeatureAvailabilityCache:
+    miss_resource = "audio-features-miss"
+
+    def __init__(self, db_api: DB_api, cache: ResponseCache = None, miss_ttl: float = 7 * DAY):
+        """
+        Decides which tracks still need audio features from reccobeats.
+
+        Tracks already stored in `audio_features` are found with one set-based
+        query; tracks reccobeats did not know are remembered as misses for
+        `miss_ttl` seconds. Misses are kept in the response cache when one is
+        given so they survive restarts, otherwise in memory.
+
+        Args:
+            db_api (DB_api): Database access layer used for the known-IDs lookup.
+            cache (ResponseCache, optional): Persistent store for misses.
+            miss_ttl (float): Seconds before a miss is asked about again.
+        """
+        self.db_api = db_api
+        self.cache = cache
+        self.miss_ttl = miss_ttl
+        if cache is not None:
+            cache.ttls[self.miss_resource] = miss_ttl
+        self._misses = {}
+        self._lock = threading.Lock()
+        self._stats = {"requested": 0, "known": 0, "misses": 0, "fetched": 0}
+
+    def filter_new(self, track_ids: list[str]) -> list[str]:
+        """
+        Drop tracks that already have audio features or are recent misses.
+
+        Args:
+            track_ids (list[str]): Spotify track IDs to be enriched.
+
+        Returns:
+            list[str]: The IDs that genuinely need a reccobeats lookup.
+        """
+        track_ids = list(dict.fromkeys(track_ids))
+        if not track_ids:
+            return []
+
+        known = {row[0] for row in self.db_api.get_track_ids_with_audio_features(track_ids)}
+        candidates = [t for t in track_ids if t not in known]
+
+        if self.cache is not None:
+            misses = set(self.cache.getMany(self.miss_resource, candidates))
+        else:
+            now = time.time()
+            with self._lock:
+                misses = {t for t in candidates if self._misses.get(t, 0) > now}
+        new_ids = [t for t in candidates if t not in misses]
+
+        with self._lock:
+            self._stats["requested"] += len(track_ids)
+            self._stats["known"] += len(known)
+            self._stats["misses"] += len(misses)
+            self._stats["fetched"] += len(new_ids)
+        return new_ids
+
+    def record_misses(self, requested_ids: list[str], found_ids) -> None:
+        """
+        Remember the requested IDs reccobeats returned no features for.
+
+        Args:
+            requested_ids (list[str]): IDs sent in requests reccobeats answered; IDs of
+                failed requests must be left out so they are not taken for misses.
+            found_ids: IDs that came back with audio features.
+        """
+        found_ids = set(found_ids)
+        missing = [t for t in requested_ids if t not in found_ids]
+        if not missing:
+            return
+        if self.cache is not None:
+            self.cache.putMany(self.miss_resource, {t: True for t in missing})
+        else:
+            expires_at = time.time() + self.miss_ttl
+            with self._lock:
+                self._misses.update((t, expires_at) for t in missing)
+
+    def stats(self) -> dict:
+        """
+        Report how many lookups were skipped as known or as cached misses.
+        """
+        with self._lock:
+            skipped = self._stats["known"] + self._stats["misses"]
+            requested = self._stats["requested"]
+            return dict(self._stats, skipRate=round(skipped / requested, 3) if requested else 0.0)
+
 class data_Processing:
-    def __init__(self, db_api: DB_api, spotify_client: SpotifyClient, reccobeat: reccobeats):
+    max_workers = 5
+
+    def __init__(self, db_api: DB_api, spotify_client: SpotifyClient, reccobeat: reccobeats,
+                 feature_availability: FeatureAvailabilityCache = None):
         """
         Data processing utilities for enriching and persisting derived entities.
 
         Args:
             db_api (DB_api): Database access layer for writes.
             spotify_client (SpotifyClient): Authenticated Spotify client.
+            reccobeat (reccobeats): Audio-feature API client.
+            feature_availability (FeatureAvailabilityCache, optional): Filters out tracks
+                whose audio features are already stored or known to be missing.
         """
         self.db_api = db_api
         self.spotify_client = spotify_client
         self.reccobeat = reccobeat
-        self._lock = threading.Lock()
+        self.feature_availability = feature_availability or FeatureAvailabilityCache(db_api)
+        self.write_buffer = db_api.create_write_buffer()
+        self._artists_lock = threading.Lock()
+        self._claimed_artists = set()
         self.threads = []
 
     def thread_init(self, tracks_chunk: list[tuple[str, str]], thread_id: int) -> None:
@@ -221,8 +395,10 @@ class data_Processing:
         """
         Populate derived data for Top 100 tracks using multiple threads.
 
-        Splits available tracks into up to 5 chunks, processes each chunk
-        concurrently, and waits for completion.
+        Splits available tracks into up to `max_workers` chunks of at least one
+        Spotify batch (50 IDs) each, processes each chunk concurrently, and waits
+        for completion. Buffered writes are then flushed and the materialized
+        dashboard views refreshed.
         """
         try:
             all_tracks = self.db_api.get_top_hundred_with_artist_info()
@@ -231,8 +407,10 @@ class data_Processing:
                 return
 
             self.threads = []
-            
-            num_chunks = min(5, len(all_tracks))
+            self._claimed_artists = set()
+
+            batches = -(-len(all_tracks) // SpotifyClient.MAX_IDS_PER_REQUEST)
+            num_chunks = min(self.max_workers, batches)
             if num_chunks == 0:
                 return
             
@@ -247,37 +425,96 @@ class data_Processing:
             for thread in self.threads:
                 thread.join()
 
+            self.write_buffer.flush()
+            print(f"Write buffer stats: {self.write_buffer.stats()}")
+            if self.db_api.refresh_materialized_views():
+                print("Materialized views refreshed.")
             print("\nData population process completed successfully.")
 
         except Exception as e:
             print(f"An error occurred while processing derived data: {e}")
 
+    def _claim_artists(self, artist_ids: list[str]) -> list[str]:
+        """
+        Reserve artist IDs that no other worker has fetched during this run.
+
+        Args:
+            artist_ids (list[str]): Artist IDs referenced by a chunk of tracks.
+
+        Returns:
+            list[str]: The deduplicated IDs this worker is responsible for.
+        """
+        with self._artists_lock:
+            claimed = [a for a in dict.fromkeys(artist_ids) if a not in self._claimed_artists]
+            self._claimed_artists.update(claimed)
+        return claimed
+
+    def _release_artists(self, artist_ids) -> None:
+        """
+        Hand back claimed artist IDs whose details could not be fetched, so another worker may retry them.
+
+        Args:
+            artist_ids: Artist IDs previously returned by _claim_artists.
+        """
+        with self._artists_lock:
+            self._claimed_artists.difference_update(artist_ids)
+
     def populate_derived_data(self, tracks: list[tuple[str, str]], thread_id: int) -> None:
         """
         Enrich tracks with song, album, and artist details; persist derived tables.
 
-        For each (track_id, artist_id) pair, fetches details from the Spotify API
-        and writes to dedicated database tables such as popularity, songs, albums,
-        artists, and artist genres.
+        Fetches song and artist details for the whole chunk through the
+        multi-ID Spotify endpoints (artists deduplicated first), then queues
+        each (track_id, artist_id) pair for dedicated database tables such as
+        popularity, songs, albums, artists, and artist genres. Rows go through
+        the shared write buffer, which commits them in batches.
 
         Args:
             tracks (list[tuple[str, str]]): Track and artist identifiers to process.
             thread_id (int): Numerical identifier for logging.
         """
         try:
+            track_ids = [track_id for track_id, _ in tracks]
+            print(f"Thread {thread_id} : Fetching details for {len(tracks)} tracks...")
+            songs_by_id = {}
+            artists_by_id = {}
+            try:
+                songs_by_id = self.spotify_client.getSongDetailsBatch(track_ids)
+            except Exception as e:
+                print(f"  - Could not fetch track details in thread {thread_id} from API: {e}")
+            artist_ids = self._claim_artists([artist_id for _, artist_id in tracks])
+            try:
+                artists_by_id = self.spotify_client.getArtistDetailsBatch(artist_ids)
+            except Exception as e:
+                print(f"  - Could not fetch artist details in thread {thread_id} from API: {e}")
+            # Artists that did not come back stay unclaimed; otherwise no worker would ever write them.
+            self._release_artists([a for a in artist_ids if a not in artists_by_id])
+
             for i, (track_id, artist_id) in enumerate(tracks):
                 print(f"Thread {thread_id} : Processing track {i + 1}/{len(tracks)} (TrackID: {track_id})...")
-                song_details = None
-                artist_details = None
-                try:
-                    song_details = self.spotify_client.getSongDetails(track_id)
-                    artist_details = self.spotify_client.getArtistDetails(artist_id)
-                except Exception as e:
-                    print(f"  - Could not fetch details for track {track_id} from API: {e}")
+                song_details = songs_by_id.get(track_id)
+                artist_details = artists_by_id.pop(artist_id, None)
+
+                # Artists go first so a max_rows flush between the adds never holds an album without its artist.
+                if artist_details:
+                    artist_data = (
+                        artist_details['artistID'],
+                        artist_details['artistName'],
+                        ",".join(artist_details['genres']),
+                        artist_details['popularity'],
+                        artist_details['followers'],
+                        artist_details['spotifyUrl']
+                    )
+                    self.write_buffer.add("artistdetails", artist_data)
+
+                    artist_pop_data = (artist_details['artistID'], artist_details['popularity'])
+                    self.write_buffer.add("artist_popularity", artist_pop_data)
+
+                    for genre in artist_details.get('genres', []):
+                        self.write_buffer.add("artist_genres", (artist_details['artistID'], genre))
 
                 if song_details:
-                    song_pop_data = (song_details['trackID'], song_details['popularity'])
-                    self.db_api.insert_song_popularity(song_pop_data)
+                    self.write_buffer.add("song_popularity", (song_details['trackID'], song_details['popularity']))
 
                     song_details_data = (
                         song_details['trackID'],
@@ -293,7 +530,7 @@ class data_Processing:
                         song_details['previewUrl'],
                         song_details['spotifyUrl']
                     )
-                    self.db_api.insert_song_details(song_details_data)
+                    self.write_buffer.add("songdetails", song_details_data)
 
                     album = song_details.get('album', {})
                     if album.get('id'):
@@ -305,64 +542,47 @@ class data_Processing:
                             album.get('external_urls', {}).get('spotify'),
                             album.get('total_tracks')
                         )
-                        self.db_api.insert_albums(album_data)
-
-                if artist_details:
-                    artist_data = (
-                        artist_details['artistID'],
-                        artist_details['artistName'],
-                        ",".join(artist_details['genres']),
-                        artist_details['popularity'],
-                        artist_details['followers'],
-                        artist_details['spotifyUrl']
-                    )
-                    self.db_api.insert_artist_details(artist_data)
-
-                    artist_pop_data = (artist_details['artistID'], artist_details['popularity'])
-                    self.db_api.insert_artist_popularity(artist_pop_data)
-
-                    for genre in artist_details.get('genres', []):
-                        genre_data = (artist_details['artistID'], genre)
-                        self.db_api.insert_artist_genre(genre_data)
+                        self.write_buffer.add("albums", album_data)
 
         except Exception as e:
             print(f"An error occurred while processing derived data in thread {thread_id}: {e}")
         
         try:
-            with self._lock:
-                print(f"Thread {thread_id} : Retreiving Audio Features for {len(tracks)} tracks.")
-                track_ids = [track_id for track_id, _ in tracks]
-                audio_features = self.reccobeat.getmany_Audio_Features(track_ids)
-                features_to_insert = []
-                counter=0
-                for feature in audio_features:
-                    if not feature:
-                        continue
-                    try:
-                        feature_data = (
-                            track_ids[counter],           # spotify_track_id
-                            feature['id'],                # trackid (same as spotify id in our schema)
-                            feature['danceability'],
-                            feature['energy'],
-                            feature['key'],
-                            feature['loudness'],
-                            feature['mode'],
-                            feature['speechiness'],
-                            feature['acousticness'],
-                            feature['instrumentalness'],
-                            feature['liveness'],
-                            feature['valence'],
-                            feature['tempo'],
-                        )
-                        features_to_insert.append(feature_data)
-                    except KeyError as e:
-                        print(f"  - Warning: Missing key {e} in audio features in thread {thread_id}. Skipping item.")
-                    except json.JSONDecodeError:
-                        print(f"  - Warning: Could not decode audio features in thread {thread_id}.")
-                    counter=+1
-
-                if features_to_insert:
-                    self.db_api.insertmany_audio_features(features_to_insert)
+            track_ids = self.feature_availability.filter_new([track_id for track_id, _ in tracks])
+            print(f"Thread {thread_id} : Retreiving Audio Features for {len(track_ids)} of {len(tracks)} tracks.")
+            if not track_ids:
+                return
+            audio_features, failed_ids = self.reccobeat.fetchAudioFeatures(track_ids)
+            if failed_ids:
+                print(f"Thread {thread_id} : Audio feature requests failed for {len(failed_ids)} tracks, will retry next run.")
+            # Only tracks from chunks reccobeats answered are misses; failed requests are asked again next run.
+            failed_ids = set(failed_ids)
+            self.feature_availability.record_misses([t for t in track_ids if t not in failed_ids],
+                                                    audio_features.keys())
+            features_to_insert = []
+            for track_id, feature in audio_features.items():
+                try:
+                    feature_data = (
+                        track_id,                     # spotify_track_id
+                        track_id,                     # trackid (same as spotify id in our schema)
+                        feature['danceability'],
+                        feature['energy'],
+                        feature['key'],
+                        feature['loudness'],
+                        feature['mode'],
+                        feature['speechiness'],
+                        feature['acousticness'],
+                        feature['instrumentalness'],
+                        feature['liveness'],
+                        feature['valence'],
+                        feature['tempo'],
+                    )
+                    features_to_insert.append(feature_data)
+                except KeyError as e:
+                    print(f"  - Warning: Missing key {e} in audio features in thread {thread_id}. Skipping item.")
+
+            if features_to_insert:
+                self.db_api.insertmany_audio_features(features_to_insert)
         
         except Exception as e:
             print(f"An error occurred while retrieving audio features in thread {thread_id}: {e}")
@@ -373,15 +593,34 @@ class main(Session):
         Application entry point orchestrating authentication, retrieval, and processing.
 
         Initializes database access, retrieval helpers, and processing pipelines.
-        """
-        super().__init__()
+        Both API clients share one pooled transport sized to the worker count
+        and one on-disk response cache. Setting API_RECORD_DIR records every API
+        response there as a fixture for the offline stand-in server.
+        """
+        self.transport = HttpTransport(pool_maxsize=data_Processing.max_workers)
+        if os.getenv("API_RECORD_DIR"):
+            self.transport.recorder = FixtureRecorder(os.getenv("API_RECORD_DIR"))
+        self.cache = ResponseCache()
+        super().__init__(self.transport, self.cache)
         self.db_api = DB_api()
+        if self.db_api.pool and self.db_api.pool.maxconn < data_Processing.max_workers:
+            print(f"Warning: pool maxconn ({self.db_api.pool.maxconn}) is below the worker count "
+                  f"({data_Processing.max_workers}); workers will wait for connections.")
         self.data_Retrieval = data_Retrieval(self.db_api, self.session)
-        self.data_Processing = data_Processing(self.db_api, self.session, reccobeats())
+        self.data_Processing = data_Processing(self.db_api, self.session, reccobeats(self.transport, cache=self.cache),
+                                               FeatureAvailabilityCache(self.db_api, self.cache))
 
     def close_app(self):
         """
         Gracefully shut down the application and close DB connections.
         """
+        print(f"Prepared statement stats: {self.db_api.statement_stats()}")
+        print(f"Query cache stats: {self.db_api.query_cache.stats()}")
+        print(f"Connection pool stats: {self.db_api.pool_stats()}")
         self.db_api.close_pool()
+        print(f"HTTP connection stats: {self.transport.stats()}")
+        print(f"Response cache stats: {self.cache.stats()}")
+        print(f"Audio feature lookup stats: {self.data_Processing.feature_availability.stats()}")
+        self.transport.close()
+        self.cache.close()
         print("Application finished and database connections closed.")
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import IsolationForest
@@ -58,6 +59,33 @@ class AnomalyDetector:
         anomalous_tracks = audio_features_df.nsmallest(n, 'anomaly_score')
         return anomalous_tracks
 
+    def find_anomalies_matrix(self, track_ids, features, n=10):
+        """
+        Finds the most anomalous tracks in a feature matrix.
+
+        Args:
+            track_ids (np.ndarray): Track IDs, one per row of features.
+            features (np.ndarray): (n_tracks, 11) float32 matrix as returned by
+                DB_api.get_audio_feature_matrix_*, in the column order of the training features.
+            n (int): The number of top anomalies to return.
+
+        Returns:
+            list: (track_id, anomaly_score) pairs, most anomalous first, or None.
+        """
+        if self.model is None:
+            print("Anomaly model not loaded. Cannot find anomalies.")
+            return None
+
+        # Rows with missing features cannot be scored
+        complete = ~np.isnan(features).any(axis=1)
+        if not complete.all():
+            features, track_ids = features[complete], track_ids[complete]
+        X = pd.DataFrame(features, columns=self.scaler.feature_names_in_, copy=False)
+        scores = self.model.decision_function(self.scaler.transform(X))
+
+        top = np.argsort(scores, kind="stable")[:n]
+        return [(str(track_ids[i]), float(scores[i])) for i in top]
+
 def train_and_save_anomaly_model(csv_path, model_save_path='anomaly_model.joblib'):
     """
     Trains an anomaly detection model and saves it.
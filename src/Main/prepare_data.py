@@ -1,8 +1,8 @@
 
 import pandas as pd
 import os
-import time
 from Main import data_Retrieval, Session
+from api.responseCache import ResponseCache
 
 def prepare_data(input_csv_path, output_csv_path):
     """
@@ -12,7 +12,8 @@ def prepare_data(input_csv_path, output_csv_path):
         input_csv_path (str): The path to the input CSV file.
         output_csv_path (str): The path to save the output CSV file.
     """
-    session = Session()
+    cache = ResponseCache()
+    session = Session(cache=cache)
     session.authenticate_client()
     data_retrieval = data_Retrieval(None, session.session)
 
@@ -25,8 +26,7 @@ def prepare_data(input_csv_path, output_csv_path):
         if (i + 1) % 20 == 0:
             print(f"  Processed {i + 1}/{len(df)} tracks...")
         try:
-            # Add a small delay to avoid hitting API rate limits
-            time.sleep(0.1)
+            # Pacing and 429 backoff are handled by the client's shared rate limiter
             track_details = data_retrieval.get_track_details(track_id)
             if track_details and 'artists' in track_details and track_details['artists']:
                 artist_id = track_details['artists'][0]['id']
@@ -38,18 +38,14 @@ def prepare_data(input_csv_path, output_csv_path):
             else:
                 genres.append('Unknown')
         except Exception as e:
-            if "429" in str(e):
-                print("Rate limit hit. Waiting for 10 seconds before continuing...")
-                time.sleep(10)
-                # Retry the current track
-                i -= 1 
-                continue
             print(f"Error fetching details for track {track_id}: {e}")
             genres.append('Unknown')
 
     df['genre'] = genres
     df.to_csv(output_csv_path, index=False)
     print(f"Data with genres saved to {output_csv_path}")
+    print(f"Response cache stats: {cache.stats()}")
+    cache.close()
 
 if __name__ == '__main__':
     input_csv = os.path.join(os.path.dirname(__file__), '..', 'DataBase', 'SpotifyAudioFeaturesApril2019.csv')
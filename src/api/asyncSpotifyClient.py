@@ -0,0 +1,344 @@
+# Asyncio counterpart of SpotifyClient for high-concurrency ingestion
+
+import asyncio
+import os
+import random
+import time
+import aiohttp
+from dotenv import load_dotenv
+from typing import List, Dict
+
+from .spotifyClient import SpotifyClient, envPath
+from .rateLimiter import RateLimiter, get_shared_limiter
+from .httpTransport import HttpTransport, RETRY_STATUSES
+
+
+class AsyncSpotifyClient:
+    """
+    Same method surface as SpotifyClient, but every call is a coroutine.
+
+    A bounded semaphore caps the number of requests in flight and the
+    shared token-bucket limiter keeps the aggregate rate under the Spotify
+    budget, so hundreds of lookups can be awaited together with
+    asyncio.gather without spawning OS threads.
+    """
+    MAX_IDS_PER_REQUEST = SpotifyClient.MAX_IDS_PER_REQUEST
+    TOKEN_REFRESH_MARGIN = SpotifyClient.TOKEN_REFRESH_MARGIN
+
+    def __init__(self, maxConcurrency: int = 100,
+                 rateLimiter: RateLimiter = None,
+                 accessToken: str = None,
+                 refreshToken: str = None,
+                 tokenExpiresAt: float = None,
+                 apiBaseUrl: str = None,
+                 accountsBaseUrl: str = None,
+                 timeout: float = 30,
+                 maxRetries: int = 5,
+                 backoffBase: float = 0.5,
+                 backoffCap: float = 30.0):
+        load_dotenv(dotenv_path=envPath)
+        self.apiBaseUrl = apiBaseUrl or os.getenv("SPOTIFY_API_BASE_URL", "https://api.spotify.com/v1")
+        self.accountsBaseUrl = accountsBaseUrl or os.getenv("SPOTIFY_ACCOUNTS_BASE_URL", "https://accounts.spotify.com")
+        self.clientId = os.getenv("SPOTIFY_CLIENT_ID")
+        self.clientSecret = os.getenv("SPOTIFY_CLIENT_SECRET")
+        self.tokenUrl = f"{self.accountsBaseUrl}/api/token"
+        self.accessToken = accessToken
+        self.refreshToken = refreshToken
+        self.tokenExpiresAt = tokenExpiresAt
+        self._tokenLock = asyncio.Lock()
+        self.rateLimiter = rateLimiter or get_shared_limiter(
+            "spotify", float(os.getenv("SPOTIFY_MAX_RPS", "10")))
+        self.maxConcurrency = maxConcurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.maxRetries = maxRetries
+        self.backoffBase = backoffBase
+        self.backoffCap = backoffCap
+        self._semaphore = asyncio.Semaphore(maxConcurrency)
+        self._session = None
+
+    @classmethod
+    def fromClient(cls, client: SpotifyClient, **kwargs) -> "AsyncSpotifyClient":
+        """
+        Creates an async client that reuses the tokens and rate limiter of a sync client.
+        """
+        return cls(rateLimiter=client.rateLimiter,
+                   accessToken=client.accessToken,
+                   refreshToken=client.refreshToken,
+                   tokenExpiresAt=client.tokenExpiresAt,
+                   apiBaseUrl=client.apiBaseUrl,
+                   accountsBaseUrl=client.accountsBaseUrl,
+                   **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _getSession(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.maxConcurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def _request(self, method: str, url: str, **kwargs):
+        """
+        Sends one request under the semaphore and the shared rate limiter.
+
+        Returns:
+            Tuple of (status code, decoded JSON body or None).
+        """
+        session = self._getSession()
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                delay = self.rateLimiter.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    async with session.request(method, url, **kwargs) as response:
+                        status = response.status
+                        retryAfter = HttpTransport._retryAfter(response)
+                        data = await response.json(content_type=None) if status not in RETRY_STATUSES else None
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if attempt >= self.maxRetries:
+                        raise
+                    status, retryAfter, data = None, None, None
+
+            if status is not None and status not in RETRY_STATUSES:
+                return status, data
+            if attempt >= self.maxRetries:
+                return status, data
+
+            delay = random.uniform(0, min(self.backoffCap, self.backoffBase * (2 ** attempt)))
+            if retryAfter is not None:
+                delay = retryAfter + random.uniform(0, self.backoffBase)
+            if status == 429:
+                self.rateLimiter.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    def _storeToken(self, tokenData: Dict) -> str:
+        self.accessToken = tokenData["access_token"]
+        self.refreshToken = tokenData.get("refresh_token", self.refreshToken)
+        expiresIn = tokenData.get("expires_in")
+        self.tokenExpiresAt = time.monotonic() + expiresIn if expiresIn else None
+        return self.accessToken
+
+    def _tokenIsValid(self) -> bool:
+        if not self.accessToken:
+            return False
+        if self.tokenExpiresAt is None:
+            return True
+        return time.monotonic() < self.tokenExpiresAt - self.TOKEN_REFRESH_MARGIN
+
+    async def _renewToken(self, requireUser: bool):
+        if self.refreshToken:
+            await self.refreshAccessToken()
+        elif requireUser:
+            raise Exception("User not authenticated.")
+        else:
+            await self.authenticate()
+
+    async def _ensureToken(self, requireUser: bool = False) -> str:
+        """
+        Returns a token valid for at least TOKEN_REFRESH_MARGIN seconds; concurrent
+        callers wait on one renewal instead of each starting their own.
+        """
+        if self._tokenIsValid():
+            return self.accessToken
+        async with self._tokenLock:
+            if not self._tokenIsValid():
+                await self._renewToken(requireUser)
+            return self.accessToken
+
+    async def _get(self, url: str, params: Dict = None, requireUser: bool = False):
+        """
+        Sends an authorized GET, retrying once with a renewed token on 401.
+        """
+        token = await self._ensureToken(requireUser)
+        for attempt in range(2):
+            headers = {"Authorization": f"Bearer {token}"}
+            status, data = await self._request("GET", url, headers=headers, params=params)
+            if status != 401 or attempt:
+                return status, data
+            async with self._tokenLock:
+                if self.accessToken == token:
+                    await self._renewToken(requireUser)
+                token = self.accessToken
+
+    async def _postToken(self, data: Dict) -> Dict:
+        auth = aiohttp.BasicAuth(self.clientId, self.clientSecret)
+        status, tokenData = await self._request("POST", self.tokenUrl, data=data, auth=auth)
+        if status != 200:
+            raise Exception(f"Failed to authenticate with Spotify: {status}")
+        return tokenData
+
+    async def authenticate(self) -> str:
+        """
+        Handles Client Credentials Flow.
+        """
+        return self._storeToken(await self._postToken({"grant_type": "client_credentials"}))
+
+    async def refreshAccessToken(self) -> str:
+        """
+        Refreshes the access token using refresh token.
+        """
+        return self._storeToken(await self._postToken({
+            "grant_type": "refresh_token",
+            "refresh_token": self.refreshToken
+        }))
+
+    async def searchTrack(self, track: str = None,
+                          artist: str = None,
+                          album: str = None,
+                          genre: str = None,
+                          year: str = None,
+                          query: str = None,
+                          limit: int = 10) -> List[Dict]:
+        """
+        Searches for a track on Spotify.
+        """
+        finalQuery = SpotifyClient._buildSearchQuery(track, artist, album, genre, year, query)
+        url = f"{self.apiBaseUrl}/search"
+        params = {"q": finalQuery, "type": "track", "limit": limit}
+
+        status, data = await self._get(url, params)
+        if status != 200:
+            raise Exception(f"Searching failed: {status}")
+
+        items = data.get("tracks", {}).get("items", [])
+        return [SpotifyClient._mapTrackInfo(i) for i in items]
+
+    async def getSongDetails(self, trackId):
+        """Fetch detailed metadata for a specific track."""
+        status, data = await self._get(f"{self.apiBaseUrl}/tracks/{trackId}")
+        if status != 200:
+            raise Exception(f"Fetching song details failed: {status}")
+
+        return SpotifyClient._mapSongDetails(data)
+
+    async def getSongDetailsBatch(self, trackIds: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch detailed metadata for many tracks; the 50-ID chunks are requested concurrently.
+        """
+        uniqueIds = list(dict.fromkeys(trackIds))
+        chunks = [uniqueIds[i:i + self.MAX_IDS_PER_REQUEST]
+                  for i in range(0, len(uniqueIds), self.MAX_IDS_PER_REQUEST)]
+        responses = await asyncio.gather(*[
+            self._get(f"{self.apiBaseUrl}/tracks", {"ids": ",".join(chunk)}) for chunk in chunks
+        ])
+
+        songs = {}
+        for status, data in responses:
+            if status != 200:
+                raise Exception(f"Fetching song details failed: {status}")
+            for track in data.get("tracks", []):
+                song = SpotifyClient._mapSongDetails(track)
+                if song:
+                    songs[song["trackID"]] = song
+        return songs
+
+    async def getArtistDetails(self, artistId):
+        """Fetch metadata for an artist."""
+        status, data = await self._get(f"{self.apiBaseUrl}/artists/{artistId}")
+        if status != 200:
+            raise Exception(f"Fetching artist details failed: {status}")
+
+        return SpotifyClient._mapArtistDetails(data)
+
+    async def getArtistDetailsBatch(self, artistIds: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch metadata for many artists; the 50-ID chunks are requested concurrently.
+        """
+        uniqueIds = list(dict.fromkeys(artistIds))
+        chunks = [uniqueIds[i:i + self.MAX_IDS_PER_REQUEST]
+                  for i in range(0, len(uniqueIds), self.MAX_IDS_PER_REQUEST)]
+        responses = await asyncio.gather(*[
+            self._get(f"{self.apiBaseUrl}/artists", {"ids": ",".join(chunk)}) for chunk in chunks
+        ])
+
+        artists = {}
+        for status, data in responses:
+            if status != 200:
+                raise Exception(f"Fetching artist details failed: {status}")
+            for artist in data.get("artists", []):
+                if artist:
+                    artists[artist["id"]] = SpotifyClient._mapArtistDetails(artist)
+        return artists
+
+    async def getCurrentUser(self):
+        """
+        Fetch the profile of the authorized user.
+        """
+        status, data = await self._get(f"{self.apiBaseUrl}/me", requireUser=True)
+        if status != 200:
+            raise Exception(f"Fetching current user failed: {status}")
+
+        return data
+
+    async def getRecentlyPlayed(self, limit=20, after: int = None, before: int = None):
+        """
+        Fetch user's recently played tracks.
+        `after`/`before` (Unix milliseconds, mutually exclusive) bound the returned plays.
+        """
+        params = {"limit": limit}
+        if after is not None:
+            params["after"] = after
+        elif before is not None:
+            params["before"] = before
+        status, data = await self._get(f"{self.apiBaseUrl}/me/player/recently-played", params,
+                                      requireUser=True)
+        if status != 200:
+            raise Exception(f"Fetching recently played failed: {status}")
+
+        return data.get("items", [])
+
+    async def getTopItems(self, item_type="tracks", time_range="medium_term", limit=20):
+        """
+        Fetch user's top tracks or artists.
+        """
+        url = f"{self.apiBaseUrl}/me/top/{item_type}"
+        status, data = await self._get(url, {"time_range": time_range, "limit": limit}, requireUser=True)
+        if status != 200:
+            raise Exception(f"Fetching top {item_type} failed: {status}")
+
+        return data.get("items", [])
+
+    async def getPlaylistTracks(self, playlistUrlOrId, limit=100,
+                                fields: str = SpotifyClient.PLAYLIST_TRACK_FIELDS):
+        """
+        Fetch all tracks from a public playlist.
+        The first page gives the total, the remaining offsets are fetched concurrently.
+        """
+        playlistId = SpotifyClient._playlistId(playlistUrlOrId)
+        url = f"{self.apiBaseUrl}/playlists/{playlistId}/tracks"
+
+        def pageParams(offset):
+            params = {"limit": limit, "offset": offset}
+            if fields:
+                params["fields"] = fields
+            return params
+
+        status, first = await self._get(url, pageParams(0))
+        if status != 200:
+            raise Exception(f"Fetching playlist failed: {status}")
+
+        offsets = range(limit, first.get("total", 0), limit)
+        rest = await asyncio.gather(*[self._get(url, pageParams(o)) for o in offsets])
+
+        tracks = []
+        for status, data in [(status, first)] + list(rest):
+            if status != 200:
+                raise Exception(f"Fetching playlist failed: {status}")
+            for i in data.get("items", []):
+                track = i.get("track")
+                if track and track.get("id"):
+                    tracks.append(SpotifyClient._mapTrackInfo(track))
+        return tracks
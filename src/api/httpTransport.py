@@ -0,0 +1,174 @@
+import random
+import threading
+import time
+import requests
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import Dict
+
+from .rateLimiter import RateLimiter
+
+"""
+Shared HTTP transport for the API adapters.
+
+Wraps a single requests.Session with a connection-pooled adapter so that
+every call to Spotify or reccobeats reuses keep-alive connections instead of
+paying a fresh TCP+TLS handshake per request. Requests can be paced by a
+shared RateLimiter and are retried on 429/5xx with jittered exponential
+backoff, honouring Retry-After when the server sends it.
+"""
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_TIMEOUT = (5, 30)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpTransport:
+    def __init__(self, pool_connections: int = 4,
+                 pool_maxsize: int = DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_TIMEOUT,
+                 keep_alive: bool = True,
+                 max_retries: int = 5,
+                 backoff_base: float = 0.5,
+                 backoff_cap: float = 30.0):
+        """
+        Args:
+            pool_connections: Number of host pools to keep (one per API host).
+            pool_maxsize: Connections kept alive per host, match this to the worker count.
+            timeout: Default (connect, read) timeout in seconds for every request.
+            keep_alive: Whether connections are kept open between requests.
+            max_retries: Retries on 429/5xx responses and connection errors.
+            backoff_base: First backoff step in seconds, doubled on every retry.
+            backoff_cap: Upper bound for a single backoff sleep in seconds.
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.pool_maxsize = pool_maxsize
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        # Optional standInServer.FixtureRecorder that captures every final response
+        self.recorder = None
+
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool_connections,
+                                   pool_maxsize=pool_maxsize,
+                                   pool_block=True)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers["Connection"] = "keep-alive" if keep_alive else "close"
+
+    def request(self, method: str, url: str, limiter: RateLimiter = None, **kwargs) -> requests.Response:
+        """
+        Sends a request through the pooled session, applying the default timeout.
+
+        Args:
+            method: HTTP method.
+            url: Absolute URL.
+            limiter: Shared rate limiter to take a token from before every attempt.
+
+        Returns:
+            The final response; 429/5xx are only returned once retries are used up.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            if limiter:
+                limiter.acquire()
+            with self._lock:
+                self._requests += 1
+
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                if self.recorder:
+                    self.recorder.record(method, url, kwargs.get("params"), response)
+                return response
+            if attempt >= self.max_retries:
+                return response
+
+            delay = self._backoff(attempt)
+            retryAfter = self._retryAfter(response)
+            if retryAfter is not None:
+                delay = retryAfter + random.uniform(0, self.backoff_base)
+
+            with self._lock:
+                self._retries += 1
+            if limiter and response is not None and response.status_code == 429:
+                # Every thread sharing the limiter backs off, not only this one.
+                limiter.pause(delay)
+            else:
+                time.sleep(delay)
+            attempt += 1
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _retryAfter(response: requests.Response):
+        """Parses Retry-After as delta-seconds or an HTTP date; returns None when absent."""
+        if response is None:
+            return None
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Reports how many requests were sent and how many of them reused a pooled connection.
+        """
+        connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            hostPool = pools.get(key)
+            if hostPool is not None:
+                connections += hostPool.num_connections
+        with self._lock:
+            sent = self._requests
+            retries = self._retries
+        return {
+            "requests": sent,
+            "connections": connections,
+            "reused": max(sent - connections, 0),
+            "retries": retries
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_sharedTransport = None
+_sharedLock = threading.Lock()
+
+
+def get_shared_transport() -> HttpTransport:
+    """
+    Returns the process-wide transport, creating it with default sizing on first use.
+    """
+    global _sharedTransport
+    with _sharedLock:
+        if _sharedTransport is None:
+            _sharedTransport = HttpTransport()
+        return _sharedTransport
@@ -0,0 +1,76 @@
+import threading
+import time
+from typing import Dict
+
+"""
+Token-bucket rate limiting shared by every thread that talks to an API.
+"""
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: int = None):
+        """
+        Args:
+            rate: Sustained requests per second allowed.
+            burst: Bucket capacity, i.e. how many requests may go out back to back.
+        """
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = float(rate)
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._pausedUntil = 0.0
+        self._lock = threading.Lock()
+        self.waitedSeconds = 0.0
+        self.throttled = 0
+
+    def reserve(self) -> float:
+        """
+        Takes one token and returns how many seconds the caller must wait before sending.
+        Waiting is left to the caller so the same bucket serves threads and event loops.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+
+            delay = max(self._pausedUntil - now, 0.0)
+            if self._tokens < 0:
+                delay = max(delay, -self._tokens / self.rate)
+            if delay > 0:
+                self.throttled += 1
+                self.waitedSeconds += delay
+            return delay
+
+    def acquire(self):
+        """Blocks the calling thread until it may send one request."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        """
+        Holds back every caller for the given time, e.g. after the server sent Retry-After.
+        """
+        with self._lock:
+            self._pausedUntil = max(self._pausedUntil, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"throttled": self.throttled, "waitedSeconds": round(self.waitedSeconds, 3)}
+
+
+_sharedLimiters = {}
+_sharedLock = threading.Lock()
+
+
+def get_shared_limiter(name: str, rate: float, burst: int = None) -> RateLimiter:
+    """
+    Returns the process-wide limiter for an API, so all clients and threads share one budget.
+    """
+    with _sharedLock:
+        if name not in _sharedLimiters:
+            _sharedLimiters[name] = RateLimiter(rate, burst)
+        return _sharedLimiters[name]
@@ -1,35 +1,48 @@
+import os
 import requests
 import json
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+from .httpTransport import HttpTransport, get_shared_transport
+from .rateLimiter import RateLimiter, get_shared_limiter
+from .responseCache import ResponseCache
 
 """
 An API adapter to retrieve data from reccobeats
 """
 
 class reccobeats:
-    def __init__(self):
-        self.BaseURL = "https://api.reccobeats.com"
+    # Largest ID list the audio-features endpoint accepts in one request
+    MAX_IDS_PER_REQUEST = 40
+
+    def __init__(self, transport: HttpTransport = None, rateLimiter: RateLimiter = None,
+                 cache: ResponseCache = None, baseUrl: str = None):
+        self.BaseURL = baseUrl or os.getenv("RECCOBEATS_BASE_URL", "https://api.reccobeats.com")
+        self.http = transport or get_shared_transport()
+        self.rateLimiter = rateLimiter or get_shared_limiter("reccobeats", 5)
+        self.cache = cache
 
-    def getmany_Audio_Features(self, tracks: List[str]) -> List[Dict]:
+    @staticmethod
+    def _trackIdOf(feature: Dict) -> str:
         """
-        Wrapper to perform correct API call for audio features
-        
-        Args:
-            tracks: A list of all the tracks to get Audio features for
+        Returns the Spotify track ID a feature row belongs to, taken from its Spotify href.
+        """
+        href = (feature or {}).get('href') or ''
+        return href.rstrip('/').split('/')[-1].split('?')[0] or None
 
-        Returns:
-            A list of dictionaries of audio features
+    def _fetchChunk(self, tracks: List[str]) -> Optional[List[Dict]]:
+        """
+        Performs one audio-features request for at most MAX_IDS_PER_REQUEST IDs.
+        Failures are logged and yield None so other chunks still land and callers
+        can tell a failed request from tracks reccobeats does not know.
         """
-        if not tracks:
-            return []
-            
-        payload = ",".join(tracks)
         url = f"{self.BaseURL}/v1/audio-features"
         headers = {'Accept': 'application/json'}
-        params = {'ids': payload}
-        
+        params = {'ids': ",".join(tracks)}
+
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = self.http.get(url, headers=headers, params=params, limiter=self.rateLimiter)
             response.raise_for_status()  # Raise an exception for bad status codes
             data = response.json()
             # The API is expected to return a dictionary with a 'content' key.
@@ -37,10 +50,68 @@ class reccobeats:
                 return data['content']
             else:
                 print(f"Unexpected response format from reccobeats API: {data}")
-                return []
+                return None
         except requests.exceptions.RequestException as e:
             print(f"Error fetching from reccobeats API: {e}")
-            return []
+            return None
         except json.JSONDecodeError:
             print(f"Error decoding JSON from reccobeats API. Response: {response.text}")
-            return []
+            return None
+
+    def getmany_Audio_Features(self, tracks: List[str], maxWorkers: int = None) -> Dict[str, Dict]:
+        """
+        Wrapper to perform correct API call for audio features
+
+        Args:
+            tracks: A list of all the tracks to get Audio features for
+            maxWorkers: Upper bound on concurrent requests
+
+        Returns:
+            A dictionary of Spotify track ID to its audio features;
+            tracks reccobeats does not know or whose request failed are absent
+        """
+        features, _ = self.fetchAudioFeatures(tracks, maxWorkers)
+        return features
+
+    def fetchAudioFeatures(self, tracks: List[str], maxWorkers: int = None) -> Tuple[Dict[str, Dict], List[str]]:
+        """
+        Retrieves audio features and reports which tracks could not be asked about
+
+        IDs are split into chunks of MAX_IDS_PER_REQUEST and the chunks are
+        requested concurrently (maxWorkers, default the transport pool size).
+        Each returned row is matched to its track through its Spotify href,
+        so results never depend on response order.
+
+        Args:
+            tracks: A list of all the tracks to get Audio features for
+            maxWorkers: Upper bound on concurrent requests
+
+        Returns:
+            A tuple of the features keyed by Spotify track ID and the IDs of
+            chunks whose request failed. A requested ID in neither is one
+            reccobeats answered for and does not know.
+        """
+        if not tracks:
+            return {}, []
+
+        tracks = list(dict.fromkeys(tracks))
+        cached = self.cache.getMany('audio-features', tracks) if self.cache else {}
+        features = {trackId: entry.body for trackId, entry in cached.items()}
+        failed = []
+        missing = [t for t in tracks if t not in cached]
+        if not missing:
+            return features, failed
+
+        chunks = [missing[i:i + self.MAX_IDS_PER_REQUEST] for i in range(0, len(missing), self.MAX_IDS_PER_REQUEST)]
+        workers = min(len(chunks), maxWorkers or self.http.pool_maxsize)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for chunk, content in zip(chunks, executor.map(self._fetchChunk, chunks)):
+                if content is None:
+                    failed.extend(chunk)
+                    continue
+                fetched = {self._trackIdOf(f): f for f in content if self._trackIdOf(f)}
+                if self.cache:
+                    self.cache.putMany('audio-features', fetched)
+                features.update(fetched)
+
+        return features, failed
@@ -0,0 +1,200 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+"""
+Persistent cache for API responses, stored in a local SQLite file.
+
+Entries are keyed by resource (endpoint) and ID, expire after a
+per-resource TTL, keep the ETag of the response they came from for
+conditional revalidation, and are evicted least-recently-used first once
+the cache grows past its size bound.
+"""
+
+projectRoot = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+defaultCachePath = os.path.join(projectRoot, ".cache", "api_responses.sqlite3")
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+class CacheEntry:
+    def __init__(self, body, etag: str, storedAt: float, ttl: float):
+        self.body = body
+        self.etag = etag
+        self.storedAt = storedAt
+        self.fresh = time.time() - storedAt < ttl
+
+
+class ResponseCache:
+    DEFAULT_TTLS = {
+        # Track bodies carry popularity, which refreshes upsert into song_popularity.
+        "tracks": 1 * HOUR,
+        "artists": 1 * DAY,
+        "audio-features": 30 * DAY,
+    }
+
+    def __init__(self, path: str = defaultCachePath,
+                 maxBytes: int = 256 * 1024 * 1024,
+                 ttls: Dict[str, float] = None,
+                 defaultTtl: float = DAY):
+        """
+        Args:
+            path: SQLite file holding the cache, created on first use.
+            maxBytes: Size bound for stored bodies before LRU eviction kicks in.
+            ttls: Per-resource time to live in seconds, merged over DEFAULT_TTLS.
+            defaultTtl: Time to live for resources without their own entry.
+        """
+        self.path = path
+        self.maxBytes = maxBytes
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        self.defaultTtl = defaultTtl
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "evictions": 0}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                resource TEXT NOT NULL,
+                key TEXT NOT NULL,
+                body TEXT NOT NULL,
+                etag TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                PRIMARY KEY (resource, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def ttl(self, resource: str) -> float:
+        return self.ttls.get(resource, self.defaultTtl)
+
+    def get(self, resource: str, key: str) -> Optional[CacheEntry]:
+        """
+        Looks up one entry, fresh or stale; callers revalidate stale entries with their ETag.
+        """
+        return self.getMany(resource, [key], includeStale=True).get(key)
+
+    def getMany(self, resource: str, keys: Iterable[str], includeStale: bool = False) -> Dict[str, CacheEntry]:
+        """
+        Looks up several IDs of one resource in a single query.
+
+        Returns:
+            Dictionary of key to CacheEntry; stale entries only when includeStale is set.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        ttl = self.ttl(resource)
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, body, etag, stored_at FROM responses WHERE resource = ? AND key IN ({placeholders})",
+                    [resource] + chunk
+                ).fetchall()
+                for key, body, etag, storedAt in rows:
+                    found[key] = CacheEntry(json.loads(body), etag, storedAt, ttl)
+
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE resource = ? AND key = ?",
+                [(now, resource, key) for key in found]
+            )
+            self._conn.commit()
+
+            fresh = sum(1 for entry in found.values() if entry.fresh)
+            self._stats["hits"] += fresh
+            self._stats["stale"] += len(found) - fresh
+            self._stats["misses"] += len(keys) - len(found)
+
+        if includeStale:
+            return found
+        return {key: entry for key, entry in found.items() if entry.fresh}
+
+    def put(self, resource: str, key: str, body, etag: str = None):
+        self.putMany(resource, {key: body}, etag)
+
+    def putMany(self, resource: str, bodies: Dict[str, object], etag: str = None):
+        """
+        Stores several bodies of one resource, then evicts least-recently-used entries if over budget.
+        """
+        if not bodies:
+            return
+
+        now = time.time()
+        rows = []
+        for key, body in bodies.items():
+            text = json.dumps(body, separators=(",", ":"))
+            rows.append((resource, key, text, etag, now, now, len(text)))
+
+        with self._lock:
+            replaced = self._conn.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM responses WHERE resource = ? AND key IN ({','.join('?' * len(bodies))})",
+                [resource] + list(bodies)
+            ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO responses (resource, key, body, etag, stored_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._size += sum(row[6] for row in rows) - replaced
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, resource: str, key: str):
+        """
+        Marks a stale entry fresh again, e.g. after the server answered 304 Not Modified.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE resource = ? AND key = ?",
+                (now, now, resource, key)
+            )
+            self._conn.commit()
+            self._stats["revalidated"] += 1
+
+    def _evict(self):
+        """Drops least-recently-used entries until the cache is back under 90% of its bound."""
+        if self._size <= self.maxBytes:
+            return
+        target = self.maxBytes * 0.9
+        rows = self._conn.execute("SELECT resource, key, size FROM responses ORDER BY accessed_at").fetchall()
+        victims = []
+        for resource, key, size in rows:
+            if self._size <= target:
+                break
+            victims.append((resource, key))
+            self._size -= size
+        self._conn.executemany("DELETE FROM responses WHERE resource = ? AND key = ?", victims)
+        self._stats["evictions"] += len(victims)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"] + self._stats["stale"]
+            return dict(self._stats,
+                        sizeBytes=self._size,
+                        hitRate=round(self._stats["hits"] / lookups, 3) if lookups else 0.0)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._size = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -2,38 +2,125 @@
 
 import os
 import queue
+import threading
+import time
 import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from dotenv import load_dotenv
 from urllib.parse import urlencode, urlparse, parse_qs
-from typing import List, Dict
+from typing import Iterator, List, Dict
+
+from .httpTransport import HttpTransport, get_shared_transport
+from .rateLimiter import RateLimiter, get_shared_limiter
+from .responseCache import ResponseCache
 
 projectRoot = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
 envPath = os.path.join(projectRoot, "config", ".env.example")
 
 class SpotifyClient:
-    def __init__(self):
+    MAX_IDS_PER_REQUEST = 50
+    # Only the attributes mapped by _mapTrackInfo, plus the total used for pagination
+    PLAYLIST_TRACK_FIELDS = "total,items(track(id,name,artists(id,name),album(name,release_date)))"
+    # Tokens are renewed this many seconds before Spotify expires them
+    TOKEN_REFRESH_MARGIN = 60
+
+    def __init__(self, transport: HttpTransport = None, rateLimiter: RateLimiter = None,
+                 cache: ResponseCache = None, apiBaseUrl: str = None, accountsBaseUrl: str = None):
         load_dotenv(dotenv_path=envPath)
+        # Overridable so the client can be pointed at a local stand-in server
+        self.apiBaseUrl = apiBaseUrl or os.getenv("SPOTIFY_API_BASE_URL", "https://api.spotify.com/v1")
+        self.accountsBaseUrl = accountsBaseUrl or os.getenv("SPOTIFY_ACCOUNTS_BASE_URL", "https://accounts.spotify.com")
+        self.http = transport or get_shared_transport()
+        self.cache = cache
+        self.rateLimiter = rateLimiter or get_shared_limiter(
+            "spotify", float(os.getenv("SPOTIFY_MAX_RPS", "10")))
         self.clientId = os.getenv("SPOTIFY_CLIENT_ID")
         self.clientSecret = os.getenv("SPOTIFY_CLIENT_SECRET")
-        self.tokenUrl = "https://accounts.spotify.com/api/token"
+        self.tokenUrl = f"{self.accountsBaseUrl}/api/token"
         self.redirectUri = os.getenv("SPOTIFY_REDIRECT_URI")
         self.accessToken = None
         self.refreshToken = None
+        self.tokenExpiresAt = None
+        self._tokenLock = threading.Lock()
+
+    def _storeToken(self, tokenData: Dict) -> str:
+        """
+        Keeps the token from a token endpoint response together with its expiry.
+        """
+        self.accessToken = tokenData["access_token"]
+        self.refreshToken = tokenData.get("refresh_token", self.refreshToken)
+        expiresIn = tokenData.get("expires_in")
+        self.tokenExpiresAt = time.monotonic() + expiresIn if expiresIn else None
+        return self.accessToken
+
+    def _tokenIsValid(self) -> bool:
+        if not self.accessToken:
+            return False
+        if self.tokenExpiresAt is None:
+            return True
+        return time.monotonic() < self.tokenExpiresAt - self.TOKEN_REFRESH_MARGIN
+
+    def _renewToken(self, requireUser: bool):
+        """Gets a new token; callers hold the token lock."""
+        if self.refreshToken:
+            self.refreshAccessToken()
+        elif requireUser:
+            raise Exception("User not authenticated.")
+        else:
+            self.authenticate()
+
+    def _ensureToken(self, requireUser: bool = False) -> str:
+        """
+        Returns a token that is valid for at least TOKEN_REFRESH_MARGIN seconds.
+
+        Renewal happens ahead of expiry under a lock with single-flight
+        semantics: threads that queued behind the refreshing thread find the
+        new token and return it without refreshing again.
+        """
+        if self._tokenIsValid():
+            return self.accessToken
+        with self._tokenLock:
+            if not self._tokenIsValid():
+                self._renewToken(requireUser)
+            return self.accessToken
+
+    def _invalidateToken(self, staleToken: str, requireUser: bool) -> str:
+        """
+        Renews the token after a 401, unless another thread already replaced it.
+        """
+        with self._tokenLock:
+            if self.accessToken == staleToken:
+                self._renewToken(requireUser)
+            return self.accessToken
+
+    def _authorizedGet(self, url: str, params: Dict = None, headers: Dict = None,
+                       requireUser: bool = False) -> requests.Response:
+        """
+        Sends an authorized GET, retrying once with a renewed token on 401.
+        """
+        token = self._ensureToken(requireUser)
+        for attempt in range(2):
+            requestHeaders = dict(headers or {}, Authorization=f"Bearer {token}")
+            response = self.http.get(url, headers=requestHeaders, params=params, limiter=self.rateLimiter)
+            if response.status_code != 401 or attempt:
+                return response
+            token = self._invalidateToken(token, requireUser)
 
     def authenticate(self) -> str:
         """
         Handles Client Credentials Flow.
         """
-        authResponse = requests.post(
+        authResponse = self.http.post(
             self.tokenUrl,
             data={"grant_type": "client_credentials"},
-            auth=(self.clientId, self.clientSecret)
+            auth=(self.clientId, self.clientSecret),
+            limiter=self.rateLimiter
         )
         if authResponse.status_code != 200:
             raise Exception(f"Failed to authenticate with Spotify: {authResponse.status_code}")
-        tokenData = authResponse.json()
-        self.accessToken = tokenData["access_token"]
-        return self.accessToken
+        return self._storeToken(authResponse.json())
 
     def get_auth_url(self, scope: str = None) -> str:
         """
@@ -42,7 +129,7 @@ class SpotifyClient:
         if scope is None:
             scope = os.getenv("SPOTIFY_SCOPE", "user-read-recently-played user-top-read playlist-read-private playlist-read-collaborative")
 
-        authUrl = "https://accounts.spotify.com/authorize"
+        authUrl = f"{self.accountsBaseUrl}/authorize"
         queryParams = urlencode({
             "client_id": self.clientId,
             "response_type": "code",
@@ -61,41 +148,42 @@ class SpotifyClient:
         
         code = query["code"][0]
 
-        tokenResponse = requests.post(
+        tokenResponse = self.http.post(
             self.tokenUrl,
             data={
                 "grant_type": "authorization_code",
                 "code": code,
                 "redirect_uri": self.redirectUri
             },
-            auth=(self.clientId, self.clientSecret)
+            auth=(self.clientId, self.clientSecret),
+            limiter=self.rateLimiter
         )
         if tokenResponse.status_code != 200:
             raise Exception(f"Failed user authentication: {tokenResponse.status_code} | {tokenResponse.text}")
 
         tokenData = tokenResponse.json()
-        self.accessToken = tokenData["access_token"]
-        self.refreshToken = tokenData.get("refresh_token")
+        with self._tokenLock:
+            self.refreshToken = None
+            self._storeToken(tokenData)
         return {"method": "user_login", "token": self.accessToken}
 
     def refreshAccessToken(self):
         """
         Refreshes the access token using refresh token.
         """
-        response = requests.post(
+        response = self.http.post(
             self.tokenUrl,
             data={
                 "grant_type": "refresh_token",
                 "refresh_token": self.refreshToken
             },
-            auth=(self.clientId, self.clientSecret)
+            auth=(self.clientId, self.clientSecret),
+            limiter=self.rateLimiter
         )
         if response.status_code != 200:
             raise Exception(f"Failed to refresh token: {response.status_code}")
 
-        tokenData = response.json()
-        self.accessToken = tokenData["access_token"]
-        return self.accessToken
+        return self._storeToken(response.json())
 
     def searchTrack(self, track: str = None,
                     artist: str = None,
@@ -107,9 +195,51 @@ class SpotifyClient:
         """
         Searches for a track on Spotify.
         """
-        if not self.accessToken:
-            self.authenticate()
+        finalQuery = self._buildSearchQuery(track, artist, album, genre, year, query)
+        url = f"{self.apiBaseUrl}/search"
+        params = {"q": finalQuery, "type": "track", "limit": limit}
+
+        response = self._authorizedGet(url, params=params)
+        if response.status_code != 200:
+            raise Exception(f"Searching failed: {response.status_code} | {response.text}")
 
+        items = response.json().get("tracks", {}).get("items", [])
+        return [self._mapTrackInfo(i) for i in items]
+
+    def iterSearchTracks(self, track: str = None,
+                         artist: str = None,
+                         album: str = None,
+                         genre: str = None,
+                         year: str = None,
+                         query: str = None,
+                         pageSize: int = 50,
+                         maxResults: int = 1000) -> Iterator[List[Dict]]:
+        """
+        Yield search results one page at a time until the results or maxResults run out.
+        """
+        finalQuery = self._buildSearchQuery(track, artist, album, genre, year, query)
+        url = f"{self.apiBaseUrl}/search"
+
+        offset = 0
+        while offset < maxResults:
+            params = {"q": finalQuery, "type": "track",
+                      "limit": min(pageSize, maxResults - offset), "offset": offset}
+            response = self._authorizedGet(url, params=params)
+            if response.status_code != 200:
+                raise Exception(f"Searching failed: {response.status_code} | {response.text}")
+
+            page = response.json().get("tracks", {})
+            items = page.get("items", [])
+            if items:
+                yield [self._mapTrackInfo(i) for i in items if i]
+            if not items or not page.get("next"):
+                break
+            offset += len(items)
+
+    @staticmethod
+    def _buildSearchQuery(track: str = None, artist: str = None, album: str = None,
+                          genre: str = None, year: str = None, query: str = None) -> str:
+        """Builds the `q` parameter from field filters, falling back to the free-text query."""
         if not any([track, artist, album, genre, year, query]):
             raise ValueError("You must provide at least a query or one filter.")
 
@@ -121,39 +251,30 @@ class SpotifyClient:
         if year: queryParts.append(f"year:{year}")
 
         finalQuery = " ".join(queryParts) if queryParts else query
-        headers = {"Authorization": f"Bearer {self.accessToken}"}
-        url = "https://api.spotify.com/v1/search"
-        params = {"q": finalQuery.strip(), "type": "track", "limit": limit}
-
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code != 200:
-            raise Exception(f"Searching failed: {response.status_code} | {response.text}")
+        return finalQuery.strip()
 
-        items = response.json().get("tracks", {}).get("items", [])
-        return [
-            {
-                "trackID": i["id"],
-                "trackName": i["name"],
-                "artistName": i["artists"][0]["name"],
-                "artistID": i["artists"][0]["id"],
-                "albumName": i["album"]["name"],
-                "releaseDate": i["album"]["release_date"]
-            } for i in items
-        ]
-
-    def getSongDetails(self, trackId):
-        """Fetch detailed metadata for a specific track."""
-        if not self.accessToken:
-            self.authenticate()
-
-        headers = {"Authorization": f"Bearer {self.accessToken}"}
-        url = f"https://api.spotify.com/v1/tracks/{trackId}"
+    @staticmethod
+    def _playlistId(playlistUrlOrId: str) -> str:
+        """Extracts the playlist ID from a share URL, or returns the ID unchanged."""
+        if "spotify.com" in playlistUrlOrId:
+            return playlistUrlOrId.split("/")[-1].split("?")[0]
+        return playlistUrlOrId
 
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            raise Exception(f"Fetching song details failed: {response.status_code}")
+    @staticmethod
+    def _mapTrackInfo(track: Dict) -> Dict:
+        """Maps a Spotify track object to the basic track info dictionary."""
+        return {
+            "trackID": track["id"],
+            "trackName": track["name"],
+            "artistName": track["artists"][0]["name"],
+            "artistID": track["artists"][0]["id"],
+            "albumName": track["album"]["name"],
+            "releaseDate": track["album"]["release_date"]
+        }
 
-        track = response.json()
+    @staticmethod
+    def _mapSongDetails(track: Dict) -> Dict:
+        """Maps a Spotify track object to the song details dictionary."""
         if not track or not track.get("album"):
             return None # Return None if track data is incomplete
 
@@ -173,19 +294,9 @@ class SpotifyClient:
             "album": track.get("album")
         }
 
-    def getArtistDetails(self, artistId):
-        """Fetch metadata for an artist."""
-        if not self.accessToken:
-            self.authenticate()
-
-        headers = {"Authorization": f"Bearer {self.accessToken}"}
-        url = f"https://api.spotify.com/v1/artists/{artistId}"
-
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            raise Exception(f"Fetching artist details failed: {response.status_code}")
-
-        artist = response.json()
+    @staticmethod
+    def _mapArtistDetails(artist: Dict) -> Dict:
+        """Maps a Spotify artist object to the artist details dictionary."""
         return {
             "artistID": artist["id"],
             "artistName": artist["name"],
@@ -195,84 +306,205 @@ class SpotifyClient:
             "spotifyUrl": artist["external_urls"]["spotify"]
         }
 
-    def getRecentlyPlayed(self, limit=20):
+    def _fetchCached(self, resource: str, resourceId: str, failureMessage: str) -> Dict:
         """
-        Fetch user's recently played tracks.
+        Fetch a single object from /v1/{resource}/{id}, serving it from the response
+        cache when fresh and revalidating stale entries with If-None-Match.
         """
-        if not self.accessToken:
-            raise Exception("User not authenticated.")
+        cached = self.cache.get(resource, resourceId) if self.cache else None
+        if cached and cached.fresh:
+            return cached.body
+
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        url = f"{self.apiBaseUrl}/{resource}/{resourceId}"
+
+        response = self._authorizedGet(url, headers=headers)
+        if response.status_code == 304 and cached:
+            self.cache.touch(resource, resourceId)
+            return cached.body
+        if response.status_code != 200:
+            raise Exception(f"{failureMessage}: {response.status_code}")
+
+        body = response.json()
+        if self.cache and body:
+            self.cache.put(resource, resourceId, body, response.headers.get("ETag"))
+        return body
+
+    def _fetchCachedBatch(self, resource: str, resourceIds: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch many objects through /v1/{resource}?ids=, 50 IDs per request.
+        Fresh cache entries are used as-is and only the remaining IDs go to the network.
+        """
+        uniqueIds = list(dict.fromkeys(resourceIds))
+        cached = self.cache.getMany(resource, uniqueIds) if self.cache else {}
+        objects = {resourceId: entry.body for resourceId, entry in cached.items()}
+        missing = [resourceId for resourceId in uniqueIds if resourceId not in cached]
+        if not missing:
+            return objects
+
+        url = f"{self.apiBaseUrl}/{resource}"
+
+        for i in range(0, len(missing), self.MAX_IDS_PER_REQUEST):
+            chunk = missing[i:i + self.MAX_IDS_PER_REQUEST]
+            response = self._authorizedGet(url, params={"ids": ",".join(chunk)})
+            if response.status_code != 200:
+                raise Exception(f"Fetching {resource} failed: {response.status_code}")
+
+            fetched = {obj["id"]: obj for obj in response.json().get(resource, []) if obj}
+            if self.cache:
+                self.cache.putMany(resource, fetched)
+            objects.update(fetched)
+        return objects
 
-        headers = {"Authorization": f"Bearer {self.accessToken}"}
-        url = "https://api.spotify.com/v1/me/player/recently-played"
+    def getSongDetails(self, trackId):
+        """Fetch detailed metadata for a specific track."""
+        track = self._fetchCached("tracks", trackId, "Fetching song details failed")
+        return self._mapSongDetails(track)
+
+    def getSongDetailsBatch(self, trackIds: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch detailed metadata for many tracks, 50 IDs per request.
+        Returns a dictionary keyed by track ID; unknown or incomplete tracks are left out.
+        """
+        songs = {}
+        for track in self._fetchCachedBatch("tracks", trackIds).values():
+            song = self._mapSongDetails(track)
+            if song:
+                songs[song["trackID"]] = song
+        return songs
+
+    def getArtistDetails(self, artistId):
+        """Fetch metadata for an artist."""
+        artist = self._fetchCached("artists", artistId, "Fetching artist details failed")
+        return self._mapArtistDetails(artist)
+
+    def getArtistDetailsBatch(self, artistIds: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch metadata for many artists, 50 IDs per request.
+        Duplicate IDs are requested once; returns a dictionary keyed by artist ID.
+        """
+        return {
+            artistId: self._mapArtistDetails(artist)
+            for artistId, artist in self._fetchCachedBatch("artists", artistIds).items()
+        }
+
+    def getCurrentUser(self):
+        """
+        Fetch the profile of the authorized user.
+        """
+        response = self._authorizedGet(f"{self.apiBaseUrl}/me", requireUser=True)
+        if response.status_code != 200:
+            raise Exception(f"Fetching current user failed: {response.status_code}")
+
+        return response.json()
+
+    def _fetchRecentlyPlayed(self, limit=20, after: int = None, before: int = None) -> Dict:
+        """Fetch one page of the play history; `after`/`before` are Unix timestamps in milliseconds."""
+        url = f"{self.apiBaseUrl}/me/player/recently-played"
         params = {"limit": limit}
+        if after is not None:
+            params["after"] = after
+        elif before is not None:
+            params["before"] = before
 
-        response = requests.get(url, headers=headers, params=params)
+        response = self._authorizedGet(url, params=params, requireUser=True)
         if response.status_code != 200:
             raise Exception(f"Fetching recently played failed: {response.status_code}")
 
-        return response.json().get("items", [])
+        return response.json()
+
+    def getRecentlyPlayed(self, limit=20, after: int = None, before: int = None):
+        """
+        Fetch user's recently played tracks.
+        `after`/`before` (Unix milliseconds, mutually exclusive) bound the returned plays.
+        """
+        return self._fetchRecentlyPlayed(limit, after, before).get("items", [])
+
+    def iterRecentlyPlayed(self, after: int = None, limit=50) -> Iterator[List[Dict]]:
+        """
+        Yield the user's plays newer than `after` (Unix milliseconds) one page at a time, oldest page first.
+
+        Follows the `after` cursor of each page, so an ingester can pass the
+        timestamp of the last stored play and receive only new ones. Without
+        `after`, yields the single page of the most recent plays.
+        """
+        while True:
+            data = self._fetchRecentlyPlayed(limit, after=after)
+            items = data.get("items", [])
+            if items:
+                yield items
+            cursors = data.get("cursors") or {}
+            if after is None or not items or not data.get("next") or not cursors.get("after"):
+                return
+            after = int(cursors["after"])
 
     def getTopItems(self, item_type="tracks", time_range="medium_term", limit=20):
         """
         Fetch user's top tracks or artists.
         """
-        if not self.accessToken:
-            raise Exception("User not authenticated.")
-
-        headers = {"Authorization": f"Bearer {self.accessToken}"}
-        url = f"https://api.spotify.com/v1/me/top/{item_type}"
+        url = f"{self.apiBaseUrl}/me/top/{item_type}"
         params = {"time_range": time_range, "limit": limit}
 
-        response = requests.get(url, headers=headers, params=params)
+        response = self._authorizedGet(url, params=params, requireUser=True)
         if response.status_code != 200:
             raise Exception(f"Fetching top {item_type} failed: {response.status_code}")
 
         return response.json().get("items", [])
 
-    def getPlaylistTracks(self, playlistUrlOrId, limit=100):
+    def iterPlaylistTracks(self, playlistUrlOrId, limit=100, fields: str = PLAYLIST_TRACK_FIELDS,
+                           maxWorkers: int = None) -> Iterator[List[Dict]]:
         """
-        Fetch all tracks from a public playlist.
+        Yield the tracks of a public playlist one page at a time, in playlist order.
+
+        The first page reports the playlist total; the following offsets are
+        prefetched on a bounded thread pool (maxWorkers pages ahead, default the
+        transport pool size), so the caller can process a page while the next
+        ones are still downloading and memory stays flat for large playlists.
+        `fields` trims each item to the attributes that are mapped into
+        trackInfo; pass None for full items.
         """
-        if not self.accessToken:
-            self.authenticate()
-
-        if "spotify.com" in playlistUrlOrId:
-            playlistId = playlistUrlOrId.split("/")[-1].split("?")[0]
-        else:
-            playlistId = playlistUrlOrId
-
-        headers = {"Authorization": f"Bearer {self.accessToken}"}
-        url = f"https://api.spotify.com/v1/playlists/{playlistId}/tracks"
-        
-        tracks = []
-        params = {"limit": 100, "offset": 0}
-
-        while True:
-            response = requests.get(url, headers=headers, params=params)
+        playlistId = self._playlistId(playlistUrlOrId)
+        url = f"{self.apiBaseUrl}/playlists/{playlistId}/tracks"
+
+        def fetchPage(offset):
+            params = {"limit": limit, "offset": offset}
+            if fields:
+                params["fields"] = fields
+            response = self._authorizedGet(url, params=params)
             if response.status_code != 200:
                 raise Exception(f"Fetching playlist failed: {response.status_code} | {response.text}")
-
-            data = response.json()
-            items = data.get("items", [])
-            if not items:
-                break
-
-            for i in items:
-                track = i.get("track")
-                if track and track.get("id"):
-                    trackInfo = {
-                        "trackID": track["id"],
-                        "trackName": track["name"],
-                        "artistName": track["artists"][0]["name"],
-                        "artistID": track["artists"][0]["id"],
-                        "albumName": track["album"]["name"],
-                        "releaseDate": track["album"]["release_date"],
-                    }
-                    tracks.append(trackInfo)
-
-            if data.get("next"):
-                params["offset"] += params["limit"]
-            else:
-                break
-
+            return response.json()
+
+        def mapPage(data):
+            return [self._mapTrackInfo(i["track"]) for i in data.get("items", [])
+                    if i.get("track") and i["track"].get("id")]
+
+        first = fetchPage(0)
+        yield mapPage(first)
+
+        offsets = iter(range(limit, first.get("total", 0), limit))
+        window = maxWorkers or self.http.pool_maxsize
+        executor = ThreadPoolExecutor(max_workers=window)
+        try:
+            pending = deque(executor.submit(fetchPage, o) for o in islice(offsets, window))
+            while pending:
+                data = pending.popleft().result()
+                nextOffset = next(offsets, None)
+                if nextOffset is not None:
+                    pending.append(executor.submit(fetchPage, nextOffset))
+                yield mapPage(data)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def getPlaylistTracks(self, playlistUrlOrId, limit=100, fields: str = PLAYLIST_TRACK_FIELDS,
+                          maxWorkers: int = None):
+        """
+        Fetch all tracks from a public playlist.
+        Collects the pages of iterPlaylistTracks, which fetches them concurrently.
+        """
+        tracks = []
+        for page in self.iterPlaylistTracks(playlistUrlOrId, limit, fields, maxWorkers):
+            tracks.extend(page)
         return tracks
@@ -0,0 +1,424 @@
+# Local stand-in for the Spotify and reccobeats endpoints used by the API clients
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlparse, parse_qsl
+from typing import Dict
+
+"""
+Offline replacement for api.spotify.com, accounts.spotify.com and
+api.reccobeats.com, meant for throughput tests and benchmarks.
+
+Responses come from recorded fixtures when one matches the request
+(see FixtureRecorder), otherwise they are synthesized deterministically
+from the requested IDs. Latency, 429 injection and payload size are
+configurable through StandInConfig. Point the clients at the server with
+the environment returned by StandInServer.clientEnv().
+"""
+
+
+def fixtureKey(method: str, path: str, params: Dict = None) -> str:
+    """
+    Normalized request key shared by the recorder and the server.
+    """
+    query = urlencode(sorted((k, str(v)) for k, v in (params or {}).items()))
+    return f"{method.upper()} {path}?{query}"
+
+
+def _fixturePath(directory: str, key: str) -> str:
+    return os.path.join(directory, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+
+def _hash(value: str) -> int:
+    return int(hashlib.sha1(value.encode()).hexdigest()[:8], 16)
+
+
+class FixtureRecorder:
+    """
+    Captures real API responses as JSON fixtures the stand-in server can replay.
+    Attach it to an HttpTransport (transport.recorder = FixtureRecorder(dir)).
+    """
+    SKIPPED_PATHS = ("/api/token",)
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.recorded = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, method: str, url: str, params: Dict, response):
+        parsed = urlparse(url)
+        if parsed.path.endswith(self.SKIPPED_PATHS):
+            return
+        try:
+            body = response.json()
+        except ValueError:
+            return
+
+        merged = dict(parse_qsl(parsed.query))
+        merged.update(params or {})
+        key = fixtureKey(method, parsed.path, merged)
+        entry = {
+            "key": key,
+            "status": response.status_code,
+            "etag": response.headers.get("ETag"),
+            "body": body
+        }
+        with self._lock:
+            with open(_fixturePath(self.directory, key), "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            self.recorded += 1
+
+
+class StandInConfig:
+    def __init__(self, latency: float = 0.0,
+                 jitter: float = 0.0,
+                 rate429: float = 0.0,
+                 retryAfter: int = 1,
+                 playlistSize: int = 100,
+                 searchTotal: int = 1000,
+                 artistPool: int = 40,
+                 recentlyPlayed: int = 50,
+                 unknownFeatureRate: float = 0.0,
+                 paddingBytes: int = 0,
+                 tokenTtl: int = 3600,
+                 maxSpotifyIds: int = 50,
+                 maxFeatureIds: int = 40):
+        """
+        Args:
+            latency: Fixed delay in seconds added to every response.
+            jitter: Extra random delay of up to this many seconds.
+            rate429: Probability of answering 429 with Retry-After instead of the payload.
+            retryAfter: Retry-After value in seconds sent with injected 429s.
+            playlistSize: Total tracks reported by every playlist.
+            searchTotal: Total results reported by every search.
+            artistPool: Number of distinct artists tracks are spread over.
+            recentlyPlayed: Length of the synthetic listening history.
+            unknownFeatureRate: Share of track IDs reccobeats reports no features for.
+            paddingBytes: Filler added to each track and artist object to grow payloads.
+            tokenTtl: expires_in returned by the token endpoint.
+            maxSpotifyIds: IDs accepted by the multi-ID Spotify endpoints.
+            maxFeatureIds: IDs accepted by the reccobeats audio-features endpoint.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.rate429 = rate429
+        self.retryAfter = retryAfter
+        self.playlistSize = playlistSize
+        self.searchTotal = searchTotal
+        self.artistPool = artistPool
+        self.recentlyPlayed = recentlyPlayed
+        self.unknownFeatureRate = unknownFeatureRate
+        self.paddingBytes = paddingBytes
+        self.tokenTtl = tokenTtl
+        self.maxSpotifyIds = maxSpotifyIds
+        self.maxFeatureIds = maxFeatureIds
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.standIn._handle(self, "GET")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self.server.standIn._handle(self, "POST")
+
+
+class StandInServer:
+    GENRES = ["pop", "rap", "rock", "edm", "latin", "k-pop", "indie", "r&b", "country", "jazz"]
+
+    def __init__(self, config: StandInConfig = None, fixturesDir: str = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StandInConfig()
+        self.fixturesDir = fixturesDir
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.standIn = self
+        self._thread = None
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self._counts = {}
+        self._injected429 = 0
+        self._startedAt = int(time.time() * 1000)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def clientEnv(self) -> Dict[str, str]:
+        """Environment variables that point SpotifyClient and reccobeats at this server."""
+        return {
+            "SPOTIFY_API_BASE_URL": f"{self.url}/v1",
+            "SPOTIFY_ACCOUNTS_BASE_URL": self.url,
+            "RECCOBEATS_BASE_URL": self.url
+        }
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"requests": dict(self._counts), "injected429": self._injected429}
+
+    # -- request handling -------------------------------------------------
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str):
+        parsed = urlparse(handler.path)
+        path = parsed.path
+        params = dict(parse_qsl(parsed.query))
+
+        if path == "/__stats":
+            return self._send(handler, 200, self.stats())
+
+        route = re.sub(r"^/v1/(tracks|artists)/[^/]+$", r"/v1/\1/{id}", path)
+        route = re.sub(r"^/v1/playlists/[^/]+/", "/v1/playlists/{id}/", route)
+        with self._lock:
+            self._counts[route] = self._counts.get(route, 0) + 1
+            inject = self._random.random() < self.config.rate429
+            if inject:
+                self._injected429 += 1
+
+        delay = self.config.latency + random.uniform(0, self.config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if inject:
+            return self._send(handler, 429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                              {"Retry-After": str(self.config.retryAfter)})
+
+        if self.fixturesDir:
+            fixture = _fixturePath(self.fixturesDir, fixtureKey(method, path, params))
+            if os.path.exists(fixture):
+                with open(fixture, encoding="utf-8") as f:
+                    entry = json.load(f)
+                return self._sendEtagged(handler, entry["status"], entry["body"], entry.get("etag"))
+
+        try:
+            status, body = self._synthesize(method, path, params)
+        except ValueError as e:
+            status, body = 400, {"error": {"status": 400, "message": str(e)}}
+        if status == 200 and re.fullmatch(r"/v1/(tracks|artists)/[^/]+", path):
+            etag = '"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest() + '"'
+            return self._sendEtagged(handler, status, body, etag)
+        self._send(handler, status, body)
+
+    def _sendEtagged(self, handler, status: int, body, etag: str):
+        if etag and handler.headers.get("If-None-Match") == etag:
+            return self._send(handler, 304, None, {"ETag": etag})
+        self._send(handler, status, body, {"ETag": etag} if etag else None)
+
+    @staticmethod
+    def _send(handler, status: int, body, headers: Dict = None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        handler.send_response(status)
+        handler.send_header("Content-Length", str(len(payload)))
+        if payload:
+            handler.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _ids(self, params: Dict, maximum: int):
+        ids = [i for i in params.get("ids", "").split(",") if i]
+        if len(ids) > maximum:
+            raise ValueError(f"Too many ids requested ({len(ids)} > {maximum})")
+        return ids
+
+    def _pageUrl(self, path: str, params: Dict, offset: int) -> str:
+        return f"{self.url}{path}?" + urlencode(dict(params, offset=offset))
+
+    def _synthesize(self, method: str, path: str, params: Dict):
+        limit = int(params.get("limit", 20))
+        offset = int(params.get("offset", 0))
+
+        if method == "POST" and path == "/api/token":
+            return 200, {"access_token": f"stand-in-{time.time_ns()}", "token_type": "Bearer",
+                         "expires_in": self.config.tokenTtl, "refresh_token": "stand-in-refresh"}
+
+        if path == "/v1/audio-features":
+            ids = self._ids(params, self.config.maxFeatureIds)
+            known = [i for i in ids if (_hash("features" + i) % 1000) / 1000 >= self.config.unknownFeatureRate]
+            return 200, {"content": [self._audioFeatures(i) for i in known]}
+
+        if path in ("/v1/tracks", "/v1/artists"):
+            ids = self._ids(params, self.config.maxSpotifyIds)
+            if path == "/v1/tracks":
+                return 200, {"tracks": [self._track(i) for i in ids]}
+            return 200, {"artists": [self._artist(i) for i in ids]}
+
+        match = re.fullmatch(r"/v1/(tracks|artists)/([^/]+)", path)
+        if match:
+            kind, objectId = match.groups()
+            return 200, self._track(objectId) if kind == "tracks" else self._artist(objectId)
+
+        match = re.fullmatch(r"/v1/playlists/([^/]+)/tracks", path)
+        if match:
+            playlistId = match.group(1)
+            end = min(offset + limit, self.config.playlistSize)
+            items = [{"track": self._track(f"{playlistId[:6]}tr{i:08d}")} for i in range(offset, end)]
+            return 200, {"total": self.config.playlistSize, "limit": limit, "offset": offset, "items": items,
+                         "next": self._pageUrl(path, params, end) if end < self.config.playlistSize else None}
+
+        if path == "/v1/search":
+            prefix = f"q{_hash(params.get('q', '')) % 10000:04d}"
+            end = min(offset + limit, self.config.searchTotal)
+            items = [self._track(f"{prefix}tr{i:08d}") for i in range(offset, end)]
+            return 200, {"tracks": {"total": self.config.searchTotal, "limit": limit, "offset": offset, "items": items,
+                                    "next": self._pageUrl(path, params, end) if end < self.config.searchTotal else None}}
+
+        if path == "/v1/me":
+            return 200, {"id": "stand-in-user", "display_name": "Stand-in User", "type": "user"}
+
+        match = re.fullmatch(r"/v1/me/top/(tracks|artists)", path)
+        if match:
+            make = self._track if match.group(1) == "tracks" else self._artist
+            prefix = "toptr" if match.group(1) == "tracks" else "topar"
+            return 200, {"items": [make(f"{prefix}{i:08d}") for i in range(offset, offset + limit)],
+                         "total": 50, "limit": limit, "offset": offset}
+
+        if path == "/v1/me/player/recently-played":
+            return 200, self._recentlyPlayed(params, limit)
+
+        return 404, {"error": {"status": 404, "message": "Not found"}}
+
+    def _recentlyPlayed(self, params: Dict, limit: int) -> Dict:
+        # Plays three minutes apart, newest first, ending when the server started
+        plays = [(self._startedAt - i * 180000, f"rptr{i % 200:08d}") for i in range(self.config.recentlyPlayed)]
+        if "after" in params:
+            newer = [p for p in plays if p[0] > int(params["after"])]
+            page = newer[-limit:]
+        elif "before" in params:
+            page = [p for p in plays if p[0] < int(params["before"])][:limit]
+        else:
+            page = plays[:limit]
+
+        items = [{
+            "track": self._track(trackId),
+            "played_at": datetime.fromtimestamp(ms / 1000, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        } for ms, trackId in page]
+        cursors = {"after": str(page[0][0]), "before": str(page[-1][0])} if page else None
+        nextUrl = None
+        if page and "after" in params and len(page) == limit and len(newer) > limit:
+            nextUrl = f"{self.url}/v1/me/player/recently-played?" + urlencode({"after": page[0][0], "limit": limit})
+        elif page and "after" not in params and page[-1] != plays[-1]:
+            nextUrl = f"{self.url}/v1/me/player/recently-played?" + urlencode({"before": page[-1][0], "limit": limit})
+        return {"items": items, "cursors": cursors, "next": nextUrl, "limit": limit}
+
+    def _padding(self) -> Dict:
+        return {"padding": "x" * self.config.paddingBytes} if self.config.paddingBytes else {}
+
+    def _artistIdFor(self, trackId: str) -> str:
+        return f"standinartist{_hash(trackId) % self.config.artistPool:06d}"
+
+    def _track(self, trackId: str) -> Dict:
+        h = _hash(trackId)
+        artistId = self._artistIdFor(trackId)
+        artistRef = {"id": artistId, "name": f"Artist {artistId[-6:]}"}
+        albumId = f"standinalbum{h % 5000:06d}"
+        return dict({
+            "id": trackId,
+            "name": f"Track {trackId}",
+            "artists": [artistRef],
+            "album": {
+                "id": albumId,
+                "name": f"Album {albumId[-6:]}",
+                "release_date": f"{2000 + h % 25}-01-01",
+                "artists": [artistRef],
+                "external_urls": {"spotify": f"https://open.spotify.com/album/{albumId}"},
+                "total_tracks": 1 + h % 20
+            },
+            "duration_ms": 120000 + h % 180000,
+            "popularity": h % 101,
+            "explicit": bool(h & 1),
+            "track_number": 1 + h % 12,
+            "disc_number": 1,
+            "preview_url": None,
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{trackId}"}
+        }, **self._padding())
+
+    def _artist(self, artistId: str) -> Dict:
+        h = _hash(artistId)
+        return dict({
+            "id": artistId,
+            "name": f"Artist {artistId[-6:]}",
+            "genres": [self.GENRES[h % len(self.GENRES)], self.GENRES[(h // 7) % len(self.GENRES)]],
+            "popularity": h % 101,
+            "followers": {"total": h % 10000000},
+            "external_urls": {"spotify": f"https://open.spotify.com/artist/{artistId}"}
+        }, **self._padding())
+
+    @staticmethod
+    def _audioFeatures(trackId: str) -> Dict:
+        rnd = random.Random(_hash(trackId))
+        return {
+            "id": hashlib.md5(trackId.encode()).hexdigest(),
+            "href": f"https://open.spotify.com/track/{trackId}",
+            "danceability": round(rnd.random(), 3),
+            "energy": round(rnd.random(), 3),
+            "key": rnd.randint(0, 11),
+            "loudness": round(rnd.uniform(-30, 0), 3),
+            "mode": rnd.randint(0, 1),
+            "speechiness": round(rnd.random(), 3),
+            "acousticness": round(rnd.random(), 3),
+            "instrumentalness": round(rnd.random(), 3),
+            "liveness": round(rnd.random(), 3),
+            "valence": round(rnd.random(), 3),
+            "tempo": round(rnd.uniform(60, 200), 3)
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve stand-in Spotify/reccobeats endpoints locally.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--fixtures", help="Directory of recorded fixtures to replay")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--playlist-size", type=int, default=100)
+    parser.add_argument("--artist-pool", type=int, default=40)
+    parser.add_argument("--padding-bytes", type=int, default=0)
+    parser.add_argument("--unknown-feature-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = StandInConfig(latency=args.latency, jitter=args.jitter, rate429=args.rate_429,
+                           retryAfter=args.retry_after, playlistSize=args.playlist_size,
+                           artistPool=args.artist_pool, paddingBytes=args.padding_bytes,
+                           unknownFeatureRate=args.unknown_feature_rate)
+    server = StandInServer(config, args.fixtures, args.host, args.port)
+    print(f"Stand-in server listening on {server.url}")
+    for name, value in server.clientEnv().items():
+        print(f"  export {name}={value}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server._httpd.server_close()